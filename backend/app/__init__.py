@@ -1,4 +1,6 @@
+import logging
 import os
+from typing import Optional
 from flask import Flask
 from .extensions import db, jwt
 from .routes.auth import auth_bp
@@ -8,10 +10,30 @@ from .routes.forecast import forecast_bp
 from .routes.admin import admin_bp
 from .routes.health import health_bp
 from .scheduler import start_scheduler
+from .jobs import start_job_runner
+from .migrations import run_migrations
+from .response_cache import BACKENDS as RESPONSE_CACHE_BACKENDS, ensure_versions
 from .models import User
 
 
-def create_app() -> Flask:
+# What a process does (see app/__main__.py): web only serves requests, trainer only runs training jobs,
+# scheduler only queues them; all serves requests and runs the other two in background threads
+APP_ROLES = ('all', 'web', 'trainer', 'scheduler')
+
+
+def create_app(background: bool = True, role: Optional[str] = None) -> Flask:
+    """Build the app for `role` (default: APP_ROLE).
+
+    Only the all role starts the job runner and scheduler threads, and
+    `background=False` (command-line tools) skips them there too; the
+    trainer and scheduler roles run those loops in the foreground instead.
+
+    Nothing here imports the ML stack (NumPy, pandas, scikit-learn, joblib):
+    training and inference modules are imported where they are used, so a
+    web process starts in well under a second (see tests/test_startup.py).
+    """
+    # No-op when the server (e.g. gunicorn) already configured logging
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(asctime)s %(levelname)s %(name)s: %(message)s')
     app = Flask(__name__)
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DB_URL', 'sqlite:///app.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
@@ -19,6 +41,72 @@ def create_app() -> Flask:
     app.config['JWT_ALGORITHM'] = os.getenv('JWT_ALGORITHM', 'HS256')
     app.config['JWT_TOKEN_LOCATION'] = ['headers']
     app.config['JWT_COOKIE_CSRF_PROTECT'] = False
+    # Training engine: products are fanned out to a process pool in batches
+    app.config['TRAINING_WORKERS'] = int(os.getenv('TRAINING_WORKERS', os.cpu_count() or 1))
+    app.config['TRAINING_BATCH_SIZE'] = int(os.getenv('TRAINING_BATCH_SIZE', '50'))
+    app.config['TRAINING_MAX_SECONDS'] = int(os.getenv('TRAINING_MAX_SECONDS', '120'))
+    app.config['TRAINING_MP_START_METHOD'] = os.getenv('TRAINING_MP_START_METHOD', 'spawn')
+    app.config['MODELS_DIR'] = os.getenv('MODELS_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models'))
+    # Per-process LRU of loaded models, bounded by model file bytes
+    app.config['MODEL_CACHE_MAX_BYTES'] = int(os.getenv('MODEL_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+    # per_product: a model picked per product (below); global: one gradient-boosted model for the catalog
+    app.config['TRAINING_MODE'] = os.getenv('TRAINING_MODE', 'per_product')
+    app.config['GLOBAL_MODEL_MAX_ITER'] = int(os.getenv('GLOBAL_MODEL_MAX_ITER', '200'))
+    # Per-product model candidates, simplest first; each product gets the one with the lowest holdout error
+    app.config['TRAINING_MODELS'] = tuple(
+        m.strip() for m in os.getenv('TRAINING_MODELS', 'ses,seasonal_naive,ridge,random_forest').split(',') if m.strip()
+    )
+    app.config['TRAINING_HOLDOUT_DAYS'] = int(os.getenv('TRAINING_HOLDOUT_DAYS', '14'))
+    # Days of history before a product is worth fitting a random forest for
+    app.config['TRAINING_FOREST_MIN_DAYS'] = int(os.getenv('TRAINING_FOREST_MIN_DAYS', '90'))
+    # Rolling-origin backtests; full trainings run one to fill ModelTraining.accuracy
+    app.config['BACKTEST_ON_TRAINING'] = os.getenv('BACKTEST_ON_TRAINING', 'true').lower() == 'true'
+    app.config['BACKTEST_ORIGINS'] = int(os.getenv('BACKTEST_ORIGINS', '4'))
+    app.config['BACKTEST_STEP_DAYS'] = int(os.getenv('BACKTEST_STEP_DAYS', '7'))
+    app.config['BACKTEST_HORIZON_DAYS'] = int(os.getenv('BACKTEST_HORIZON_DAYS', '7'))
+    app.config['BACKTEST_MAX_SECONDS'] = int(os.getenv('BACKTEST_MAX_SECONDS', '1800'))
+    # Runs and their phase timings are kept in training_runs; per-product timings only for the latest runs.
+    # TRAINING_PROFILE=cprofile|pyinstrument also profiles every run into TRAINING_PROFILE_DIR
+    app.config['TRAINING_RUN_DETAIL_KEEP'] = int(os.getenv('TRAINING_RUN_DETAIL_KEEP', '20'))
+    app.config['TRAINING_PROFILE'] = os.getenv('TRAINING_PROFILE') or None
+    app.config['TRAINING_PROFILE_DIR'] = os.getenv('TRAINING_PROFILE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'profiles'))
+    # Model size and storage: tree limits (MODEL_MAX_DEPTH=0 means unbounded), joblib zlib level,
+    # and MODEL_MMAP_MODE=r to write uncompressed files that workers memory-map and share
+    app.config['MODEL_MAX_DEPTH'] = int(os.getenv('MODEL_MAX_DEPTH', '12')) or None
+    app.config['MODEL_MIN_SAMPLES_LEAF'] = int(os.getenv('MODEL_MIN_SAMPLES_LEAF', '2'))
+    app.config['MODEL_COMPRESS'] = int(os.getenv('MODEL_COMPRESS', '3'))
+    app.config['MODEL_MMAP_MODE'] = os.getenv('MODEL_MMAP_MODE') or None
+    # Share of actual sales the forecast bounds should contain (quantiles of each model's holdout residuals)
+    app.config['FORECAST_INTERVAL_COVERAGE'] = float(os.getenv('FORECAST_INTERVAL_COVERAGE', '0.8'))
+    # Longest horizon GET /api/forecast predicts on demand, and how many day predictions are memoized
+    app.config['FORECAST_MAX_HORIZON_DAYS'] = int(os.getenv('FORECAST_MAX_HORIZON_DAYS', '365'))
+    app.config['PREDICTION_MEMO_SIZE'] = int(os.getenv('PREDICTION_MEMO_SIZE', '200000'))
+    # GET /api/forecast/comparison: days of history by default and at most, and products per request
+    app.config['COMPARISON_DEFAULT_DAYS'] = int(os.getenv('COMPARISON_DEFAULT_DAYS', '28'))
+    app.config['COMPARISON_MAX_DAYS'] = int(os.getenv('COMPARISON_MAX_DAYS', '366'))
+    app.config['COMPARISON_MAX_PRODUCTS'] = int(os.getenv('COMPARISON_MAX_PRODUCTS', '100'))
+    app.config['FORECAST_UPSERT_BATCH_SIZE'] = int(os.getenv('FORECAST_UPSERT_BATCH_SIZE', '1000'))
+    app.config['IMPORT_CHUNK_SIZE'] = int(os.getenv('IMPORT_CHUNK_SIZE', '5000'))
+    # Forecast, comparison and series responses (see response_cache.py): memory, redis (shared, RESPONSE_CACHE_URL) or none
+    app.config['RESPONSE_CACHE_BACKEND'] = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+    if app.config['RESPONSE_CACHE_BACKEND'] not in RESPONSE_CACHE_BACKENDS:
+        raise ValueError(f"RESPONSE_CACHE_BACKEND must be one of {', '.join(RESPONSE_CACHE_BACKENDS)}")
+    app.config['RESPONSE_CACHE_URL'] = os.getenv('RESPONSE_CACHE_URL', 'redis://localhost:6379/0')
+    app.config['RESPONSE_CACHE_TTL_SECONDS'] = float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '300'))
+    app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1024'))
+    app.config['APP_ROLE'] = role or os.getenv('APP_ROLE', 'all')
+    if app.config['APP_ROLE'] not in APP_ROLES:
+        raise ValueError(f"APP_ROLE must be one of {', '.join(APP_ROLES)}, got '{app.config['APP_ROLE']}'")
+    # Background training jobs
+    app.config['JOB_RUNNER_ENABLED'] = os.getenv('JOB_RUNNER_ENABLED', 'true').lower() == 'true'
+    app.config['JOB_POLL_SECONDS'] = float(os.getenv('JOB_POLL_SECONDS', '5'))
+    app.config['JOB_STALE_SECONDS'] = int(os.getenv('JOB_STALE_SECONDS', '600'))
+    # Training scheduler (see scheduler.py); it only queues jobs, so it defaults to JOB_RUNNER_ENABLED
+    app.config['SCHEDULER_ENABLED'] = os.getenv('SCHEDULER_ENABLED', os.getenv('JOB_RUNNER_ENABLED', 'true')).lower() == 'true'
+    app.config['SCHEDULER_POLL_SECONDS'] = float(os.getenv('SCHEDULER_POLL_SECONDS', '60'))
+    app.config['SCHEDULER_RETRY_SECONDS'] = int(os.getenv('SCHEDULER_RETRY_SECONDS', '3600'))
+    app.config['SCHEDULER_LOCK_FILE'] = os.getenv('SCHEDULER_LOCK_FILE', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scheduler.lock'))
+    app.config['TRAIN_ON_STARTUP'] = os.getenv('TRAIN_ON_STARTUP', 'true').lower() == 'true'
 
     db.init_app(app)
     jwt.init_app(app)
@@ -39,34 +127,16 @@ def create_app() -> Flask:
 
     with app.app_context():
         db.create_all()
-        # Lightweight startup migration for 'sku' column and unique index (Postgres-safe, idempotent)
-        try:
-            from sqlalchemy import text
-            engine = db.get_engine()
-            with engine.begin() as conn:
-                # Ensure column exists (Postgres supports IF NOT EXISTS)
-                conn.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS sku varchar(100)"))
-                # Backfill values to satisfy NOT NULL constraint when newly added
-                conn.execute(text("UPDATE products SET sku = CONCAT('SKU-', id) WHERE sku IS NULL OR sku = ''"))
-                # Enforce NOT NULL (safe if already set)
-                conn.execute(text("ALTER TABLE products ALTER COLUMN sku SET NOT NULL"))
-                # Ensure unique index exists
-                conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_products_sku ON products (sku)"))
-                
-                # Add missing columns to forecasts table
-                conn.execute(text("ALTER TABLE forecasts ADD COLUMN IF NOT EXISTS lower_bound float"))
-                conn.execute(text("ALTER TABLE forecasts ADD COLUMN IF NOT EXISTS upper_bound float"))
-                conn.execute(text("ALTER TABLE forecasts ADD COLUMN IF NOT EXISTS forecast_date date"))
-        except Exception:
-            # Ignore on SQLite or non-Postgres engines
-            pass
+        # Schema changes to existing tables are versioned in app/migrations.py
+        run_migrations(db.engine)
+        ensure_versions()
 
-    # Start weekly scheduler once app is created (Flask 3 removed before_first_request)
-    start_scheduler()
-    
-    # Train model on startup if there's data in the database
-    from .training import train_now
-    with app.app_context():
-        train_now()
+    if background and app.config['APP_ROLE'] == 'all':
+        # Execute queued training jobs off the request path
+        if app.config['JOB_RUNNER_ENABLED']:
+            start_job_runner(app)
+        # Startup and weekly trainings are queued as jobs by whichever process holds the leader lock
+        if app.config['SCHEDULER_ENABLED']:
+            start_scheduler(app)
 
-    return app
\ No newline at end of file
+    return app
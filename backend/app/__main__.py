@@ -0,0 +1,60 @@
+"""Run one process role: python -m app [all|web|trainer|scheduler].
+
+The role defaults to APP_ROLE. web and all serve HTTP on PORT with the
+development server (production serves them with gunicorn wsgi:app);
+trainer executes queued training jobs and scheduler queues the startup
+and weekly trainings, each as the process's only, foreground loop.
+SIGTERM and SIGINT stop the trainer once its current job has finished.
+"""
+import argparse
+import logging
+import os
+import signal
+import threading
+from . import APP_ROLES, create_app
+
+logger = logging.getLogger(__name__)
+
+
+def _on_shutdown(callback) -> None:
+    def handler(signum, frame):
+        logger.info("Received signal %d, shutting down", signum)
+        callback()
+    signal.signal(signal.SIGTERM, handler)
+    signal.signal(signal.SIGINT, handler)
+
+
+def run_trainer(app) -> None:
+    from .jobs import _wakeup, run_job_runner
+
+    stop = threading.Event()
+
+    def shutdown():
+        stop.set()
+        _wakeup.set()
+    _on_shutdown(shutdown)
+    logger.info("Trainer %d waiting for training jobs", os.getpid())
+    run_job_runner(app, stop)
+
+
+def run_scheduler(app) -> None:
+    from .scheduler import Scheduler
+
+    scheduler = Scheduler(app)
+    _on_shutdown(scheduler.stop)
+    scheduler.run()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the web, trainer or scheduler process')
+    parser.add_argument('role', nargs='?', choices=APP_ROLES, default=None, help='defaults to APP_ROLE')
+    args = parser.parse_args()
+
+    app = create_app(role=args.role)
+    role = app.config['APP_ROLE']
+    if role == 'trainer':
+        run_trainer(app)
+    elif role == 'scheduler':
+        run_scheduler(app)
+    else:
+        app.run(host='0.0.0.0', port=int(os.getenv('PORT', '8000')))
@@ -0,0 +1,250 @@
+"""Rolling-origin backtests of the forecasting models.
+
+Every product's model is refitted at BACKTEST_ORIGINS forecast origins,
+BACKTEST_STEP_DAYS apart with the latest one scored up to yesterday (today
+is still incomplete), and compared over the BACKTEST_HORIZON_DAYS after
+each origin against the daily sales (days without sales count as zero).
+Products are evaluated in batches on the training process pool; every
+batch is scored with array operations over a (products, origins, horizon)
+block, reduced to a few sums per product so the catalog-wide figures are
+exact, not averages of ratios.
+Coverage is the share of actuals inside the prediction interval each
+refitted model gives at FORECAST_INTERVAL_COVERAGE, so it measures how
+well the intervals are calibrated.
+
+Per-product results are kept in `backtest_metrics`; the catalog WAPE is
+turned into ModelTraining.accuracy (1 - WAPE).
+"""
+import datetime as dt
+import logging
+import os
+from typing import Dict, List, Optional
+import numpy as np
+from flask import current_app
+from sqlalchemy import delete, insert
+from .extensions import db
+from .features import daily_totals
+from .forecasters import FORECASTERS, build_forecaster, dense_series, fit_with_residuals, select_forecaster
+from .global_model import LAG, build_panel, fit_global_model, forecast_panel
+from .models import BacktestMetric, ModelTraining, Product, ProductTrainingState
+from .training import _chunks, _run_training_batches, model_config
+from .training_data import load_sales_history
+
+logger = logging.getLogger(__name__)
+
+# Per-product sums a batch reports; metrics are ratios of these
+COMPONENTS = ('abs_error', 'actual', 'error', 'covered', 'days', 'ape', 'ape_days')
+
+# Product ids per DELETE when replacing metrics
+_DELETE_CHUNK = 10_000
+
+
+def forecast_origins(today: dt.date, n_origins: int, step_days: int, horizon: int) -> np.ndarray:
+    """Last known day of each backtest, newest first, as datetime64[D]."""
+    latest = np.datetime64(today, 'D') - 1 - horizon
+    return latest - step_days * np.arange(n_origins)
+
+
+def actuals(days: np.ndarray, y: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Daily quantities on the target days, zero where nothing was sold."""
+    series = dense_series(days, y)
+    offsets = (targets - days[0]).astype(np.int64)
+    inside = (offsets >= 0) & (offsets < series.size)
+    return np.where(inside, series[np.clip(offsets, 0, series.size - 1)], 0.0)
+
+
+def score(pred: np.ndarray, actual: np.ndarray, valid: np.ndarray,
+          lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """Reduce (products, origins, horizon) predictions and bounds to per-product COMPONENTS sums.
+
+    `valid` (products, origins) masks origins where a product had no model yet.
+    """
+    mask = np.broadcast_to(valid[:, :, None], pred.shape)
+    error = np.where(mask, pred - actual, 0.0)
+    actual = np.where(mask, actual, 0.0)
+    covered = mask & (actual >= lower) & (actual <= upper)
+    sold = mask & (actual > 0)
+    ape = np.where(sold, np.abs(error) / np.where(sold, actual, 1.0), 0.0)
+    sums = [np.abs(error), actual, error, covered, mask, ape, sold]
+    return np.stack([np.sum(a, axis=(1, 2), dtype=np.float64) for a in sums], axis=1)
+
+
+def metrics(components: np.ndarray) -> Dict[str, np.ndarray]:
+    """MAPE (days with sales), WAPE, bias (over/under-forecast share) and bound coverage; NaN when undefined."""
+    c = dict(zip(COMPONENTS, np.atleast_2d(components).T))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'mape': np.where(c['ape_days'] > 0, c['ape'] / c['ape_days'], np.nan),
+            'wape': np.where(c['actual'] > 0, c['abs_error'] / c['actual'], np.nan),
+            'bias': np.where(c['actual'] > 0, c['error'] / c['actual'], np.nan),
+            'coverage': np.where(c['days'] > 0, c['covered'] / c['days'], np.nan),
+        }
+
+
+def _backtest_product(history, model_type, origins, horizon, config, coverage):
+    days, y = daily_totals(history.dates, history.quantities)
+    targets = origins[:, None] + np.arange(1, horizon + 1)
+    pred, lower, upper = (np.zeros(targets.shape) for _ in range(3))
+    valid = np.zeros(len(origins), dtype=bool)
+    for i, origin in enumerate(origins):
+        known = days <= origin
+        if not known.any():
+            continue
+        if model_type in FORECASTERS:
+            # The scoring variant: forests are backtested with fewer trees, as in model selection;
+            # its residuals come from a holdout before the origin, like training's
+            model = build_forecaster(model_type, config['forest_params'], config['forest_min_history_days'])
+            model = fit_with_residuals(model.for_backtest(), days[known], y[known], config['holdout_days'])
+        else:
+            model = select_forecaster(days[known], y[known], **config).model
+        pred[i], lower[i], upper[i] = model.forecast_interval(targets[i], coverage)
+        valid[i] = True
+    return pred, actuals(days, y, targets), valid, lower, upper
+
+
+def _backtest_batch(batch, origins, horizon, config, coverage):
+    """Pool task: backtest a chunk of products; yields (product_id, model type, COMPONENTS row)."""
+    results = [_backtest_product(history, model_type, origins, horizon, config, coverage)
+               for _, history, model_type in batch]
+    components = score(*(np.stack(r) for r in zip(*results)))
+    return [(pid, model_type, row) for (pid, _, model_type), row in zip(batch, components)]
+
+
+def _backtest_global(tasks, prices, origins, horizon, max_iter, coverage, progress=None):
+    """Refit the global model at every origin and predict all products in one call per origin.
+
+    `progress` is called after every refit, which keeps a job's heartbeat alive
+    while no product is complete yet.
+    """
+    series = {pid: daily_totals(history.dates, history.quantities) for pid, history, _ in tasks}
+    index = {pid: i for i, pid in enumerate(series)}
+    pred, lower, upper = (np.zeros((len(series), len(origins), horizon)) for _ in range(3))
+    valid = np.zeros((len(series), len(origins)), dtype=bool)
+    for k, origin in enumerate(origins):
+        history_panel = build_panel(series, prices, origin.astype(object))
+        if not (history_panel.lengths > LAG).any():
+            # Nobody has a week of history yet at this origin
+            continue
+        model = fit_global_model(history_panel, max_iter=max_iter)
+        panel = build_panel(series, prices, origin.astype(object), extra_days=horizon)
+        rows = [index[pid] for pid in panel.product_ids.tolist()]
+        pred[rows, k] = forecast_panel(model, panel, horizon)
+        lower[rows, k], upper[rows, k] = model.interval(pred[rows, k], coverage)
+        valid[rows, k] = True
+        if progress:
+            progress(0, len(series))
+    targets = origins[:, None] + np.arange(1, horizon + 1)
+    actual = np.stack([actuals(days, y, targets) for days, y in series.values()])
+    components = score(pred, actual, valid, lower, upper)
+    return [(pid, 'global', row) for pid, row in zip(series, components)]
+
+
+def run_backtest(product_ids: Optional[List[int]] = None, progress=None,
+                 model_types: Optional[Dict[int, str]] = None) -> Optional[dict]:
+    """Backtest every product with enough sales, store per-product metrics and return the catalog summary.
+
+    `model_types` (product id -> forecaster) defaults to the ones recorded in
+    product_training_states. `progress` is called as products complete, which
+    also keeps a job's heartbeat alive. Returns None when no product could be
+    evaluated. The caller commits.
+    """
+    config = current_app.config
+    start_time = dt.datetime.now()
+    horizon = config.get('BACKTEST_HORIZON_DAYS', 7)
+    coverage = config.get('FORECAST_INTERVAL_COVERAGE', 0.8)
+    origins = forecast_origins(start_time.date(), config.get('BACKTEST_ORIGINS', 4),
+                               config.get('BACKTEST_STEP_DAYS', 7), horizon)
+
+    histories = load_sales_history(product_ids)
+    if model_types is None:
+        states = db.session.query(ProductTrainingState.product_id, ProductTrainingState.model_type)
+        if product_ids is not None:
+            states = states.filter(ProductTrainingState.product_id.in_(list(product_ids)))
+        model_types = dict(states.all())
+    # Same minimum as training: products it skips have no model to evaluate
+    tasks = [(pid, history, model_types.get(pid)) for pid, history in histories.items()
+             if int(history.sales_counts.sum()) >= 4]
+    if not tasks:
+        return None
+    logger.info("Backtesting %d products at %d origins, %d days each", len(tasks), len(origins), horizon)
+
+    if config.get('TRAINING_MODE', 'per_product') == 'global':
+        prices = dict(db.session.query(Product.id, Product.price))
+        results = _backtest_global(tasks, prices, origins, horizon, config.get('GLOBAL_MODEL_MAX_ITER', 200),
+                                   coverage, progress)
+    else:
+        batch_size = max(1, config.get('TRAINING_BATCH_SIZE', 50))
+        batches = list(_chunks(tasks, batch_size))
+        results = _run_training_batches(
+            batches,
+            deadline=start_time + dt.timedelta(seconds=config.get('BACKTEST_MAX_SECONDS', 1800)),
+            workers=max(1, min(config.get('TRAINING_WORKERS', os.cpu_count() or 1), len(batches))),
+            start_method=config.get('TRAINING_MP_START_METHOD', 'spawn'),
+            task=_backtest_batch,
+            origins=origins,
+            horizon=horizon,
+            config=model_config(config),
+            coverage=coverage,
+        )
+
+    evaluated, types, rows = [], [], []
+    if progress:
+        progress(0, len(tasks))
+    for pid, model_type, row in results:
+        evaluated.append(pid)
+        types.append(model_type)
+        rows.append(row)
+        if progress:
+            progress(len(evaluated), len(tasks))
+    if not evaluated:
+        logger.warning("Backtest time limit reached before any product was evaluated")
+        return None
+    components = np.stack(rows)
+    _store_metrics(evaluated, types, components, len(origins))
+
+    total = metrics(components.sum(axis=0))
+    summary = {name: (None if np.isnan(v[0]) else round(float(v[0]), 4)) for name, v in total.items()}
+    summary['accuracy'] = None if summary['wape'] is None else round(max(0.0, 1.0 - summary['wape']), 4)
+    summary['products'] = len(evaluated)
+    summary['seconds'] = round((dt.datetime.now() - start_time).total_seconds(), 2)
+    logger.info("Backtest: %s", summary)
+    return summary
+
+
+def _store_metrics(product_ids, model_types, components, n_origins) -> None:
+    per_product = metrics(components)
+    c = dict(zip(COMPONENTS, components.T))
+    now = dt.datetime.utcnow()
+
+    def value(v):
+        return None if np.isnan(v) else float(v)
+
+    rows = [
+        {
+            'product_id': pid,
+            'model_type': model_type,
+            'origins': n_origins,
+            'days': int(c['days'][i]),
+            'actual_total': float(c['actual'][i]),
+            'abs_error_total': float(c['abs_error'][i]),
+            'mape': value(per_product['mape'][i]),
+            'wape': value(per_product['wape'][i]),
+            'bias': value(per_product['bias'][i]),
+            'coverage': value(per_product['coverage'][i]),
+            'evaluated_at': now,
+        }
+        for i, (pid, model_type) in enumerate(zip(product_ids, model_types))
+    ]
+    for chunk in _chunks(list(product_ids), _DELETE_CHUNK):
+        db.session.execute(delete(BacktestMetric).where(BacktestMetric.product_id.in_(chunk)))
+    db.session.execute(insert(BacktestMetric), rows)
+
+
+def backtest_and_record(progress=None) -> Optional[dict]:
+    """Job entry point: backtest everything and store the accuracy on the latest training run."""
+    summary = run_backtest(progress=progress)
+    latest = ModelTraining.query.order_by(ModelTraining.id.desc()).first()
+    if summary and summary['accuracy'] is not None and latest is not None:
+        latest.accuracy = summary['accuracy']
+    db.session.commit()
+    return summary
@@ -0,0 +1,73 @@
+"""Array-backed storage and prediction for fitted random forests.
+
+A pickled RandomForestRegressor carries every tree as a Cython object whose
+node table (impurity, sample counts, per-node value arrays, ...) is copied
+into private memory on load, so memory-mapping the pickle shares nothing.
+CompactForest keeps only what prediction needs, as five flat NumPy arrays
+for the whole forest. joblib stores them as plain arrays: they compress
+well, and with mmap_mode='r' every worker process maps the same pages.
+"""
+from typing import Any
+import numpy as np
+
+
+class CompactForest:
+    """Read-only regression forest with the predict() of the forest it came from."""
+
+    def __init__(self, left: np.ndarray, right: np.ndarray, feature: np.ndarray,
+                 threshold: np.ndarray, value: np.ndarray, roots: np.ndarray,
+                 depth: int, n_features: int):
+        # Nodes of all trees are concatenated; children hold global node indices
+        # and leaves point at themselves, so a walk can run a fixed number of steps.
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.n_features = n_features
+
+    @classmethod
+    def from_sklearn(cls, forest: Any) -> 'CompactForest':
+        """Convert a fitted single-output RandomForestRegressor (or any bag of fitted trees)."""
+        trees = [est.tree_ for est in forest.estimators_]
+        sizes = np.array([tree.node_count for tree in trees], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        total = int(sizes.sum())
+        index_dtype = np.int32 if total < 2 ** 31 else np.int64
+
+        left = np.empty(total, dtype=index_dtype)
+        right = np.empty(total, dtype=index_dtype)
+        feature = np.zeros(total, dtype=np.int16)
+        threshold = np.empty(total, dtype=np.float64)
+        value = np.empty(total, dtype=np.float64)
+        for tree, offset, size in zip(trees, offsets, sizes):
+            nodes = slice(offset, offset + size)
+            own = np.arange(offset, offset + size)
+            leaf = tree.children_left < 0
+            left[nodes] = np.where(leaf, own, tree.children_left + offset)
+            right[nodes] = np.where(leaf, own, tree.children_right + offset)
+            feature[nodes] = np.where(leaf, 0, tree.feature)
+            threshold[nodes] = np.where(leaf, np.inf, tree.threshold)
+            value[nodes] = tree.value[:, 0, 0]
+        return cls(left, right, feature, threshold, value, offsets.astype(index_dtype),
+                   depth=max(tree.max_depth for tree in trees), n_features=forest.n_features_in_)
+
+    def predict(self, X) -> np.ndarray:
+        # Trees compare float32 features against float64 thresholds, as in scikit-learn
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])
+        nodes = np.repeat(self.roots[:, None], X.shape[0], axis=1)
+        for _ in range(self.depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes].mean(axis=0)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.left, self.right, self.feature, self.threshold, self.value, self.roots))
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
@@ -0,0 +1,49 @@
+from typing import Tuple
+import numpy as np
+
+
+# Column order of the matrix returned by calendar_features()
+FEATURE_COLUMNS = ('day_of_week', 'month', 'day', 'day_of_year', 'week', 'is_weekend', 'is_holiday')
+
+# Fixed-date public holidays as month * 100 + day
+HOLIDAYS = (101, 501, 1225)
+
+
+def daily_totals(dates: np.ndarray, quantities: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Aggregate raw sale timestamps into per-day totals.
+
+    Returns the sorted days (datetime64[D]) that have at least one sale and the
+    summed quantity of each, using np.bincount over day ordinals.
+    """
+    ordinals = np.asarray(dates).astype('datetime64[D]').astype(np.int64)
+    if ordinals.size == 0:
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+    first = ordinals.min()
+    offsets = ordinals - first
+    totals = np.bincount(offsets, weights=np.asarray(quantities, dtype=np.float64))
+    present = np.bincount(offsets) > 0
+    days = (np.flatnonzero(present) + first).astype('datetime64[D]')
+    return days, totals[present]
+
+
+def calendar_features(days: np.ndarray) -> np.ndarray:
+    """Build the calendar feature matrix (see FEATURE_COLUMNS) for datetime64 days."""
+    days = np.asarray(days, dtype='datetime64[D]')
+    ordinals = days.astype(np.int64)
+    # 1970-01-01 was a Thursday; shift so Monday == 0 like date.weekday()
+    day_of_week = (ordinals + 3) % 7
+    months = days.astype('datetime64[M]')
+    month = months.astype(np.int64) % 12 + 1
+    day = (days - months).astype(np.int64) + 1
+    day_of_year = (days - days.astype('datetime64[Y]')).astype(np.int64) + 1
+    # ISO week: position of the Thursday of the same week within its year
+    thursday = days + (3 - day_of_week).astype('timedelta64[D]')
+    week = (thursday - thursday.astype('datetime64[Y]')).astype(np.int64) // 7 + 1
+    is_weekend = (day_of_week >= 5).astype(np.int64)
+    is_holiday = np.isin(month * 100 + day, HOLIDAYS).astype(np.int64)
+    return np.column_stack((day_of_week, month, day, day_of_year, week, is_weekend, is_holiday))
+
+
+def future_days(today, horizon: int) -> np.ndarray:
+    """The `horizon` days following `today` as datetime64[D]."""
+    return np.datetime64(today, 'D') + np.arange(1, horizon + 1)
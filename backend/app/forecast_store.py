@@ -0,0 +1,59 @@
+from typing import Iterable, Optional
+from flask import current_app
+from .extensions import db
+from .models import Forecast
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Columns refreshed when a (product_id, forecast_date) row already exists
+_UPDATE_COLUMNS = ('predicted_quantity', 'lower_bound', 'upper_bound', 'interval_coverage', 'week_number', 'year')
+
+
+def _dialect_insert():
+    name = db.session.get_bind().dialect.name
+    if name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def upsert_forecasts(rows: Iterable[dict], batch_size: Optional[int] = None) -> int:
+    """Insert or update forecast rows keyed on (product_id, forecast_date).
+
+    Uses batched INSERT ... ON CONFLICT DO UPDATE on Postgres and SQLite so a
+    training run costs one statement per batch instead of a SELECT per row.
+    The caller owns the transaction and must commit.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    if batch_size is None:
+        batch_size = current_app.config.get('FORECAST_UPSERT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    batch_size = max(1, batch_size)
+
+    insert = _dialect_insert()
+    if insert is None:
+        # Other engines: fall back to the ORM merge path
+        for data in rows:
+            f = Forecast.query.filter_by(product_id=data['product_id'], forecast_date=data['forecast_date']).first()
+            if f:
+                for col in _UPDATE_COLUMNS:
+                    if col in data:
+                        setattr(f, col, data[col])
+            else:
+                db.session.add(Forecast(**data))
+        db.session.flush()
+        return len(rows)
+
+    for i in range(0, len(rows), batch_size):
+        stmt = insert(Forecast).values(rows[i:i + batch_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['product_id', 'forecast_date'],
+            set_={col: stmt.excluded[col] for col in _UPDATE_COLUMNS},
+        )
+        db.session.execute(stmt)
+    return len(rows)
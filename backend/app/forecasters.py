@@ -0,0 +1,282 @@
+"""Per-product daily forecasting models and the backtest that picks one.
+
+Every model fits on a product's daily totals (the days with sales and their
+summed quantity, see features.daily_totals) and forecasts arbitrary days.
+Most of the catalog has a few weeks of sparse history, where a seasonal
+profile, exponential smoothing or a ridge regression on calendar features
+is as accurate as a random forest and orders of magnitude cheaper to fit;
+the forest is only a candidate once a product has enough history for it.
+
+The fitted object is what gets saved, so it must stay small and picklable:
+only NumPy arrays and scalars, never the scikit-learn estimator. That also
+keeps scikit-learn and SciPy out of web processes: they are imported in
+fit(), and unpickling and predicting need neither. The object also carries
+the residuals (actual - predicted) of its holdout, which size the
+prediction intervals: their quantiles at the configured coverage are the
+bounds' offsets, so each product's band is as wide as its own errors were.
+"""
+from typing import Dict, Iterable, NamedTuple, Optional
+import numpy as np
+from .compact_forest import CompactForest
+from .features import FEATURE_COLUMNS, calendar_features
+
+_DAY_OF_WEEK = FEATURE_COLUMNS.index('day_of_week')
+_MONTH = FEATURE_COLUMNS.index('month')
+_HOLIDAY = FEATURE_COLUMNS.index('is_holiday')
+
+# Recent days whose in-sample residuals stand in for a holdout on histories too short to backtest
+IN_SAMPLE_RESIDUAL_DAYS = 56
+
+
+def dense_series(days: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Totals for every calendar day from the first to the last sale, zeros on days without sales."""
+    ordinals = days.astype(np.int64)
+    series = np.zeros(int(ordinals[-1] - ordinals[0]) + 1)
+    series[ordinals - ordinals[0]] = y
+    return series
+
+
+def interval_bounds(pred: np.ndarray, residuals: Optional[np.ndarray], coverage: float,
+                    scale: Optional[np.ndarray] = None):
+    """Lower and upper bounds of `pred` from quantiles of past residuals (actual - predicted).
+
+    The central `coverage` share of the residuals is added to the predictions,
+    multiplied by `scale` when the residuals were divided by it, and clipped
+    so that 0 <= lower <= pred <= upper. Without residuals (models saved
+    before intervals existed) the old fixed +/-20% band is returned.
+    """
+    pred = np.maximum(np.asarray(pred, dtype=np.float64), 0.0)
+    if residuals is None or len(residuals) == 0:
+        return pred * 0.8, pred * 1.2
+    # Split-conformal levels: quantiles of a small residual sample need to reach a little further
+    n = len(residuals)
+    level = min(1.0, (1.0 + coverage) / 2 * (n + 1) / n)
+    low, high = np.quantile(residuals, [1.0 - level, level])
+    if scale is not None:
+        low, high = low * scale, high * scale
+    return np.clip(pred + low, 0.0, pred), np.maximum(pred + high, pred)
+
+
+class Forecaster:
+    """Interface of the per-product models.
+
+    `min_history_days` is the shortest history (first to last sale day) the
+    model is considered for. `residuals` are set by select_forecaster (or
+    fit_with_residuals) after fitting.
+    """
+    name = ''
+    min_history_days = 1
+    residuals: Optional[np.ndarray] = None
+
+    def fit(self, days: np.ndarray, y: np.ndarray) -> 'Forecaster':
+        raise NotImplementedError
+
+    def forecast(self, days: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def forecast_interval(self, days: np.ndarray, coverage: float):
+        """Non-negative predictions of `days` with their lower and upper bounds."""
+        pred = np.maximum(self.forecast(days), 0.0)
+        return (pred, *interval_bounds(pred, self.residuals, coverage))
+
+    def for_backtest(self) -> 'Forecaster':
+        """An unfitted model to score on the holdout; may be a cheaper variant of this one."""
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        return sum(int(v.nbytes) for v in vars(self).values() if hasattr(v, 'nbytes'))
+
+
+class SeasonalNaive(Forecaster):
+    """Average of the same weekday over the last few weeks."""
+    name = 'seasonal_naive'
+    min_history_days = 14
+
+    def __init__(self, weeks: int = 4):
+        self.weeks = weeks
+
+    def fit(self, days, y):
+        series = dense_series(days, y)[-7 * self.weeks:]
+        last_dow = (int(days[-1].astype(np.int64)) + 3) % 7
+        # Weekday of every element, counting back from the last day
+        dows = (last_dow - np.arange(series.size)[::-1]) % 7
+        sums = np.bincount(dows, weights=series, minlength=7)
+        counts = np.bincount(dows, minlength=7)
+        self.profile = np.where(counts > 0, sums / np.maximum(counts, 1), series.mean())
+        return self
+
+    def forecast(self, days):
+        return self.profile[(np.asarray(days, dtype='datetime64[D]').astype(np.int64) + 3) % 7]
+
+
+class ExponentialSmoothing(Forecaster):
+    """Simple exponential smoothing; alpha is picked by in-sample one-step error."""
+    name = 'ses'
+    alphas = (0.05, 0.1, 0.2, 0.3, 0.5)
+
+    def fit(self, days, y):
+        from scipy.signal import lfilter
+        series = dense_series(days, y)
+        best = None
+        for alpha in self.alphas:
+            # level[t] = alpha * y[t] + (1 - alpha) * level[t - 1], starting from the first value
+            levels, _ = lfilter([alpha], [1, alpha - 1], series, zi=[(1 - alpha) * series[0]])
+            sse = float(np.sum((series[1:] - levels[:-1]) ** 2))
+            if best is None or sse < best[0]:
+                best = (sse, alpha, float(levels[-1]))
+        _, self.alpha, self.level = best
+        return self
+
+    def forecast(self, days):
+        return np.full(len(days), self.level)
+
+
+class CalendarRidge(Forecaster):
+    """Ridge regression on one-hot weekday and month plus the holiday flag."""
+    name = 'ridge'
+    min_history_days = 28
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+
+    @staticmethod
+    def _design(days):
+        features = calendar_features(days)
+        design = np.zeros((len(features), 20))
+        rows = np.arange(len(features))
+        design[rows, features[:, _DAY_OF_WEEK]] = 1
+        design[rows, 6 + features[:, _MONTH]] = 1
+        design[:, 19] = features[:, _HOLIDAY]
+        return design
+
+    def fit(self, days, y):
+        series = dense_series(days, y)
+        X = self._design(days[0] + np.arange(series.size))
+        X_mean, y_mean = X.mean(axis=0), series.mean()
+        Xc = X - X_mean
+        self.coef = np.linalg.solve(Xc.T @ Xc + self.alpha * np.eye(X.shape[1]), Xc.T @ (series - y_mean))
+        self.intercept = float(y_mean - X_mean @ self.coef)
+        return self
+
+    def forecast(self, days):
+        return self._design(days) @ self.coef + self.intercept
+
+
+class ForestForecaster(Forecaster):
+    """Random forest on calendar features of the days with sales, stored as a CompactForest."""
+    name = 'random_forest'
+
+    # Trees fitted to score the forest on the holdout; the ranking does not need the full ensemble
+    backtest_trees = 10
+
+    def __init__(self, min_history_days: int = 90, **forest_params):
+        self.min_history_days = min_history_days
+        self.forest_params = forest_params
+
+    def for_backtest(self):
+        trees = min(self.forest_params.get('n_estimators', 100), self.backtest_trees)
+        return ForestForecaster(self.min_history_days, **{**self.forest_params, 'n_estimators': trees})
+
+    def fit(self, days, y):
+        # n_jobs=1: parallelism comes from the process pool; threads inside a fit on a few hundred rows only add overhead
+        from sklearn.ensemble import RandomForestRegressor
+        forest = RandomForestRegressor(random_state=42, n_jobs=1, **self.forest_params)
+        forest.fit(calendar_features(days), y)
+        self.forest = CompactForest.from_sklearn(forest)
+        return self
+
+    def forecast(self, days):
+        return self.forest.predict(calendar_features(days))
+
+
+FORECASTERS = {cls.name: cls for cls in (SeasonalNaive, ExponentialSmoothing, CalendarRidge, ForestForecaster)}
+
+DEFAULT_MODELS = ('ses', 'seasonal_naive', 'ridge', 'random_forest')
+
+
+def build_forecaster(name: str, forest_params: Optional[dict] = None,
+                     forest_min_history_days: int = 90) -> Forecaster:
+    if name not in FORECASTERS:
+        raise ValueError(f"Unknown forecasting model '{name}', expected one of {', '.join(FORECASTERS)}")
+    if name == ForestForecaster.name:
+        return ForestForecaster(forest_min_history_days, **(forest_params or {}))
+    return FORECASTERS[name]()
+
+
+class Selection(NamedTuple):
+    model: Forecaster
+    # Mean absolute error per day over the holdout; None when the history was too short to backtest
+    holdout_mae: Optional[float]
+    holdout_errors: Dict[str, float]
+
+
+def _span(days) -> int:
+    return int(days[-1].astype(np.int64) - days[0].astype(np.int64)) + 1
+
+
+def _holdout_residuals(model: Forecaster, days, y, holdout_days: int) -> Optional[np.ndarray]:
+    """Residuals of `model` fitted without the last `holdout_days` days; None when too little is left."""
+    cutoff = days[-1] - np.timedelta64(holdout_days - 1, 'D')
+    train = days < cutoff
+    if not train.any() or _span(days[train]) < model.min_history_days:
+        return None
+    actual = dense_series(days, y)[-holdout_days:]
+    holdout = cutoff + np.arange(holdout_days)
+    return actual - np.maximum(model.for_backtest().fit(days[train], y[train]).forecast(holdout), 0.0)
+
+
+def _in_sample_residuals(model: Forecaster, days, y) -> np.ndarray:
+    # Optimistic, but the only errors a history too short for a holdout has
+    actual = dense_series(days, y)[-IN_SAMPLE_RESIDUAL_DAYS:]
+    fitted_days = days[-1] - np.arange(len(actual))[::-1]
+    return actual - np.maximum(model.forecast(fitted_days), 0.0)
+
+
+def fit_with_residuals(model: Forecaster, days, y, holdout_days: int = 14) -> Forecaster:
+    """Fit `model` on the whole history, with residuals from a holdout when the history allows one."""
+    residuals = _holdout_residuals(model, days, y, holdout_days) if _span(days) >= 2 * holdout_days else None
+    model.fit(days, y)
+    model.residuals = _in_sample_residuals(model, days, y) if residuals is None else residuals
+    return model
+
+
+def select_forecaster(days: np.ndarray, y: np.ndarray, models: Iterable[str] = DEFAULT_MODELS,
+                      holdout_days: int = 14, forest_params: Optional[dict] = None,
+                      forest_min_history_days: int = 90) -> Selection:
+    """Fit the model with the lowest holdout error on the product's full history.
+
+    Candidates are the `models` whose minimum history the product meets. Each
+    is fitted without the last `holdout_days` days and scored on them, days
+    without sales counting as zero. Histories shorter than two holdouts are
+    not backtested; the last eligible candidate (models are listed from
+    simplest to richest) is used. Ties go to the simpler model. The winner
+    keeps its holdout residuals (in-sample ones when nothing was backtested)
+    for its prediction intervals.
+    """
+    def build(name):
+        return build_forecaster(name, forest_params, forest_min_history_days)
+
+    def without_holdout(model):
+        model.fit(days, y)
+        model.residuals = _in_sample_residuals(model, days, y)
+        return Selection(model, None, {})
+
+    candidates = [build(name) for name in models]
+    span = _span(days)
+    eligible = [m for m in candidates if span >= m.min_history_days] or candidates[:1]
+    if len(eligible) == 1 or span < 2 * holdout_days:
+        return without_holdout(eligible[-1])
+
+    residuals = {}
+    for model in eligible:
+        r = _holdout_residuals(model, days, y, holdout_days)
+        if r is not None:
+            residuals[model.name] = r
+    if not residuals:
+        return without_holdout(eligible[-1])
+    errors = {name: float(np.abs(r).mean()) for name, r in residuals.items()}
+    best = min(errors, key=errors.get)
+    model = build(best).fit(days, y)
+    model.residuals = residuals[best]
+    return Selection(model, errors[best], errors)
@@ -0,0 +1,165 @@
+"""One gradient-boosted model for the whole catalog (TRAINING_MODE=global).
+
+Instead of a model per product, a single HistGradientBoostingRegressor is
+fitted on every product's daily series at once, with calendar features,
+the product's price and lag features of its own recent sales. Every lag
+looks at least LAG days back, so one predict() call covers the next LAG
+days of all products; longer horizons are predicted block by block, each
+block feeding its predictions to the lags of the next.
+
+Series live in a flat Panel: each product's days, from its first sale to
+the forecast origin with zeros on days without sales, are concatenated and
+addressed by segment offsets, so lags and rolling means are NumPy indexing
+over the whole catalog.
+
+Prediction intervals come from residuals pooled over the catalog, divided
+by the square root of the prediction (Poisson-like counts spread with
+their level), so one set of quantiles sizes the bands of slow and fast
+sellers alike.
+
+Unlike the per-product models, the saved GlobalModel wraps the
+scikit-learn estimator itself, so the process that serves global
+forecasts imports scikit-learn when it first loads the model.
+"""
+import datetime as dt
+from typing import Dict, NamedTuple, Optional, Tuple
+import numpy as np
+from .features import FEATURE_COLUMNS, calendar_features
+from .forecasters import interval_bounds
+
+# Shortest lag of every feature, and so the number of days one predict() covers
+LAG = 7
+
+GLOBAL_FEATURE_COLUMNS = FEATURE_COLUMNS + ('price', 'lag_7', 'lag_14', 'mean_7', 'mean_28')
+
+# Training rows whose residuals size the intervals; a random sample past this
+RESIDUAL_SAMPLE_ROWS = 100_000
+
+
+class Panel(NamedTuple):
+    product_ids: np.ndarray  # int64, one per segment
+    first_days: np.ndarray   # datetime64[D], first day of each segment
+    starts: np.ndarray       # int64, offset of each segment in `values`
+    lengths: np.ndarray      # int64, days in each segment
+    prices: np.ndarray       # float64, one per segment
+    values: np.ndarray       # float64, daily quantities of all segments back to back; NaN until predicted
+
+
+def build_panel(series: Dict[int, Tuple[np.ndarray, np.ndarray]], prices: Dict[int, float],
+                end: dt.date, extra_days: int = 0) -> Panel:
+    """Lay out each product's daily totals (days with sales, quantities) up to `end`.
+
+    `extra_days` NaN days are appended after `end` for forecasting.
+    """
+    end = np.datetime64(end, 'D')
+    product_ids, first_days, chunks = [], [], []
+    for pid, (days, totals) in series.items():
+        known = days <= end
+        days, totals = days[known], totals[known]
+        if days.size == 0:
+            continue
+        n = int((end - days[0]).astype(np.int64)) + 1
+        chunk = np.zeros(n + extra_days)
+        chunk[(days - days[0]).astype(np.int64)] = totals
+        chunk[n:] = np.nan
+        product_ids.append(pid)
+        first_days.append(days[0])
+        chunks.append(chunk)
+    lengths = np.array([len(c) for c in chunks], dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    return Panel(
+        np.array(product_ids, dtype=np.int64),
+        np.array(first_days, dtype='datetime64[D]'),
+        starts,
+        lengths,
+        np.array([prices.get(pid, 0.0) for pid in product_ids], dtype=np.float64),
+        np.concatenate(chunks) if chunks else np.zeros(0),
+    )
+
+
+def _segments(panel: Panel, positions: np.ndarray) -> np.ndarray:
+    return np.searchsorted(panel.starts, positions, side='right') - 1
+
+
+def panel_features(panel: Panel, positions: np.ndarray) -> np.ndarray:
+    """Feature matrix (GLOBAL_FEATURE_COLUMNS) of the given flat positions.
+
+    Lags reaching back before a product's first sale are NaN, which the
+    gradient-boosting model treats as missing.
+    """
+    seg = _segments(panel, positions)
+    first = panel.starts[seg]
+    days = panel.first_days[seg] + (positions - first)
+    csum = np.concatenate(([0.0], np.cumsum(np.nan_to_num(panel.values))))
+
+    def lag(k):
+        idx = positions - k
+        return np.where(idx >= first, panel.values[np.maximum(idx, 0)], np.nan)
+
+    def window_mean(size):
+        # Mean of the `size` days ending LAG days back, over the days the product existed
+        hi = positions - LAG
+        lo = np.maximum(hi - size + 1, first)
+        count = hi - lo + 1
+        total = csum[np.maximum(hi + 1, 0)] - csum[np.maximum(lo, 0)]
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+    return np.column_stack((
+        calendar_features(days), panel.prices[seg],
+        lag(LAG), lag(2 * LAG), window_mean(7), window_mean(28),
+    ))
+
+
+def training_rows(panel: Panel) -> Tuple[np.ndarray, np.ndarray]:
+    """Features and targets of every known day with at least LAG days of history before it."""
+    offsets = np.arange(len(panel.values)) - np.repeat(panel.starts, panel.lengths)
+    positions = np.flatnonzero((offsets >= LAG) & ~np.isnan(panel.values))
+    return panel_features(panel, positions), panel.values[positions]
+
+
+def _residual_scale(pred: np.ndarray) -> np.ndarray:
+    return np.sqrt(np.maximum(pred, 1.0))
+
+
+class GlobalModel:
+    """The fitted HistGradientBoostingRegressor and its scaled residuals (see module docstring)."""
+
+    def __init__(self, estimator, residuals: Optional[np.ndarray]):
+        self.estimator = estimator
+        self.residuals = residuals
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.estimator.predict(X)
+
+    def interval(self, pred: np.ndarray, coverage: float):
+        """Lower and upper bounds of predictions made by this model."""
+        pred = np.maximum(pred, 0.0)
+        return interval_bounds(pred, self.residuals, coverage, scale=_residual_scale(pred))
+
+
+def fit_global_model(panel: Panel, max_iter: int = 200) -> GlobalModel:
+    # Imported here, not at module level: web processes import this module for build_panel/forecast_panel
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    X, y = training_rows(panel)
+    # Poisson loss: non-negative counts, most of them small
+    estimator = HistGradientBoostingRegressor(loss='poisson', max_iter=max_iter, random_state=42)
+    estimator.fit(X, y)
+    # In-sample residuals: slightly optimistic, but one shared model over the catalog overfits little
+    if len(y) > RESIDUAL_SAMPLE_ROWS:
+        rows = np.random.default_rng(42).choice(len(y), RESIDUAL_SAMPLE_ROWS, replace=False)
+        X, y = X[rows], y[rows]
+    pred = np.maximum(estimator.predict(X), 0.0)
+    return GlobalModel(estimator, (y - pred) / _residual_scale(pred))
+
+
+def forecast_panel(model, panel: Panel, horizon: int) -> np.ndarray:
+    """Predict the `horizon` NaN days at the end of every segment; returns (products, horizon).
+
+    Fills `panel.values` in place, LAG days per predict() call.
+    """
+    ends = panel.starts + panel.lengths - horizon
+    for block in range(0, horizon, LAG):
+        steps = np.arange(block, min(block + LAG, horizon))
+        positions = (ends[:, None] + steps[None, :]).ravel()
+        panel.values[positions] = np.maximum(model.predict(panel_features(panel, positions)), 0.0)
+    return panel.values[ends[:, None] + np.arange(horizon)[None, :]]
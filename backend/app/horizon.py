@@ -0,0 +1,162 @@
+"""On-demand daily predictions for days training did not precompute.
+
+Training stores a short horizon per product; longer horizons are predicted
+at request time from the cached model (see model_registry) with one batched
+predict() over the missing days. Results are memoized per (product, model
+version, day), so repeated requests and overlapping horizons only pay for
+new days, and a retrained model never serves stale values. With
+TRAINING_MODE=global the catalog-wide model predicts from the product's
+recent daily sales and price instead (see global_model), so its memo key
+also holds the forecast origin and the 'sales' and 'products' data
+versions (see response_cache). Bounds come from the
+model's residuals at FORECAST_INTERVAL_COVERAGE, like the stored forecasts;
+models saved before intervals existed keep the fixed +/-20% band.
+"""
+import threading
+import datetime as dt
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from flask import current_app
+from .extensions import db
+from .features import calendar_features
+from .forecasters import interval_bounds
+from .global_model import LAG, build_panel, forecast_panel
+from .model_registry import get_registry
+from .models import DailySales, Product
+from .response_cache import current_versions
+
+
+DEFAULT_MEMO_SIZE = 200_000
+
+# (predicted, lower, upper, interval coverage or None for the fixed band) for one day
+Prediction = Tuple[float, float, float, Optional[float]]
+
+
+class PredictionMemo:
+    """Bounded LRU of (product_id, model version, day) -> Prediction."""
+
+    def __init__(self, max_entries: int = DEFAULT_MEMO_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get_many(self, keys) -> Dict[tuple, Prediction]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = value
+        return found
+
+    def put_many(self, items: Dict[tuple, Prediction]) -> None:
+        with self._lock:
+            self._entries.update(items)
+            for key in items:
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def get_memo() -> PredictionMemo:
+    app = current_app._get_current_object()
+    memo = app.extensions.get('prediction_memo')
+    if memo is None:
+        memo = app.extensions.setdefault(
+            'prediction_memo', PredictionMemo(app.config.get('PREDICTION_MEMO_SIZE', DEFAULT_MEMO_SIZE))
+        )
+    return memo
+
+
+# Days of sales before the forecast origin the global model's features read (lag 14, 28-day mean at lag 7)
+_GLOBAL_LOOKBACK_DAYS = LAG + 28
+
+
+def _global_forecast(model, product_id: int, days: np.ndarray) -> Optional[np.ndarray]:
+    """Predict future days for one product from its recent daily sales; None without sales."""
+    today = dt.datetime.now().date()
+    window_start = today - dt.timedelta(days=_GLOBAL_LOOKBACK_DAYS)
+    rows = db.session.execute(
+        db.select(DailySales.day, DailySales.quantity)
+        .where(DailySales.product_id == product_id, DailySales.day >= window_start, DailySales.day <= today)
+        .order_by(DailySales.day)
+    ).all()
+    older = db.session.execute(
+        db.select(DailySales.day).where(DailySales.product_id == product_id, DailySales.day < window_start).limit(1)
+    ).first()
+    if not rows and older is None:
+        return None
+    series_days = [day for day, _ in rows]
+    quantities = [float(qty) for _, qty in rows]
+    if older is not None and (not rows or rows[0][0] != window_start):
+        # A product that existed before the window has zeros, not missing values, on its first days
+        series_days.insert(0, window_start)
+        quantities.insert(0, 0.0)
+    price = db.session.execute(db.select(Product.price).where(Product.id == product_id)).scalar() or 0.0
+
+    horizon = max(1, int((days.max() - np.datetime64(today, 'D')).astype(np.int64)))
+    panel = build_panel(
+        {product_id: (np.array(series_days, dtype='datetime64[D]'), np.array(quantities))},
+        {product_id: price}, today, extra_days=horizon,
+    )
+    preds = forecast_panel(model, panel, horizon)[0]
+    # Days up to today are not forecast; they get zero like a product without history
+    offsets = (days - np.datetime64(today, 'D')).astype(np.int64) - 1
+    return np.where(offsets >= 0, preds[np.clip(offsets, 0, horizon - 1)], 0.0)
+
+
+def predict_days(product_id: int, days: Iterable[dt.date]) -> Optional[Dict[dt.date, Prediction]]:
+    """Predict the given days with the product's current daily model.
+
+    Returns None when the product has no trained model yet.
+    """
+    days = list(days)
+    global_mode = current_app.config.get('TRAINING_MODE') == 'global'
+    loaded = get_registry().get(None, 'global') if global_mode else get_registry().get(product_id, 'daily')
+    if loaded is None:
+        return None
+    if not days:
+        return {}
+
+    memo = get_memo()
+    version = loaded.version
+    if global_mode:
+        # Lag features come from sales up to today and the product's price
+        version = (version, dt.datetime.now().date(), current_versions(('sales', 'products')))
+    keys = [(product_id, version, day) for day in days]
+    found = memo.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        missing_days = np.array([key[2] for key in missing], dtype='datetime64[D]')
+        model = loaded.model
+        coverage = current_app.config.get('FORECAST_INTERVAL_COVERAGE', 0.8)
+        if global_mode:
+            preds = _global_forecast(model, product_id, missing_days)
+            if preds is None:
+                return None
+            preds = np.maximum(preds, 0.0)
+            if hasattr(model, 'interval'):
+                lower, upper = model.interval(preds, coverage)
+            else:
+                # A bare regressor saved before global models kept their residuals
+                lower, upper = interval_bounds(preds, None, coverage)
+        elif hasattr(model, 'forecast'):
+            preds, lower, upper = model.forecast_interval(missing_days, coverage)
+        else:
+            # Bare forests saved before per-product model selection
+            preds = np.maximum(model.predict(calendar_features(missing_days)), 0.0)
+            lower, upper = interval_bounds(preds, None, coverage)
+        if getattr(model, 'residuals', None) is None:
+            coverage = None
+        computed = {
+            key: (float(pred), float(low), float(high), coverage)
+            for key, pred, low, high in zip(missing, preds, lower, upper)
+        }
+        memo.put_many(computed)
+        found.update(computed)
+    return {key[2]: found[key] for key in keys}
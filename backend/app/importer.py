@@ -0,0 +1,223 @@
+import csv
+import io
+import time
+import datetime as dt
+from typing import IO, Iterator, List, Optional
+from flask import current_app
+from .extensions import db
+from .models import Product, Sale
+from .rollup import apply_sales
+
+
+DEFAULT_CHUNK_SIZE = 5000
+# How many rejected rows are echoed back with their reason
+MAX_REJECTED_SAMPLES = 20
+
+
+def _parse_date(value: str) -> Optional[dt.datetime]:
+    try:
+        return dt.datetime.fromisoformat(value)
+    except Exception:
+        # try common alternative formats
+        try:
+            return dt.datetime.strptime(value, '%Y-%m-%d')
+        except Exception:
+            return None
+
+
+def _read_chunks(reader, size: int) -> Iterator[List[list]]:
+    chunk = []
+    for row in reader:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _Catalog:
+    """In-memory sku -> product state for the duration of one import.
+
+    Loaded with a single query so rows never look products up one by one;
+    stock changes are applied in memory and written back once per product.
+    """
+
+    def __init__(self):
+        self.by_sku = {
+            sku: {'id': pid, 'name': name, 'price': price, 'stock': stock or 0}
+            for pid, sku, name, price, stock in db.session.query(
+                Product.id, Product.sku, Product.name, Product.price, Product.stock
+            )
+        }
+        self.new_skus = []     # created in this import, not inserted yet
+        self.dirty = set()     # existing skus whose name/price/stock changed
+
+    def get(self, sku):
+        return self.by_sku.get(sku)
+
+    def create(self, sku, name, price, stock):
+        product = {'id': None, 'name': name, 'price': price, 'stock': stock}
+        self.by_sku[sku] = product
+        self.new_skus.append(sku)
+        return product
+
+    def touch(self, sku):
+        if self.by_sku[sku]['id'] is not None:
+            self.dirty.add(sku)
+
+    def insert_new(self) -> int:
+        """Insert products created since the last call and resolve their ids."""
+        if not self.new_skus:
+            return 0
+        rows = [
+            {'sku': sku, 'name': self.by_sku[sku]['name'], 'price': self.by_sku[sku]['price'], 'stock': self.by_sku[sku]['stock']}
+            for sku in self.new_skus
+        ]
+        result = db.session.execute(db.insert(Product).returning(Product.id, Product.sku), rows)
+        for pid, sku in result:
+            self.by_sku[sku]['id'] = pid
+        count = len(self.new_skus)
+        self.new_skus = []
+        return count
+
+    def write_back(self, created_skus) -> int:
+        """Persist final name/price/stock of every product this import changed, in one executemany."""
+        created = set(created_skus)
+        skus = self.dirty | created
+        rows = [
+            {'id': self.by_sku[sku]['id'], 'name': self.by_sku[sku]['name'],
+             'price': self.by_sku[sku]['price'], 'stock': self.by_sku[sku]['stock']}
+            for sku in skus
+        ]
+        if rows:
+            db.session.execute(db.update(Product), rows)
+        return len(self.dirty - created)
+
+
+def _insert_sales(rows: List[dict]) -> None:
+    if rows:
+        db.session.execute(db.insert(Sale), rows)
+        apply_sales((r['product_id'], r['sale_date'], r['quantity'], r['total_price']) for r in rows)
+
+
+def import_csv(stream: IO[bytes], chunk_size: Optional[int] = None) -> dict:
+    """Stream a product/sales CSV into the database.
+
+    Accepts the admin upload format (headers, case-insensitive):
+    - product rows: name, sku, product price, stock
+    - sales rows: name, sku, product price, stock, quantity sale, date of sale
+
+    The upload is decoded incrementally and processed in chunks; sales are
+    inserted with one executemany per chunk and stock is written back once
+    per product at the end. The caller commits.
+    """
+    if chunk_size is None:
+        chunk_size = current_app.config.get('IMPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    started = time.perf_counter()
+
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None) or []
+        columns = {(name or '').strip().lower(): i for i, name in enumerate(header)}
+        has_sales_columns = 'quantity sale' in columns and 'date of sale' in columns
+        has_product_columns = all(c in columns for c in ('name', 'sku', 'product price'))
+
+        catalog = _Catalog()
+        created_skus = []
+        touched_product_ids = set()
+        stats = {'rows': 0, 'inserted_products': 0, 'inserted_sales': 0, 'rejected_rows': 0}
+        rejected = []
+
+        def reject(line, reason):
+            stats['rejected_rows'] += 1
+            if len(rejected) < MAX_REJECTED_SAMPLES:
+                rejected.append({'line': line, 'reason': reason})
+
+        def field(row, name):
+            i = columns.get(name)
+            return row[i].strip() if i is not None and i < len(row) and row[i] else ''
+
+        line = 1
+        for chunk in _read_chunks(reader, max(1, chunk_size)):
+            pending_sales = []  # (sku, quantity, sale_date, total_price)
+            for row in chunk:
+                line += 1
+                stats['rows'] += 1
+                if not has_product_columns:
+                    reject(line, 'unknown row type')
+                    continue
+                name = field(row, 'name')
+                sku = field(row, 'sku')
+                qty_raw = field(row, 'quantity sale') if has_sales_columns else ''
+                try:
+                    price = float(field(row, 'product price') or 0)
+                    stock = int(field(row, 'stock') or 0)
+                    qty = int(qty_raw or 0)
+                except ValueError:
+                    reject(line, 'invalid number')
+                    continue
+                if not sku:
+                    reject(line, 'missing sku')
+                    continue
+
+                # Product upsert row
+                if 'stock' in columns and not qty_raw:
+                    product = catalog.get(sku)
+                    if product:
+                        product['name'] = name or product['name']
+                        product['price'] = price if price else product['price']
+                        product['stock'] = stock
+                        catalog.touch(sku)
+                    else:
+                        catalog.create(sku, name, price, stock)
+                        created_skus.append(sku)
+                    continue
+
+                # Sales row
+                if not has_sales_columns:
+                    reject(line, 'unknown row type')
+                    continue
+                sale_date = _parse_date(field(row, 'date of sale'))
+                if sale_date is None:
+                    reject(line, 'invalid date of sale')
+                    continue
+                product = catalog.get(sku)
+                if not product:
+                    product = catalog.create(sku, name or sku, price, stock)
+                    created_skus.append(sku)
+                if product['stock'] < qty:
+                    # allow oversell? For now, cap to available stock
+                    qty = max(0, product['stock'])
+                if qty <= 0:
+                    reject(line, 'no stock left' if product['stock'] <= 0 else 'quantity must be positive')
+                    continue
+                product['stock'] -= qty
+                catalog.touch(sku)
+                pending_sales.append((sku, qty, sale_date, product['price'] * qty))
+
+            stats['inserted_products'] += catalog.insert_new()
+            sale_rows = []
+            for sku, qty, sale_date, total_price in pending_sales:
+                product_id = catalog.get(sku)['id']
+                touched_product_ids.add(product_id)
+                iso = sale_date.isocalendar()
+                sale_rows.append({
+                    'product_id': product_id, 'quantity': qty, 'total_price': total_price,
+                    'sale_date': sale_date, 'week_number': iso[1], 'year': sale_date.year,
+                })
+            _insert_sales(sale_rows)
+            stats['inserted_sales'] += len(sale_rows)
+
+        stats['updated_products'] = catalog.write_back(created_skus)
+    finally:
+        # Do not let the wrapper close the request's underlying stream
+        text.detach()
+
+    elapsed = time.perf_counter() - started
+    stats['elapsed_seconds'] = round(elapsed, 3)
+    stats['rows_per_second'] = round(stats['rows'] / elapsed, 1) if elapsed > 0 else None
+    stats['rejected'] = rejected
+    stats['touched_product_ids'] = sorted(touched_product_ids)
+    return stats
@@ -0,0 +1,259 @@
+"""Bulk sales ingestion for large POS dumps.
+
+Rows are validated in Python, loaded into a temporary staging table
+(`COPY ... FROM STDIN` on Postgres/psycopg2, batched inserts elsewhere) and
+merged into `sales` with set-based SQL: missing products are created, each
+sale is capped to the stock left for its product, week_number/year are
+computed by the database and stock is decremented once per product.
+
+Usage: python -m app.ingest sales.csv [--chunk-size N]
+"""
+from __future__ import annotations
+import argparse
+import csv
+import io
+import time
+import datetime as dt
+from typing import IO, List, Optional
+from flask import current_app
+from sqlalchemy import Column, DateTime, Float, Index, Integer, MetaData, String, Table, func, select, text
+from .extensions import db
+from .importer import DEFAULT_CHUNK_SIZE, MAX_REJECTED_SAMPLES, _parse_date, _read_chunks
+from .rollup import apply_aggregated
+
+
+_staging_metadata = MetaData()
+
+# Temporary tables live on the session's connection only and never clash between imports
+sales_staging = Table(
+    'sales_staging', _staging_metadata,
+    Column('line', Integer, nullable=False),
+    Column('sku', String(100), nullable=False),
+    Column('name', String(100), nullable=False),
+    Column('price', Float, nullable=False),
+    Column('stock', Integer, nullable=False),
+    Column('quantity', Integer, nullable=False),
+    Column('sale_date', DateTime, nullable=False),
+    prefixes=['TEMPORARY'],
+)
+
+sales_allocated = Table(
+    'sales_allocated', _staging_metadata,
+    Column('line', Integer, nullable=False),
+    Column('product_id', Integer, nullable=False),
+    Column('price', Float, nullable=False),
+    Column('quantity', Integer, nullable=False),
+    Column('sale_date', DateTime, nullable=False),
+    # The stock adjustment sums allocations per product
+    Index('ix_sales_allocated_product', 'product_id'),
+    prefixes=['TEMPORARY'],
+)
+
+_STAGING_COLUMNS = ('line', 'sku', 'name', 'price', 'stock', 'quantity', 'sale_date')
+
+# A product is created from the first staged row that mentions its SKU
+_CREATE_PRODUCTS = """
+INSERT INTO products (sku, name, price, stock, created_at, updated_at)
+SELECT s.sku, s.name, s.price, s.stock, :now, :now
+FROM sales_staging s
+WHERE s.line IN (SELECT MIN(line) FROM sales_staging GROUP BY sku)
+  AND NOT EXISTS (SELECT 1 FROM products p WHERE p.sku = s.sku)
+"""
+
+# Same capping as the row-by-row importer: a sale takes what is left after the
+# earlier rows of the file, so `available` is stock minus the running total before it
+_ALLOCATE = """
+INSERT INTO sales_allocated (line, product_id, price, quantity, sale_date)
+SELECT line, product_id, price,
+       CASE WHEN available <= 0 THEN 0 WHEN quantity < available THEN quantity ELSE available END,
+       sale_date
+FROM (
+    SELECT s.line, p.id AS product_id, p.price, s.quantity, s.sale_date,
+           COALESCE(p.stock, 0) - COALESCE(SUM(s.quantity) OVER (
+               PARTITION BY p.id ORDER BY s.line ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+           ), 0) AS available
+    FROM sales_staging s JOIN products p ON p.sku = s.sku
+) ranked
+"""
+
+_INSERT_SALES = """
+INSERT INTO sales (product_id, quantity, total_price, sale_date, week_number, year)
+SELECT product_id, quantity, price * quantity, sale_date, {week}, {year}
+FROM sales_allocated
+WHERE quantity > 0
+ORDER BY line
+"""
+
+_ADJUST_STOCK = """
+UPDATE products
+SET stock = COALESCE(stock, 0) - (SELECT SUM(a.quantity) FROM sales_allocated a WHERE a.product_id = products.id),
+    updated_at = :now
+WHERE id IN (SELECT product_id FROM sales_allocated WHERE quantity > 0)
+"""
+
+# ISO week and calendar year, matching Sale rows created by the API and the importer
+_DATE_PARTS = {
+    'postgresql': ("CAST(EXTRACT(WEEK FROM sale_date) AS INTEGER)", "CAST(EXTRACT(YEAR FROM sale_date) AS INTEGER)"),
+    # SQLite has no ISO week; count weeks from the Thursday of the sale's week
+    'sqlite': (
+        "CAST((strftime('%j', date(sale_date, '-3 days', 'weekday 4')) - 1) / 7 + 1 AS INTEGER)",
+        "CAST(strftime('%Y', sale_date) AS INTEGER)",
+    ),
+}
+
+
+def _validate(row, field, line) -> tuple:
+    """Return (staging row, None) or (None, rejection reason)."""
+    sku = field(row, 'sku')
+    qty_raw = field(row, 'quantity sale')
+    if not qty_raw:
+        return None, 'not a sales row'
+    try:
+        price = float(field(row, 'product price') or 0)
+        stock = int(field(row, 'stock') or 0)
+        qty = int(qty_raw)
+    except ValueError:
+        return None, 'invalid number'
+    if not sku:
+        return None, 'missing sku'
+    if qty <= 0:
+        return None, 'quantity must be positive'
+    sale_date = _parse_date(field(row, 'date of sale'))
+    if sale_date is None:
+        return None, 'invalid date of sale'
+    return {
+        'line': line, 'sku': sku, 'name': field(row, 'name') or sku,
+        'price': price, 'stock': stock, 'quantity': qty, 'sale_date': sale_date,
+    }, None
+
+
+def _copy_rows(conn, rows: List[dict]) -> None:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([row[c].isoformat(sep=' ') if c == 'sale_date' else row[c] for c in _STAGING_COLUMNS])
+    buf.seek(0)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY sales_staging ({', '.join(_STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+    finally:
+        cursor.close()
+
+
+def _uses_copy(conn) -> bool:
+    return conn.dialect.name == 'postgresql' and conn.dialect.driver == 'psycopg2'
+
+
+def ingest_sales_csv(stream: IO[bytes], chunk_size: Optional[int] = None) -> dict:
+    """Bulk-load a sales CSV (admin upload format, sales rows only).
+
+    Returns the same counters as `import_csv` plus the load method and
+    per-phase timings. The caller commits.
+    """
+    if chunk_size is None:
+        chunk_size = current_app.config.get('IMPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    started = time.perf_counter()
+    conn = db.session.connection()
+    use_copy = _uses_copy(conn)
+    week_expr, year_expr = _DATE_PARTS.get(conn.dialect.name, _DATE_PARTS['postgresql'])
+
+    for table in (sales_staging, sales_allocated):
+        table.drop(conn, checkfirst=True)
+        table.create(conn)
+
+    stats = {'rows': 0, 'inserted_products': 0, 'inserted_sales': 0, 'rejected_rows': 0}
+    rejected = []
+
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text_stream)
+        header = next(reader, None) or []
+        columns = {(name or '').strip().lower(): i for i, name in enumerate(header)}
+
+        def field(row, name):
+            i = columns.get(name)
+            return row[i].strip() if i is not None and i < len(row) and row[i] else ''
+
+        line = 1
+        for chunk in _read_chunks(reader, max(1, chunk_size)):
+            staged = []
+            for row in chunk:
+                line += 1
+                stats['rows'] += 1
+                record, reason = _validate(row, field, line)
+                if reason:
+                    stats['rejected_rows'] += 1
+                    if len(rejected) < MAX_REJECTED_SAMPLES:
+                        rejected.append({'line': line, 'reason': reason})
+                    continue
+                staged.append(record)
+            if not staged:
+                continue
+            if use_copy:
+                _copy_rows(conn, staged)
+            else:
+                conn.execute(sales_staging.insert(), staged)
+    finally:
+        # Do not let the wrapper close the request's underlying stream
+        text_stream.detach()
+    loaded = time.perf_counter()
+
+    now = dt.datetime.utcnow()
+    stats['inserted_products'] = conn.execute(text(_CREATE_PRODUCTS), {'now': now}).rowcount
+    conn.execute(text(_ALLOCATE))
+    stats['inserted_sales'] = conn.execute(text(_INSERT_SALES.format(week=week_expr, year=year_expr))).rowcount
+    conn.execute(text(_ADJUST_STOCK), {'now': now})
+    day = func.date(sales_allocated.c.sale_date)
+    apply_aggregated(
+        select(
+            sales_allocated.c.product_id, day, func.sum(sales_allocated.c.quantity),
+            func.sum(sales_allocated.c.price * sales_allocated.c.quantity), func.count(),
+        )
+        .where(sales_allocated.c.quantity > 0)
+        .group_by(sales_allocated.c.product_id, day)
+    )
+
+    stats['rejected_rows'] += conn.execute(text("SELECT COUNT(*) FROM sales_allocated WHERE quantity = 0")).scalar()
+    out_of_stock = conn.execute(
+        text("SELECT line FROM sales_allocated WHERE quantity = 0 ORDER BY line LIMIT :n"), {'n': MAX_REJECTED_SAMPLES}
+    ).scalars().all()
+    rejected.extend({'line': n, 'reason': 'no stock left'} for n in out_of_stock)
+    touched_product_ids = conn.execute(
+        text("SELECT DISTINCT product_id FROM sales_allocated WHERE quantity > 0 ORDER BY product_id")
+    ).scalars().all()
+
+    for table in (sales_allocated, sales_staging):
+        table.drop(conn)
+
+    elapsed = time.perf_counter() - started
+    stats['method'] = 'copy' if use_copy else 'insert'
+    stats['load_seconds'] = round(loaded - started, 3)
+    stats['merge_seconds'] = round(elapsed - (loaded - started), 3)
+    stats['elapsed_seconds'] = round(elapsed, 3)
+    stats['rows_per_second'] = round(stats['rows'] / elapsed, 1) if elapsed > 0 else None
+    stats['rejected'] = sorted(rejected, key=lambda r: r['line'])[:MAX_REJECTED_SAMPLES]
+    stats['touched_product_ids'] = list(touched_product_ids)
+    return stats
+
+
+if __name__ == '__main__':
+    from . import create_app
+    from .jobs import enqueue_training
+    from .response_cache import commit_version_bump
+
+    parser = argparse.ArgumentParser(description='Bulk-load a sales CSV into the database')
+    parser.add_argument('path', help='CSV file with name, sku, product price, stock, quantity sale, date of sale')
+    parser.add_argument('--chunk-size', type=int, default=None, help='rows validated and staged per batch')
+    args = parser.parse_args()
+
+    app = create_app(background=False)
+    with app.app_context():
+        with open(args.path, 'rb') as f:
+            result = ingest_sales_csv(f, chunk_size=args.chunk_size)
+        db.session.commit()
+        commit_version_bump('sales', 'products')
+        touched = result.pop('touched_product_ids')
+        if touched:
+            job, _ = enqueue_training('incremental', {'product_ids': touched}, data_changed=True)
+            result['training_job_id'] = job.id
+        print(result)
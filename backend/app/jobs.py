@@ -0,0 +1,202 @@
+import logging
+import threading
+import time
+import datetime as dt
+from typing import Callable, Optional, Tuple
+from flask import Flask, current_app
+from sqlalchemy import and_, or_, select, text, update
+from .extensions import db
+from .models import TrainingJob
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock key serializing job enqueues and claims across processes
+_QUEUE_LOCK_KEY = 7_210_002
+
+# Set whenever a job is enqueued in this process so the runner does not wait for its next poll
+_wakeup = threading.Event()
+
+
+def _stale_cutoff() -> dt.datetime:
+    seconds = current_app.config.get('JOB_STALE_SECONDS', 600)
+    return dt.datetime.utcnow() - dt.timedelta(seconds=seconds)
+
+
+def _lock_job_queue(conn) -> None:
+    # Held until the transaction ends. Postgres (READ COMMITTED) needs it; SQLite serializes
+    # writers on its database lock
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': _QUEUE_LOCK_KEY})
+
+
+def _live_jobs(statuses):
+    # A running job whose heartbeat stopped belongs to a dead worker and must not block new work
+    clauses = []
+    if 'queued' in statuses:
+        clauses.append(TrainingJob.status == 'queued')
+    if 'running' in statuses:
+        clauses.append(and_(TrainingJob.status == 'running', TrainingJob.heartbeat_at >= _stale_cutoff()))
+    return or_(*clauses)
+
+
+def enqueue_training(kind: str = 'full', params: Optional[dict] = None, data_changed: bool = False) -> Tuple[TrainingJob, bool]:
+    """Queue a training job unless an equivalent one is already pending.
+
+    A running job already covers a plain "train now" request, but it may have
+    loaded its data before an upload committed, so `data_changed` requests only
+    coalesce with a job that is still queued. Incremental requests are merged
+    into a queued incremental job (union of product ids) and are absorbed by a
+    queued full retrain. Returns (job, created).
+    """
+    params = params or {}
+    statuses = ('queued',) if data_changed else ('queued', 'running')
+    # Two requests racing past the checks below would queue the same training twice
+    _lock_job_queue(db.session.connection())
+    if kind == 'incremental':
+        full = (
+            TrainingJob.query
+            .filter(TrainingJob.kind == 'full', TrainingJob.status == 'queued')
+            .first()
+        )
+        if full:
+            db.session.commit()
+            return full, False
+
+    existing = (
+        TrainingJob.query
+        .filter(TrainingJob.kind == kind, _live_jobs(statuses))
+        .order_by(TrainingJob.id.desc())
+        .first()
+    )
+    if existing and kind == 'incremental' and existing.status == 'queued':
+        merged = _merge_product_ids((existing.params or {}).get('product_ids'), params.get('product_ids'))
+        # Only while still queued: a runner that claimed it meanwhile has already read its params
+        result = db.session.execute(
+            update(TrainingJob)
+            .where(TrainingJob.id == existing.id, TrainingJob.status == 'queued')
+            .values(params={**(existing.params or {}), 'product_ids': merged})
+        )
+        if result.rowcount == 1:
+            db.session.commit()
+            return existing, False
+    elif existing and kind != 'incremental':
+        db.session.commit()
+        return existing, False
+
+    job = TrainingJob(kind=kind, params=params, status='queued')
+    db.session.add(job)
+    db.session.commit()
+    _wakeup.set()
+    return job, True
+
+
+def _merge_product_ids(a, b):
+    # None means "every product", which absorbs any explicit list
+    if a is None or b is None:
+        return None
+    return sorted(set(a) | set(b))
+
+
+def _claim_next_job() -> Optional[int]:
+    """Atomically move the oldest queued job to running; None if busy or idle."""
+    now = dt.datetime.utcnow()
+    with db.engine.begin() as conn:
+        # Claims run one at a time, or two runners could both see no running job and each claim one.
+        # On SQLite the UPDATE below takes the database write lock first
+        _lock_job_queue(conn)
+        conn.execute(
+            update(TrainingJob)
+            .where(TrainingJob.status == 'running', TrainingJob.heartbeat_at < _stale_cutoff())
+            .values(status='failed', error='worker lost (no heartbeat)', finished_at=now)
+        )
+        # One training at a time: they compete for the same CPUs and write the same forecasts
+        if conn.execute(select(TrainingJob.id).where(TrainingJob.status == 'running').limit(1)).first():
+            return None
+        job_id = conn.execute(
+            select(TrainingJob.id).where(TrainingJob.status == 'queued').order_by(TrainingJob.id.asc()).limit(1)
+        ).scalar()
+        if job_id is None:
+            return None
+        claimed = conn.execute(
+            update(TrainingJob)
+            .where(TrainingJob.id == job_id, TrainingJob.status == 'queued')
+            .values(status='running', started_at=now, heartbeat_at=now)
+        )
+        return job_id if claimed.rowcount == 1 else None
+
+
+def _update_job(job_id: int, **values) -> None:
+    # Separate connection: progress must be visible while the training transaction is still open
+    with db.engine.begin() as conn:
+        conn.execute(update(TrainingJob).where(TrainingJob.id == job_id).values(**values))
+
+
+def _progress_reporter(job_id: int, min_interval: float = 1.0) -> Callable[[int, int], None]:
+    last = [0.0]
+
+    def report(done: int, total: int) -> None:
+        now = time.monotonic()
+        if done < total and done > 0 and now - last[0] < min_interval:
+            return
+        last[0] = now
+        _update_job(job_id, products_done=done, products_total=total, heartbeat_at=dt.datetime.utcnow())
+
+    return report
+
+
+def _execute(kind: str, params: dict, progress: Callable[[int, int], None]) -> None:
+    from .training import train_now, train_incremental
+    if kind == 'full':
+        train_now(progress=progress, profile=params.get('profile'))
+    elif kind == 'incremental':
+        train_incremental(params.get('product_ids'), progress=progress)
+    elif kind == 'backtest':
+        from .backtest import backtest_and_record
+        backtest_and_record(progress=progress)
+    else:
+        raise ValueError(f"Unknown training job kind: {kind}")
+
+
+def run_job(job_id: int) -> None:
+    job = db.session.get(TrainingJob, job_id)
+    try:
+        _execute(job.kind, job.params or {}, _progress_reporter(job_id))
+        status, error = 'succeeded', None
+    except Exception as e:
+        logger.exception("Training job %d failed", job_id)
+        db.session.rollback()
+        status, error = 'failed', str(e)
+    _update_job(job_id, status=status, error=error, finished_at=dt.datetime.utcnow())
+
+
+def run_pending_jobs() -> int:
+    """Run queued jobs until none is left; returns how many were executed."""
+    count = 0
+    while True:
+        job_id = _claim_next_job()
+        if job_id is None:
+            return count
+        run_job(job_id)
+        count += 1
+
+
+def run_job_runner(app: Flask, stop: Optional[threading.Event] = None) -> None:
+    """Execute queued jobs until `stop` is set; the main loop of the trainer role.
+
+    `stop` is checked between jobs, so a job that is running finishes first.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        with app.app_context():
+            try:
+                run_pending_jobs()
+            except Exception:
+                logger.exception("Job runner failed; retrying after the poll interval")
+            finally:
+                db.session.remove()
+        _wakeup.wait(timeout=app.config.get('JOB_POLL_SECONDS', 5))
+        _wakeup.clear()
+
+
+def start_job_runner(app: Flask) -> None:
+    threading.Thread(target=run_job_runner, args=(app,), daemon=True, name='training-job-runner').start()
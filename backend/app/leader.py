@@ -0,0 +1,108 @@
+"""Cross-process leader lock, so exactly one process schedules training.
+
+On Postgres it is a session-level advisory lock held on a connection kept
+open for as long as the process leads; it is released when the process
+(or its connection) dies. Other databases, SQLite in practice, use an
+exclusive flock() on a file, which the kernel releases the same way.
+Both are non-blocking: a process that loses the race just tries again
+later.
+"""
+import logging
+import os
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development servers only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key of the Postgres advisory lock
+DEFAULT_LOCK_KEY = 0x5A1E5F0C
+
+
+class LeaderLock:
+    def __init__(self, engine: Engine, path: str, key: int = DEFAULT_LOCK_KEY):
+        self.engine = engine
+        self.path = path
+        self.key = key
+        self._conn = None
+        self._fd: Optional[int] = None
+
+    @property
+    def backend(self) -> str:
+        return 'advisory' if self.engine.dialect.name == 'postgresql' else 'file'
+
+    def acquire(self) -> bool:
+        """Try to take the lock without waiting; True if this process holds it (again)."""
+        if self.held():
+            return True
+        if self.backend == 'advisory':
+            return self._acquire_advisory()
+        return self._acquire_file()
+
+    def held(self) -> bool:
+        if self._conn is not None:
+            try:
+                # The lock lives as long as the session; a dropped connection took it along
+                self._conn.execute(text("SELECT 1"))
+                self._conn.commit()
+                return True
+            except Exception:
+                logger.warning("Lost the connection holding the leader lock")
+                self._close_conn()
+                return False
+        return self._fd is not None
+
+    def release(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': self.key})
+                self._conn.commit()
+            except Exception:
+                pass
+            self._close_conn()
+        if self._fd is not None:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def _acquire_advisory(self) -> bool:
+        conn = self.engine.connect()
+        try:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {'key': self.key}).scalar()
+            # End the transaction; the session-level lock outlives it
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._conn = conn
+        return True
+
+    def _acquire_file(self) -> bool:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+        # For humans: which process leads
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def _close_conn(self) -> None:
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
@@ -0,0 +1,136 @@
+"""Versioned schema migrations applied at startup.
+
+`db.create_all()` only creates missing tables, so anything that changes an
+existing table (columns, indexes, constraints) lives here. Each migration
+runs once, in its own transaction, and is recorded in `schema_migrations`.
+Migrations must be idempotent so databases that already received the old
+ad-hoc startup ALTERs can be brought under version control safely.
+"""
+import datetime as dt
+import logging
+from typing import Callable, List, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock key shared by every process running migrations
+_LOCK_KEY = 7_210_001
+
+
+def _products_sku(conn: Connection) -> None:
+    if conn.dialect.name != 'postgresql':
+        return
+    conn.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS sku varchar(100)"))
+    # Backfill values to satisfy NOT NULL constraint when newly added
+    conn.execute(text("UPDATE products SET sku = CONCAT('SKU-', id) WHERE sku IS NULL OR sku = ''"))
+    conn.execute(text("ALTER TABLE products ALTER COLUMN sku SET NOT NULL"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_products_sku ON products (sku)"))
+
+
+def _forecast_bounds(conn: Connection) -> None:
+    if conn.dialect.name != 'postgresql':
+        return
+    conn.execute(text("ALTER TABLE forecasts ADD COLUMN IF NOT EXISTS lower_bound float"))
+    conn.execute(text("ALTER TABLE forecasts ADD COLUMN IF NOT EXISTS upper_bound float"))
+    conn.execute(text("ALTER TABLE forecasts ADD COLUMN IF NOT EXISTS forecast_date date"))
+
+
+def _has_unique(conn: Connection, table: str, columns: List[str]) -> bool:
+    insp = inspect(conn)
+    uniques = [u['column_names'] for u in insp.get_unique_constraints(table)]
+    uniques += [i['column_names'] for i in insp.get_indexes(table) if i.get('unique')]
+    return columns in uniques
+
+
+def _forecast_unique_day(conn: Connection) -> None:
+    # Backs the forecast upserts; fresh databases already get it from the model's UniqueConstraint
+    if _has_unique(conn, 'forecasts', ['product_id', 'forecast_date']):
+        return
+    # Keep only the newest row of any duplicated daily forecast before enforcing uniqueness
+    conn.execute(text(
+        "DELETE FROM forecasts WHERE forecast_date IS NOT NULL AND id NOT IN "
+        "(SELECT MAX(id) FROM forecasts WHERE forecast_date IS NOT NULL GROUP BY product_id, forecast_date)"
+    ))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_forecasts_product_date ON forecasts (product_id, forecast_date)"))
+
+
+def _sales_indexes(conn: Connection) -> None:
+    # Per-product history (training loader, forecast comparison) and date-range series
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sales_product_date ON sales (product_id, sale_date)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sales_sale_date ON sales (sale_date)"))
+
+
+def _daily_sales_rollup(conn: Connection) -> None:
+    # Backfill the rollup for databases that already hold sales
+    from .models import DailySales
+    from .rollup import rebuild_statements
+    DailySales.__table__.create(conn, checkfirst=True)
+    if conn.execute(text("SELECT 1 FROM daily_sales LIMIT 1")).first() is None:
+        _, fill = rebuild_statements()
+        conn.execute(fill)
+
+
+def _training_state_model(conn: Connection) -> None:
+    insp = inspect(conn)
+    if not insp.has_table('product_training_states'):
+        # create_all() builds it with the columns
+        return
+    existing = {c['name'] for c in insp.get_columns('product_training_states')}
+    if 'model_type' not in existing:
+        conn.execute(text("ALTER TABLE product_training_states ADD COLUMN model_type VARCHAR(32)"))
+    if 'holdout_mae' not in existing:
+        conn.execute(text("ALTER TABLE product_training_states ADD COLUMN holdout_mae FLOAT"))
+
+
+def _forecast_interval_coverage(conn: Connection) -> None:
+    insp = inspect(conn)
+    if not insp.has_table('forecasts'):
+        return
+    if 'interval_coverage' not in {c['name'] for c in insp.get_columns('forecasts')}:
+        conn.execute(text("ALTER TABLE forecasts ADD COLUMN interval_coverage FLOAT"))
+
+
+# Append only: versions are never renumbered or reordered
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, 'products_sku', _products_sku),
+    (2, 'forecast_bounds', _forecast_bounds),
+    (3, 'forecast_unique_day', _forecast_unique_day),
+    (4, 'sales_indexes', _sales_indexes),
+    (5, 'daily_sales_rollup', _daily_sales_rollup),
+    (6, 'training_state_model', _training_state_model),
+    (7, 'forecast_interval_coverage', _forecast_interval_coverage),
+]
+
+
+def _ensure_version_table(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        ))
+
+
+def applied_versions(conn: Connection) -> set:
+    return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Apply pending migrations in order; returns the versions applied now."""
+    _ensure_version_table(engine)
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        with engine.begin() as conn:
+            if conn.dialect.name == 'postgresql':
+                # Serialise concurrent workers starting at the same time; released at commit
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': _LOCK_KEY})
+            if version in applied_versions(conn):
+                continue
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {'v': version, 'n': name, 't': dt.datetime.utcnow()},
+            )
+            applied.append(version)
+            logger.info("Applied migration %04d_%s", version, name)
+    return applied
@@ -0,0 +1,182 @@
+"""Per-process cache of trained models loaded from MODELS_DIR.
+
+Models are loaded lazily on first use and kept in an LRU bounded by bytes
+(the in-memory size of an array-backed model, else the size of its file). An
+entry is reloaded when its file changes on disk, so a trainer in another
+process or container only has to replace the file. Every gunicorn worker
+holds its own registry; after a fork the child starts with an empty cache.
+joblib (and with it NumPy) is only imported once a model is saved or
+loaded, so processes that never touch a model start without the ML stack.
+"""
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional, Tuple
+from flask import current_app
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def model_path(models_dir: str, product_id: Optional[int], kind: str = 'daily') -> str:
+    """Model file of a product, or of a catalog-wide model when product_id is None."""
+    if product_id is None:
+        return os.path.join(models_dir, f'{kind}_model.joblib')
+    return os.path.join(models_dir, f'product_{product_id}_{kind}_model.joblib')
+
+
+def save_model(model: Any, path: str, compress: int = 0) -> None:
+    """Write a model atomically so readers never load a half-written file.
+
+    `compress` is the joblib zlib level (0-9); compressed files cannot be
+    memory-mapped and are read into private memory instead.
+    """
+    import joblib
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.joblib')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            joblib.dump(model, f, compress=('zlib', compress) if compress else 0)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class LoadedModel(NamedTuple):
+    model: Any
+    # Changes whenever the file is replaced; usable as a cache key for predictions
+    version: Tuple[int, int, int]
+    size: int
+
+
+def _file_version(st: os.stat_result) -> Tuple[int, int, int]:
+    return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+
+def _model_bytes(model: Any, file_size: int) -> int:
+    # Array-backed models know their in-memory size, which a compressed file understates
+    return max(file_size, int(getattr(model, 'nbytes', 0)))
+
+
+class ModelRegistry:
+    def __init__(self, models_dir: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 mmap_mode: Optional[str] = None):
+        self.models_dir = models_dir
+        self.max_bytes = max_bytes
+        # 'r' maps the arrays of uncompressed model files, so workers share their pages
+        self.mmap_mode = mmap_mode
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        # One lock per key so concurrent requests for the same model load it once
+        self._load_locks = {}
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def _check_fork(self) -> None:
+        # Locks and counters inherited from a preloading parent are not ours
+        if self._pid != os.getpid():
+            self._reset()
+
+    def get(self, product_id: Optional[int], kind: str = 'daily') -> Optional[LoadedModel]:
+        """Return the current model of a product, loading it if needed; None if never trained."""
+        self._check_fork()
+        key = (product_id, kind)
+        path = model_path(self.models_dir, product_id, kind)
+        try:
+            version = _file_version(os.stat(path))
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                self._drop(key)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.version == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+                self.misses += 1
+                if entry is not None:
+                    self.invalidations += 1
+                    self._drop(key)
+            import joblib
+            model = joblib.load(path, mmap_mode=self.mmap_mode)
+            loaded = LoadedModel(model, version, _model_bytes(model, version[2]))
+            with self._lock:
+                self._put(key, loaded)
+            return loaded
+
+    def _drop(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _put(self, key, entry: LoadedModel) -> None:
+        if entry.size > self.max_bytes:
+            # Larger than the whole budget: serve it without caching
+            return
+        self._drop(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        self._check_fork()
+        with self._lock:
+            return {
+                'pid': self._pid,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'mmap_mode': self.mmap_mode,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """The registry of the current app, created on first use."""
+    app = current_app._get_current_object()
+    registry = app.extensions.get('model_registry')
+    if registry is None:
+        with _registry_lock:
+            registry = app.extensions.get('model_registry')
+            if registry is None:
+                registry = ModelRegistry(
+                    app.config['MODELS_DIR'],
+                    app.config.get('MODEL_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES),
+                    app.config.get('MODEL_MMAP_MODE'),
+                )
+                app.extensions['model_registry'] = registry
+    return registry
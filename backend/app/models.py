@@ -26,6 +26,11 @@ class Product(db.Model):
 
 class Sale(db.Model):
     __tablename__ = 'sales'
+    __table_args__ = (
+        # Per-product history in date order (training, comparison) and dashboard date ranges
+        db.Index('ix_sales_product_date', 'product_id', 'sale_date'),
+        db.Index('ix_sales_sale_date', 'sale_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
@@ -38,14 +43,31 @@ class Sale(db.Model):
     product = db.relationship('Product', backref='sales', lazy=True)
 
 
+class DailySales(db.Model):
+    """Per product and day rollup of `sales`, kept in step by every sales writer (see rollup.py)."""
+    __tablename__ = 'daily_sales'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    quantity = db.Column(db.BigInteger, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    # Number of sales rows folded into this day; the row is removed when it drops to zero
+    sales_count = db.Column(db.Integer, nullable=False, default=0)
+
+
 class Forecast(db.Model):
     __tablename__ = 'forecasts'
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'forecast_date', name='uq_forecasts_product_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     predicted_quantity = db.Column(db.Float, nullable=False)
     lower_bound = db.Column(db.Float, nullable=True)
     upper_bound = db.Column(db.Float, nullable=True)
+    # Nominal share of actuals the bounds should contain; NULL for the old fixed +/-20% band
+    interval_coverage = db.Column(db.Float, nullable=True)
     forecast_date = db.Column(db.Date, nullable=True)
     week_number = db.Column(db.Integer, nullable=False)
     year = db.Column(db.Integer, nullable=False)
@@ -61,4 +83,94 @@ class ModelTraining(db.Model):
     last_trained_week = db.Column(db.Integer, nullable=False)
     last_trained_year = db.Column(db.Integer, nullable=False)
     accuracy = db.Column(db.Float)
-    trained_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
\ No newline at end of file
+    trained_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+
+
+class BacktestMetric(db.Model):
+    """Latest rolling-origin backtest of each product (see backtest.py)."""
+    __tablename__ = 'backtest_metrics'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    model_type = db.Column(db.String(32), nullable=True)
+    origins = db.Column(db.Integer, nullable=False)
+    # Forecast days scored, and the sums the catalog-wide WAPE is computed from
+    days = db.Column(db.Integer, nullable=False)
+    actual_total = db.Column(db.Float, nullable=False)
+    abs_error_total = db.Column(db.Float, nullable=False)
+    mape = db.Column(db.Float, nullable=True)
+    wape = db.Column(db.Float, nullable=True)
+    bias = db.Column(db.Float, nullable=True)
+    coverage = db.Column(db.Float, nullable=True)
+    evaluated_at = db.Column(db.DateTime, nullable=False)
+
+
+class TrainingJob(db.Model):
+    __tablename__ = 'training_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False, default='full')
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    params = db.Column(db.JSON, nullable=True)
+    products_done = db.Column(db.Integer, nullable=False, default=0)
+    products_total = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=dt.datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # Touched on every progress update; a running job without a recent heartbeat is considered dead
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+
+class ProductTrainingState(db.Model):
+    __tablename__ = 'product_training_states'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    last_trained_at = db.Column(db.DateTime, nullable=True)
+    # Fingerprint of the product's sales rows when its model was last built
+    sales_count = db.Column(db.Integer, nullable=False, default=0)
+    sales_max_id = db.Column(db.Integer, nullable=True)
+    sales_quantity_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    # Forecaster picked for the product (see app/forecasters.py) and its mean absolute error per holdout day
+    model_type = db.Column(db.String(32), nullable=True)
+    holdout_mae = db.Column(db.Float, nullable=True)
+
+
+class TrainingRun(db.Model):
+    """One training run with the seconds spent in each phase (see training_runs.py)."""
+    __tablename__ = 'training_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    mode = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False, index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    seconds = db.Column(db.Float, nullable=True)
+    products_total = db.Column(db.Integer, nullable=False, default=0)
+    products_trained = db.Column(db.Integer, nullable=False, default=0)
+    # {phase: seconds}; per-product phases are summed over products (and so over workers)
+    phases = db.Column(db.JSON, nullable=True)
+    profile_path = db.Column(db.String(500), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+
+class TrainingRunProduct(db.Model):
+    """Per-product phase seconds of a run; only the latest runs keep them."""
+    __tablename__ = 'training_run_products'
+
+    run_id = db.Column(db.Integer, db.ForeignKey('training_runs.id'), primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True)
+    model_type = db.Column(db.String(32), nullable=True)
+    features_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    fit_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    predict_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    serialize_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    total_seconds = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class CacheVersion(db.Model):
+    """Counters bumped in the transactions that change cached responses (see response_cache.py)."""
+    __tablename__ = 'cache_versions'
+
+    name = db.Column(db.String(32), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
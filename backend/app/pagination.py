@@ -0,0 +1,62 @@
+import json
+from typing import Callable, Iterable, Optional, Tuple
+from flask import Response, jsonify, request, stream_with_context
+from .extensions import db
+
+
+# Rows fetched per round-trip when streaming an export
+STREAM_CHUNK_SIZE = 1000
+
+
+def page_args(default_limit: int, max_limit: int) -> Tuple[Optional[int], int]:
+    """Parse keyset pagination arguments (`after_id`, `limit`) from the query string.
+
+    Raises ValueError with a client-facing message on bad input.
+    """
+    after_id = request.args.get('after_id')
+    limit = request.args.get('limit')
+    try:
+        after_id = int(after_id) if after_id not in (None, '') else None
+        limit = int(limit) if limit not in (None, '') else default_limit
+    except ValueError:
+        raise ValueError('after_id and limit must be integers')
+    if limit < 1 or limit > max_limit:
+        raise ValueError(f'limit must be between 1 and {max_limit}')
+    return after_id, limit
+
+
+def page_response(query, after, limit: int, serialize: Callable[[object], dict]) -> Response:
+    """`{"items", "next_after_id"}` for one page of `query`.
+
+    `after` is the keyset condition for after_id (None on the first page).
+    with_total=1 adds `total`, every row matching `query`: a COUNT over
+    all of them, so clients ask for it once, not on every page.
+    """
+    page = query.where(after) if after is not None else query
+    items = [serialize(row) for row in db.session.execute(page.limit(limit))]
+    body = {"items": items, "next_after_id": int(items[-1]['id']) if len(items) == limit else None}
+    if _flag('with_total'):
+        if after is None and len(items) < limit:
+            body['total'] = len(items)
+        else:
+            body['total'] = db.session.scalar(db.select(db.func.count()).select_from(query.order_by(None).subquery()))
+    return jsonify(body)
+
+
+def _flag(name: str) -> bool:
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+def wants_stream() -> bool:
+    return _flag('stream')
+
+
+def stream_items(rows: Iterable, serialize: Callable[[object], dict]) -> Response:
+    """Stream `{"items": [...]}` row by row so exports never sit in memory whole."""
+    def generate():
+        yield '{"items": ['
+        for i, row in enumerate(rows):
+            yield (',' if i else '') + json.dumps(serialize(row))
+        yield ']}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
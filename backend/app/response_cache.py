@@ -0,0 +1,204 @@
+"""Cached GET responses of read-heavy endpoints, with ETags.
+
+Dashboards poll forecasts, comparisons and sales series that only change
+when training or a sales write commits. Those transactions bump counters
+in `cache_versions` (bump_versions; see rollup.py for sales writers,
+training.py for every run), and a cached response is keyed by
+endpoint, query arguments, the current day and the counters the endpoint
+depends on, so a commit makes every older entry unreachable and no
+explicit invalidation is needed, in this process or any other.
+
+Entries live in an in-process LRU with a TTL (MemoryCache), or in a
+shared store (RESPONSE_CACHE_BACKEND=redis, which needs the redis
+package); anything with the same get/set methods can be installed as
+app.extensions['response_cache']. Every cached response carries an ETag
+of its body, so a browser revalidating with If-None-Match gets a 304.
+"""
+import datetime as dt
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional, Tuple
+from flask import current_app, request
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from .extensions import db
+from .models import CacheVersion
+
+logger = logging.getLogger(__name__)
+
+# What cached responses depend on: trained models and forecasts, sales (the rollup), the product catalog
+VERSION_NAMES = ('training', 'sales', 'products')
+
+BACKENDS = ('memory', 'redis', 'none')
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    mimetype: str
+    etag: str
+
+
+def ensure_versions() -> None:
+    """Create the missing counters, so bumps are plain UPDATEs that never race on an INSERT."""
+    existing = set(db.session.execute(select(CacheVersion.name)).scalars())
+    missing = [name for name in VERSION_NAMES if name not in existing]
+    if not missing:
+        return
+    db.session.add_all(CacheVersion(name=name, version=0) for name in missing)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another process created them first
+        db.session.rollback()
+
+
+def bump_versions(*names: str) -> None:
+    """Invalidate responses depending on `names` once the current transaction commits.
+
+    The caller commits; a rollback leaves the counters, and so the cache, as they were.
+    """
+    for name in names:
+        result = db.session.execute(
+            update(CacheVersion).where(CacheVersion.name == name).values(version=CacheVersion.version + 1)
+        )
+        if result.rowcount == 0:
+            db.session.add(CacheVersion(name=name, version=1))
+            db.session.flush()
+
+
+def commit_version_bump(*names: str) -> None:
+    """Bump `names` in a short transaction of its own, once a bulk write has committed."""
+    bump_versions(*names)
+    db.session.commit()
+
+
+def current_versions(names: Tuple[str, ...]) -> Tuple[int, ...]:
+    rows = dict(db.session.execute(
+        select(CacheVersion.name, CacheVersion.version).where(CacheVersion.name.in_(names))
+    ).all())
+    return tuple(rows.get(name, 0) for name in names)
+
+
+class MemoryCache:
+    """Thread-safe LRU of at most `max_entries` responses, each kept for `ttl` seconds."""
+
+    def __init__(self, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: 'OrderedDict[str, Tuple[float, CachedResponse]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] <= self.clock():
+                if item is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: str, value: CachedResponse) -> None:
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache:
+    """Entries shared by every process through Redis, expired by Redis after `ttl` seconds."""
+
+    def __init__(self, url: str, ttl: float):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = max(1, int(ttl))
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        raw = self.client.get(key)
+        if raw is None:
+            return None
+        header, body = raw.split(b'\n', 1)
+        meta = json.loads(header)
+        return CachedResponse(body, meta['mimetype'], meta['etag'])
+
+    def set(self, key: str, value: CachedResponse) -> None:
+        header = json.dumps({'mimetype': value.mimetype, 'etag': value.etag}).encode()
+        self.client.set(key, header + b'\n' + value.body, ex=self.ttl)
+
+
+def _create_cache(config):
+    backend = config.get('RESPONSE_CACHE_BACKEND', 'memory')
+    ttl = config.get('RESPONSE_CACHE_TTL_SECONDS', 300)
+    if backend == 'redis':
+        try:
+            return RedisCache(config['RESPONSE_CACHE_URL'], ttl)
+        except ImportError:
+            logger.warning("RESPONSE_CACHE_BACKEND=redis needs the redis package; caching in process memory")
+    return MemoryCache(config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024), ttl)
+
+
+def get_response_cache():
+    """The response cache of the current app, created on first use (None when disabled)."""
+    app = current_app._get_current_object()
+    if app.config.get('RESPONSE_CACHE_BACKEND') == 'none':
+        return None
+    cache = app.extensions.get('response_cache')
+    if cache is None:
+        cache = app.extensions.setdefault('response_cache', _create_cache(app.config))
+    return cache
+
+
+def _cache_key(versions: Tuple[str, ...]) -> str:
+    # The day is part of the key: endpoints compute their date windows from today
+    parts = [
+        request.endpoint,
+        sorted(request.args.items(multi=True)),
+        current_versions(versions),
+        dt.date.today().isoformat(),
+    ]
+    return 'response:' + hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+
+
+def cached_response(*versions: str):
+    """Cache a GET view's 200 responses until one of the `versions` counters is bumped."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_response_cache() if request.method == 'GET' else None
+            if cache is None:
+                return view(*args, **kwargs)
+            key = _cache_key(versions)
+            entry = cache.get(key)
+            status = 'HIT'
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                entry = CachedResponse(body, response.mimetype, hashlib.sha1(body).hexdigest())
+                cache.set(key, entry)
+                status = 'MISS'
+
+            response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+            response.set_etag(entry.etag)
+            # Browsers may keep the body but must revalidate it, which costs a 304 at most
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.headers['X-Cache'] = status
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
@@ -0,0 +1,164 @@
+"""Maintenance of the `daily_sales` rollup.
+
+Every code path that writes `sales` also folds the same rows into
+`daily_sales` in the same transaction, so dashboards, comparisons and the
+training loader read O(days) rows instead of re-aggregating raw sales.
+Single sales (record_sale, remove_sale) also bump the 'sales' response
+cache version in that transaction. Bulk loads and rebuilds bump it once
+after they commit (commit_version_bump): bumping per chunk would keep the
+counter row locked, and every single-sale writer waiting, until the whole
+load commits.
+
+Usage: python -m app.rollup rebuild   (backfill or repair from `sales`)
+"""
+from __future__ import annotations
+import datetime as dt
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import delete, func, insert, select
+from .extensions import db
+from .forecast_store import _dialect_insert
+from .models import DailySales, Sale
+from .response_cache import bump_versions, commit_version_bump
+
+
+# (product_id, sale date or datetime, quantity, revenue)
+SaleDelta = Tuple[int, object, int, float]
+
+# (product_id, day) rows per upsert statement; keeps SQLite under its bind parameter limit
+UPSERT_BATCH_SIZE = 1000
+
+
+def _day(value) -> dt.date:
+    return value.date() if isinstance(value, dt.datetime) else value
+
+
+def apply_sales(rows: Iterable[SaleDelta], sign: int = 1) -> int:
+    """Add (sign=1) or subtract (sign=-1) sales from the rollup.
+
+    Rows are summed per (product_id, day) first, so a chunk of imported sales
+    costs one upsert per distinct day. The caller commits.
+    """
+    totals = {}
+    for product_id, when, quantity, revenue in rows:
+        key = (product_id, _day(when))
+        qty, rev, count = totals.get(key, (0, 0.0, 0))
+        totals[key] = (qty + sign * quantity, rev + sign * revenue, count + sign)
+    if not totals:
+        return 0
+    values = [
+        {'product_id': pid, 'day': day, 'quantity': qty, 'revenue': rev, 'sales_count': count}
+        for (pid, day), (qty, rev, count) in totals.items()
+    ]
+
+    dialect_insert = _dialect_insert()
+    if dialect_insert is None:
+        for v in values:
+            row = db.session.get(DailySales, (v['product_id'], v['day']))
+            if row is None:
+                db.session.add(DailySales(**v))
+            else:
+                row.quantity += v['quantity']
+                row.revenue += v['revenue']
+                row.sales_count += v['sales_count']
+        db.session.flush()
+    else:
+        for i in range(0, len(values), UPSERT_BATCH_SIZE):
+            stmt = dialect_insert(DailySales).values(values[i:i + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['product_id', 'day'],
+                set_={
+                    'quantity': DailySales.quantity + stmt.excluded.quantity,
+                    'revenue': DailySales.revenue + stmt.excluded.revenue,
+                    'sales_count': DailySales.sales_count + stmt.excluded.sales_count,
+                },
+            )
+            db.session.execute(stmt)
+
+    if sign < 0:
+        db.session.execute(
+            delete(DailySales)
+            .where(DailySales.product_id.in_({pid for pid, _ in totals}), DailySales.sales_count <= 0)
+        )
+    return len(values)
+
+
+def apply_aggregated(source) -> None:
+    """Add pre-aggregated (product_id, day, quantity, revenue, sales_count) rows from a SELECT.
+
+    Set-based counterpart of apply_sales for bulk loads; the caller commits.
+    """
+    columns = ['product_id', 'day', 'quantity', 'revenue', 'sales_count']
+    dialect_insert = _dialect_insert()
+    if dialect_insert is None:
+        for pid, day, qty, rev, count in db.session.execute(source):
+            row = db.session.get(DailySales, (pid, day))
+            if row is None:
+                db.session.add(DailySales(product_id=pid, day=day, quantity=qty, revenue=rev, sales_count=count))
+            else:
+                row.quantity += qty
+                row.revenue += rev
+                row.sales_count += count
+        db.session.flush()
+        return
+    stmt = dialect_insert(DailySales).from_select(columns, source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['product_id', 'day'],
+        set_={
+            'quantity': DailySales.quantity + stmt.excluded.quantity,
+            'revenue': DailySales.revenue + stmt.excluded.revenue,
+            'sales_count': DailySales.sales_count + stmt.excluded.sales_count,
+        },
+    )
+    db.session.execute(stmt)
+
+
+def record_sale(sale: Sale) -> None:
+    apply_sales([(sale.product_id, sale.sale_date, sale.quantity, sale.total_price)])
+    bump_versions('sales')
+
+
+def remove_sale(sale: Sale) -> None:
+    apply_sales([(sale.product_id, sale.sale_date, sale.quantity, sale.total_price)], sign=-1)
+    bump_versions('sales')
+
+
+def rebuild_statements(product_ids: Optional[Iterable[int]] = None):
+    """DELETE and INSERT ... SELECT that recompute the rollup from `sales`."""
+    day = func.date(Sale.sale_date)
+    clear = delete(DailySales)
+    source = (
+        select(Sale.product_id, day, func.sum(Sale.quantity), func.sum(Sale.total_price), func.count(Sale.id))
+        .where(Sale.sale_date.isnot(None))
+        .group_by(Sale.product_id, day)
+    )
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        clear = clear.where(DailySales.product_id.in_(product_ids))
+        source = source.where(Sale.product_id.in_(product_ids))
+    fill = insert(DailySales).from_select(['product_id', 'day', 'quantity', 'revenue', 'sales_count'], source)
+    return clear, fill
+
+
+def rebuild_daily_sales(product_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute the rollup (or some products of it) from `sales`; returns rows written.
+
+    The caller commits.
+    """
+    clear, fill = rebuild_statements(product_ids)
+    db.session.execute(clear)
+    return db.session.execute(fill).rowcount
+
+
+if __name__ == '__main__':
+    import sys
+    from . import create_app
+
+    if sys.argv[1:] != ['rebuild']:
+        print('Usage: python -m app.rollup rebuild')
+        sys.exit(2)
+    app = create_app(background=False)
+    with app.app_context():
+        written = rebuild_daily_sales()
+        db.session.commit()
+        commit_version_bump('sales')
+        print(f'Rebuilt daily_sales: {written} rows')
@@ -1,11 +1,14 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import io
-import csv
 import datetime as dt
 from ..extensions import db
-from ..models import User, Product, Sale
-from ..training import train_now
+from ..models import User, TrainingJob, BacktestMetric, Product, TrainingRun, TrainingRunProduct
+from ..jobs import enqueue_training
+from ..importer import import_csv
+from ..ingest import ingest_sales_csv
+from ..model_registry import get_registry
+from ..response_cache import commit_version_bump
+from ..training_runs import PRODUCT_PHASES, PROFILERS
 
 
 admin_bp = Blueprint('admin', __name__)
@@ -29,90 +32,30 @@ def upload_csv():
     if file.filename == '':
         return jsonify({"error": "empty filename"}), 400
 
-# Simple ETL: accept CSV with headers:
-# - product rows: name,sku,price,stock
-# - sales rows: product (name), sku, product price, stock, quantity sale, date of sale
-    content = file.read().decode('utf-8')
-    print(f"CSV content received: {content[:100]}...")  # Print first 100 chars for debugging
-    reader = csv.DictReader(io.StringIO(content))
-    inserted_products = 0
-    inserted_sales = 0
-    print(f"CSV headers: {reader.fieldnames}")  # Print CSV headers
-
-    for row in reader:
-        # Normalize keys (strip spaces, lowercase)
-        normalized = { (k or '').strip().lower(): (v or '').strip() for k, v in row.items() }
-        print(f"Processing row: {normalized}")
-
-        # Product upsert row - Check if this is a product row
-        if 'name' in normalized and 'sku' in normalized and 'product price' in normalized and 'stock' in normalized and not normalized.get('quantity sale'):
-            print("Found product row")
-            name = normalized.get('name')
-            sku = normalized.get('sku')
-            price = float(normalized.get('product price') or 0)
-            stock = int(normalized.get('stock') or 0)
-            if not sku:
-                continue
-            existing = Product.query.filter_by(sku=sku).first()
-            if existing:
-                existing.name = name or existing.name
-                existing.price = price if price else existing.price
-                if 'stock' in normalized:
-                    existing.stock = stock
-            else:
-                db.session.add(Product(name=name, sku=sku, price=price, stock=stock))
-                inserted_products += 1
-
-        # Sales row from the specified schema
-        elif 'name' in normalized and 'sku' in normalized and 'product price' in normalized and 'quantity sale' in normalized and 'date of sale' in normalized:
-            print("Found sales row")
-            name = normalized.get('name')
-            sku = normalized.get('sku')
-            price = float(normalized.get('product price') or 0)
-            stock = int(normalized.get('stock') or 0)
-            qty = int(normalized.get('quantity sale') or 0)
-            date_str = normalized.get('date of sale')
-            print(f"Sales data: sku={sku}, qty={qty}, date={date_str}")
-            try:
-                sale_date = dt.datetime.fromisoformat(date_str)
-            except Exception:
-                # try common alternative formats
-                try:
-                    sale_date = dt.datetime.strptime(date_str, '%Y-%m-%d')
-                except Exception:
-                    continue
-
-            if not sku:
-                continue
-            product = Product.query.filter_by(sku=sku).first()
-            if not product:
-                product = Product(name=name or sku, sku=sku, price=price, stock=stock)
-                db.session.add(product)
-                db.session.flush()
-                inserted_products += 1
-
-            if product.stock < qty:
-                # allow oversell? For now, cap to available stock
-                qty = max(0, product.stock)
-            if qty <= 0:
-                continue
-
-            iso = sale_date.isocalendar()
-            sale = Sale(product_id=product.id, quantity=qty, total_price=product.price * qty, sale_date=sale_date, week_number=iso[1], year=sale_date.year)
-            product.stock -= qty
-            db.session.add(sale)
-            inserted_sales += 1
-        else:
-            # skip unknown row type
-            continue
-
-    db.session.commit()
-    # Trigger retrain after import completes
+    # mode=bulk loads sales-only dumps through a staging table (COPY on Postgres)
+    mode = request.args.get('mode') or request.form.get('mode') or 'rows'
+    if mode not in ('rows', 'bulk'):
+        return jsonify({"error": "mode must be 'rows' or 'bulk'"}), 400
+
+    # Streaming ETL: accept CSV with headers:
+    # - product rows: name,sku,price,stock
+    # - sales rows: product (name), sku, product price, stock, quantity sale, date of sale
     try:
-        train_now()
-    except Exception as e:
-        print(f"Training error: {str(e)}")
-    return jsonify({"inserted_products": inserted_products, "inserted_sales": inserted_sales})
+        result = ingest_sales_csv(file.stream) if mode == 'bulk' else import_csv(file.stream)
+        db.session.commit()
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({"error": "file must be UTF-8 encoded CSV"}), 400
+    # Both modes may create products, rename them (rows mode) and add sales
+    commit_version_bump('sales', 'products')
+
+    # Queue an incremental retrain of just the SKUs that received sales; the job runner picks it up
+    touched_product_ids = result.pop('touched_product_ids')
+    job_id = None
+    if touched_product_ids:
+        job, _ = enqueue_training('incremental', {'product_ids': touched_product_ids}, data_changed=True)
+        job_id = job.id
+    return jsonify({**result, "training_job_id": job_id})
 
 
 @admin_bp.post('/train-now')
@@ -121,11 +64,193 @@ def admin_train_now():
     user = User.query.get(get_jwt_identity())
     if not _is_admin(user):
         return jsonify({"error": "forbidden"}), 403
-    try:
-        train_now()
-        return jsonify({"status": "training triggered successfully"})
-    except Exception as e:
-        print(f"Training error in admin_train_now: {str(e)}")
-        return jsonify({"error": f"Training failed: {str(e)}"}), 500
+    # Optional {"profile": "cprofile" | "pyinstrument"} profiles this run (see training_runs.py)
+    profile = (request.get_json(silent=True) or {}).get('profile')
+    if profile is not None and profile not in PROFILERS:
+        return jsonify({"error": f"profile must be one of {', '.join(PROFILERS)}"}), 400
+    job, created = enqueue_training('full', {'profile': profile} if profile else None)
+    return jsonify({"status": "training triggered successfully", "job_id": job.id, "deduplicated": not created}), 202
+
+
+@admin_bp.post('/backtest')
+@jwt_required()
+def admin_backtest():
+    user = User.query.get(get_jwt_identity())
+    if not _is_admin(user):
+        return jsonify({"error": "forbidden"}), 403
+    job, created = enqueue_training('backtest')
+    return jsonify({"status": "backtest triggered successfully", "job_id": job.id, "deduplicated": not created}), 202
+
+
+def _metric_json(m: BacktestMetric) -> dict:
+    return {
+        "product_id": m.product_id,
+        "model_type": m.model_type,
+        "origins": m.origins,
+        "days": m.days,
+        "mape": m.mape,
+        "wape": m.wape,
+        "bias": m.bias,
+        "coverage": m.coverage,
+        "evaluated_at": m.evaluated_at.isoformat(),
+    }
+
+
+@admin_bp.get('/backtest')
+@jwt_required()
+def backtest_results():
+    """Catalog WAPE from the stored sums, plus the products with the worst WAPE (or one product)."""
+    user = User.query.get(get_jwt_identity())
+    if not _is_admin(user):
+        return jsonify({"error": "forbidden"}), 403
+    product_id = request.args.get('product_id', type=int)
+    if product_id is not None:
+        metric = db.session.get(BacktestMetric, product_id)
+        if metric is None:
+            return jsonify({"error": "No backtest for this product"}), 404
+        return jsonify(_metric_json(metric))
+
+    products, actual, abs_error = db.session.query(
+        db.func.count(BacktestMetric.product_id),
+        db.func.sum(BacktestMetric.actual_total),
+        db.func.sum(BacktestMetric.abs_error_total),
+    ).one()
+    wape = abs_error / actual if actual else None
+    worst = (
+        BacktestMetric.query.filter(BacktestMetric.wape.isnot(None))
+        .order_by(BacktestMetric.wape.desc()).limit(request.args.get('limit', 20, type=int)).all()
+    )
+    return jsonify({
+        "products": products,
+        "wape": wape,
+        "accuracy": None if wape is None else max(0.0, 1.0 - wape),
+        "worst": [_metric_json(m) for m in worst],
+    })
+
+
+def _job_json(job: TrainingJob) -> dict:
+    def seconds(start, end):
+        if not start:
+            return None
+        return round(((end or dt.datetime.utcnow()) - start).total_seconds(), 3)
+
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": job.params or {},
+        "progress": {"products_done": job.products_done, "products_total": job.products_total},
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "timings": {
+            "queued_seconds": seconds(job.created_at, job.started_at),
+            "run_seconds": seconds(job.started_at, job.finished_at),
+        },
+    }
+
+
+@admin_bp.get('/jobs/<int:job_id>')
+@jwt_required()
+def get_job(job_id: int):
+    user = User.query.get(get_jwt_identity())
+    if not _is_admin(user):
+        return jsonify({"error": "forbidden"}), 403
+    job = db.session.get(TrainingJob, job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(_job_json(job))
+
+
+def _run_json(run: TrainingRun) -> dict:
+    return {
+        "id": run.id,
+        "kind": run.kind,
+        "mode": run.mode,
+        "status": run.status,
+        "started_at": run.started_at.isoformat(),
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None,
+        "seconds": run.seconds,
+        "products_total": run.products_total,
+        "products_trained": run.products_trained,
+        "phases": run.phases or {},
+        "profile_path": run.profile_path,
+        "error": run.error,
+    }
+
+
+@admin_bp.get('/training-runs')
+@jwt_required()
+def list_training_runs():
+    user = User.query.get(get_jwt_identity())
+    if not _is_admin(user):
+        return jsonify({"error": "forbidden"}), 403
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+    runs = TrainingRun.query.order_by(TrainingRun.id.desc()).limit(limit).all()
+    return jsonify({"runs": [_run_json(run) for run in runs]})
 
 
+@admin_bp.get('/training-runs/<int:run_id>')
+@jwt_required()
+def get_training_run(run_id: int):
+    """A run's phases, its slowest products and the time spent per model type."""
+    user = User.query.get(get_jwt_identity())
+    if not _is_admin(user):
+        return jsonify({"error": "forbidden"}), 403
+    run = db.session.get(TrainingRun, run_id)
+    if not run:
+        return jsonify({"error": "Training run not found"}), 404
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 1000)
+
+    slowest = (
+        db.session.query(TrainingRunProduct, Product.sku)
+        .outerjoin(Product, Product.id == TrainingRunProduct.product_id)
+        .filter(TrainingRunProduct.run_id == run_id)
+        .order_by(TrainingRunProduct.total_seconds.desc())
+        .limit(limit)
+        .all()
+    )
+    by_model = (
+        db.session.query(
+            TrainingRunProduct.model_type,
+            db.func.count(),
+            db.func.sum(TrainingRunProduct.total_seconds),
+            *(db.func.sum(getattr(TrainingRunProduct, f'{name}_seconds')) for name in PRODUCT_PHASES),
+        )
+        .filter(TrainingRunProduct.run_id == run_id)
+        .group_by(TrainingRunProduct.model_type)
+        .all()
+    )
+    return jsonify({
+        **_run_json(run),
+        "slowest_products": [
+            {
+                "product_id": p.product_id,
+                "sku": sku,
+                "model_type": p.model_type,
+                "seconds": round(p.total_seconds, 4),
+                "phases": {name: round(getattr(p, f'{name}_seconds'), 4) for name in PRODUCT_PHASES},
+            }
+            for p, sku in slowest
+        ],
+        "by_model_type": [
+            {
+                "model_type": model_type,
+                "products": count,
+                "seconds": round(total or 0.0, 4),
+                "phases": {name: round(value or 0.0, 4) for name, value in zip(PRODUCT_PHASES, phases)},
+            }
+            for model_type, count, total, *phases in sorted(by_model, key=lambda r: -(r[2] or 0.0))
+        ],
+    })
+
+
+@admin_bp.get('/model-cache')
+@jwt_required()
+def model_cache_stats():
+    user = User.query.get(get_jwt_identity())
+    if not _is_admin(user):
+        return jsonify({"error": "forbidden"}), 403
+    # Counters are per worker process; the pid says which one answered
+    return jsonify(get_registry().stats())
@@ -1,12 +1,9 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import jwt_required
-import numpy as np
-import pandas as pd
 import datetime as dt
-import os
-import joblib
 from ..extensions import db
-from ..models import Sale, ModelTraining, Forecast, Product
+from ..models import ModelTraining, Forecast, Product, DailySales
+from ..response_cache import cached_response
 
 
 forecast_bp = Blueprint('forecast', __name__)
@@ -14,9 +11,17 @@ forecast_bp = Blueprint('forecast', __name__)
 
 @forecast_bp.route('', methods=['GET'])
 @jwt_required()
+# Sales too: the global model predicts uncovered days from recent sales
+@cached_response('training', 'sales', 'products')
 def get_product_forecast():
     product_id = request.args.get('product_id')
-    horizon_days = int(request.args.get('horizon_days', 7))
+    try:
+        horizon_days = int(request.args.get('horizon_days', 7))
+    except ValueError:
+        return jsonify({"error": "horizon_days must be an integer"}), 400
+    max_horizon = current_app.config.get('FORECAST_MAX_HORIZON_DAYS', 365)
+    if horizon_days < 1 or horizon_days > max_horizon:
+        return jsonify({"error": f"horizon_days must be between 1 and {max_horizon}"}), 400
     
     if not product_id:
         return jsonify({"error": "product_id required"}), 400
@@ -26,38 +31,46 @@ def get_product_forecast():
     if not product:
         return jsonify({"error": "Product not found"}), 404
     
-    # Get forecasts for the product
+    # The horizon starts tomorrow, like the forecasts training writes
     today = dt.datetime.now().date()
+    days = [today + dt.timedelta(days=i) for i in range(1, horizon_days + 1)]
     forecasts = Forecast.query.filter(
         Forecast.product_id == int(product_id),
-        Forecast.forecast_date >= today
-    ).order_by(Forecast.forecast_date.asc()).limit(horizon_days).all()
+        Forecast.forecast_date >= days[0],
+        Forecast.forecast_date <= days[-1]
+    ).order_by(Forecast.forecast_date.asc()).all()
+    stored = {f.forecast_date: f for f in forecasts}
     
     # Check if training is in progress - ModelTraining doesn't have product_id
     training_in_progress = ModelTraining.query.filter(
         ModelTraining.trained_at >= today - dt.timedelta(hours=1)
     ).first() is not None
     
-    # Format forecast data
+    # Days training did not precompute are predicted from the cached model in one batch;
+    # imported here so web processes load the ML stack on the first such request, not at startup
+    from ..horizon import predict_days
+    missing = [d for d in days if d not in stored]
+    computed = predict_days(int(product_id), missing) if missing else {}
+    
+    # Format forecast data; days with neither a stored nor a computed value stay at zero
     forecast_data = []
-    if forecasts:
-        for forecast in forecasts:
-            forecast_data.append({
-                "date": forecast.forecast_date.strftime('%Y-%m-%d'),
-                "prediction": forecast.predicted_quantity,
-                "lower_bound": forecast.lower_bound,
-                "upper_bound": forecast.upper_bound
-            })
-    else:
-        # If no forecasts are available, generate default empty forecasts for the next 7 days
-        for i in range(1, horizon_days + 1):
-            next_date = today + dt.timedelta(days=i)
-            forecast_data.append({
-                "date": next_date.strftime('%Y-%m-%d'),
-                "prediction": 0,
-                "lower_bound": 0,
-                "upper_bound": 0
-            })
+    for day in days:
+        if day in stored:
+            f = stored[day]
+            prediction, lower, upper, source = f.predicted_quantity, f.lower_bound, f.upper_bound, 'stored'
+            coverage = f.interval_coverage
+        elif computed and day in computed:
+            (prediction, lower, upper, coverage), source = computed[day], 'computed'
+        else:
+            prediction, lower, upper, coverage, source = 0, 0, 0, None, 'none'
+        forecast_data.append({
+            "date": day.strftime('%Y-%m-%d'),
+            "prediction": prediction,
+            "lower_bound": lower,
+            "upper_bound": upper,
+            "interval_coverage": coverage,
+            "source": source
+        })
     
     return jsonify({
         "product_id": int(product_id),
@@ -66,72 +79,183 @@ def get_product_forecast():
     })
 
 
+def _date_spine(start: dt.date, end: dt.date):
+    """CTE with one `day` row per date from start to end, generated by the database."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        days = db.func.generate_series(
+            db.cast(start, db.DateTime), db.cast(end, db.DateTime), db.text("interval '1 day'")
+        ).column_valued('day')
+        return db.select(db.cast(days, db.Date).label('day')).cte('spine')
+    # SQLite stores dates as 'YYYY-MM-DD' text, which date() produces and the joins compare against
+    spine = db.select(db.func.date(start.isoformat()).label('day')).cte('spine', recursive=True)
+    return spine.union_all(db.select(db.func.date(spine.c.day, '+1 day')).where(spine.c.day < end.isoformat()))
+
+
+def comparison_query(product_ids, start: dt.date, end: dt.date):
+    """Actual and predicted quantity of each product on every day from start to end, in one statement.
+
+    Rows are (product_id, product_name, 'YYYY-MM-DD', actual, predicted or None)
+    ordered by product and day; days without sales are 0. Unknown ids have no rows.
+    """
+    spine = _date_spine(start, end)
+    return (
+        db.select(Product.id, Product.name, db.cast(spine.c.day, db.String),
+                  db.func.coalesce(DailySales.quantity, 0), Forecast.predicted_quantity)
+        .select_from(Product)
+        .join(spine, db.true())
+        # Both are primary/unique key lookups on (product_id, day)
+        .outerjoin(DailySales, db.and_(DailySales.product_id == Product.id, DailySales.day == spine.c.day))
+        .outerjoin(Forecast, db.and_(Forecast.product_id == Product.id, Forecast.forecast_date == spine.c.day))
+        .where(Product.id.in_(product_ids))
+        .order_by(Product.id.asc(), spine.c.day.asc())
+    )
+
+
+def _comparison_args():
+    """(product ids, single) from product_id or comma-separated product_ids, or raise ValueError."""
+    if request.args.get('product_id') and request.args.get('product_ids'):
+        raise ValueError("product_id and product_ids are exclusive")
+    if request.args.get('product_id'):
+        return [int(request.args['product_id'])], True
+    ids = sorted({int(i) for i in request.args.get('product_ids', '').split(',') if i.strip()})
+    if not ids:
+        raise ValueError("product_id required")
+    max_products = current_app.config.get('COMPARISON_MAX_PRODUCTS', 100)
+    if len(ids) > max_products:
+        raise ValueError(f"at most {max_products} product_ids per request")
+    return ids, False
+
+
 @forecast_bp.route('/comparison', methods=['GET', 'OPTIONS'])
 @jwt_required(optional=True)
+@cached_response('training', 'sales', 'products')
 def get_forecast_comparison():
+    """Daily actual sales against stored forecasts over the last `days` days (and today).
+
+    Query args: product_id, or product_ids=1,2,3 for several products at
+    once (answered as a "products" list), and days (COMPARISON_DEFAULT_DAYS).
+    """
     if request.method == 'OPTIONS':
         return '', 200
-        
-    product_id = request.args.get('product_id')
-    if not product_id:
-        return jsonify({"error": "product_id required"}), 400
-    
-    # Get product info
-    product = Product.query.get(int(product_id))
-    if not product:
-        return jsonify({"error": "Product not found"}), 404
-    
-    # Get actual sales data for the past 4 weeks
+
+    try:
+        product_ids, single = _comparison_args()
+        days = int(request.args.get('days', current_app.config.get('COMPARISON_DEFAULT_DAYS', 28)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    max_days = current_app.config.get('COMPARISON_MAX_DAYS', 366)
+    if days < 1 or days > max_days:
+        return jsonify({"error": f"days must be between 1 and {max_days}"}), 400
+
     today = dt.datetime.now().date()
-    four_weeks_ago = today - dt.timedelta(days=28)
-    
-    sales = Sale.query.filter(
-        Sale.product_id == int(product_id),
-        Sale.sale_date >= four_weeks_ago
-    ).order_by(Sale.sale_date.asc()).all()
-    
-    # Group sales by date
-    sales_by_date = {}
-    for sale in sales:
-        date_str = sale.sale_date.strftime('%Y-%m-%d')
-        if date_str in sales_by_date:
-            sales_by_date[date_str] += sale.quantity
-        else:
-            sales_by_date[date_str] = sale.quantity
-    
-    # Get forecasts for the same period
-    forecasts = Forecast.query.filter(
-        Forecast.product_id == int(product_id),
-        Forecast.forecast_date >= four_weeks_ago,
-        Forecast.forecast_date <= today
-    ).order_by(Forecast.forecast_date.asc()).all()
-    
-    # Group forecasts by date
-    forecasts_by_date = {}
-    for forecast in forecasts:
-        date_str = forecast.forecast_date.strftime('%Y-%m-%d')
-        forecasts_by_date[date_str] = forecast.predicted_quantity
-    
-    # Combine data for comparison
-    comparison_data = []
-    current_date = four_weeks_ago
-    while current_date <= today:
-        date_str = current_date.strftime('%Y-%m-%d')
-        actual = sales_by_date.get(date_str, 0)
-        predicted = forecasts_by_date.get(date_str, None)
-        
-        comparison_data.append({
-            "date": date_str,
-            "actual": actual,
-            "predicted": predicted
-        })
-        
-        current_date += dt.timedelta(days=1)
-    
-    return jsonify({
-        "product_id": int(product_id),
-        "product_name": product.name,
-        "comparison_data": comparison_data
-    })
+    rows = db.session.execute(comparison_query(product_ids, today - dt.timedelta(days=days), today))
+
+    products = {}
+    for product_id, name, day, actual, predicted in rows:
+        product = products.get(product_id)
+        if product is None:
+            product = products[product_id] = {"product_id": product_id, "product_name": name, "comparison_data": []}
+        product["comparison_data"].append({"date": day, "actual": actual, "predicted": predicted})
+
+    missing = [pid for pid in product_ids if pid not in products]
+    if missing:
+        return jsonify({"error": "Product not found", "product_ids": missing}), 404
+    if single:
+        return jsonify(products[product_ids[0]])
+    return jsonify({"days": days, "products": list(products.values())})
+
+
+# Ids per IN (...) list; keeps SQLite under its bind parameter limit for very large requests
+BATCH_ID_CHUNK = 10_000
+_BATCH_COLUMNS = ('product_id', 'sku', 'date', 'prediction', 'lower_bound', 'upper_bound')
 
 
+def _batch_selection(data: dict):
+    """Turn the request body into a WHERE clause on products, or raise ValueError."""
+    given = [key for key in ('product_ids', 'sku_prefix', 'all') if data.get(key) not in (None, False, '')]
+    if len(given) != 1:
+        raise ValueError("exactly one of product_ids, sku_prefix or all is required")
+    if given[0] == 'product_ids':
+        ids = data['product_ids']
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise ValueError("product_ids must be a list of integers")
+        ids = sorted(set(ids))
+        return [Product.id.in_(ids[i:i + BATCH_ID_CHUNK]) for i in range(0, len(ids), BATCH_ID_CHUNK)]
+    if given[0] == 'sku_prefix':
+        prefix = str(data['sku_prefix']).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return [Product.sku.like(prefix + '%', escape='\\')]
+    return [None]
+
+
+def _tabular_response(columns: dict, fmt: str):
+    # pyarrow is optional; only Arrow/Parquet clients need it
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return jsonify({"error": f"{fmt} output requires pyarrow on the server"}), 406
+    import io
+    table = pa.table(columns)
+    buf = io.BytesIO()
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, buf)
+        mimetype = 'application/vnd.apache.parquet'
+    else:
+        with pa.ipc.new_stream(buf, table.schema) as writer:
+            writer.write_table(table)
+        mimetype = 'application/vnd.apache.arrow.stream'
+    return current_app.response_class(buf.getvalue(), mimetype=mimetype)
+
+
+@forecast_bp.route('/batch', methods=['POST'])
+@jwt_required()
+def get_batch_forecast():
+    """Stored forecasts of many products in one columnar response.
+
+    Body: one of {"product_ids": [...]}, {"sku_prefix": "..."} or {"all": true},
+    plus optional "horizon_days" (default 7) and "format" ("json", "arrow" or
+    "parquet"). Only precomputed forecasts are returned; products without
+    stored rows for a day are simply absent from it.
+    """
+    data = request.get_json() or {}
+    fmt = data.get('format', 'json')
+    if fmt not in ('json', 'arrow', 'parquet'):
+        return jsonify({"error": "format must be json, arrow or parquet"}), 400
+    try:
+        horizon_days = int(data.get('horizon_days', 7))
+        max_horizon = current_app.config.get('FORECAST_MAX_HORIZON_DAYS', 365)
+        if horizon_days < 1 or horizon_days > max_horizon:
+            raise ValueError(f"horizon_days must be between 1 and {max_horizon}")
+        selections = _batch_selection(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    today = dt.datetime.now().date()
+    start, end = today + dt.timedelta(days=1), today + dt.timedelta(days=horizon_days)
+    # Plain Core execution: these are tuples, the ORM result layer would only add per-row overhead
+    conn = db.session.connection()
+    rows = []
+    for selection in selections:
+        query = (
+            # Dates come back as 'YYYY-MM-DD' text: no per-row date parsing and re-formatting
+            db.select(Forecast.product_id, Product.sku, db.cast(Forecast.forecast_date, db.String),
+                      Forecast.predicted_quantity, Forecast.lower_bound, Forecast.upper_bound)
+            .join(Product, Product.id == Forecast.product_id)
+            .where(Forecast.forecast_date >= start, Forecast.forecast_date <= end)
+            .order_by(Forecast.product_id.asc(), Forecast.forecast_date.asc())
+        )
+        if selection is not None:
+            query = query.where(selection)
+        rows.extend(conn.execute(query).all())
+
+    columns = dict(zip(_BATCH_COLUMNS, map(list, zip(*rows)))) if rows else {c: [] for c in _BATCH_COLUMNS}
+
+    if fmt != 'json':
+        return _tabular_response(columns, fmt)
+    return jsonify({
+        "start_date": start.isoformat(),
+        "horizon_days": horizon_days,
+        "rows": len(rows),
+        "products": len(set(columns['product_id'])),
+        "columns": columns,
+    })
@@ -3,17 +3,41 @@ from flask_jwt_extended import jwt_required
 from sqlalchemy.exc import IntegrityError, OperationalError
 from ..extensions import db
 from ..models import Product
+from ..response_cache import bump_versions
+from ..pagination import STREAM_CHUNK_SIZE, page_args, page_response, stream_items, wants_stream
 
 
 products_bp = Blueprint('products', __name__)
 
 
+# Large enough for the product pickers to load most catalogs in one page; exports use ?stream=1
+PRODUCTS_DEFAULT_LIMIT = 1000
+PRODUCTS_MAX_LIMIT = 5000
+
+
+def _product_json(p) -> dict:
+    return {'id': str(p.id), 'name': p.name, 'sku': p.sku, 'price': p.price, 'stock': p.stock}
+
+
 @products_bp.get('')
 @jwt_required()
 def list_products():
-    products = Product.query.order_by(Product.id.asc()).all()
-    items = [{'id': str(p.id), 'name': p.name, 'sku': p.sku, 'price': p.price, 'stock': p.stock} for p in products]
-    return jsonify({"items": items, "total": len(items)})
+    """List products by id with keyset pagination (after_id, limit); stream=1 exports all."""
+    try:
+        after_id, limit = page_args(PRODUCTS_DEFAULT_LIMIT, PRODUCTS_MAX_LIMIT)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = db.select(Product.id, Product.name, Product.sku, Product.price, Product.stock).order_by(Product.id.asc())
+    after = Product.id > after_id if after_id is not None else None
+
+    if wants_stream():
+        if after is not None:
+            query = query.where(after)
+        rows = db.session.execute(query.execution_options(yield_per=STREAM_CHUNK_SIZE))
+        return stream_items(rows, _product_json)
+
+    return page_response(query, after, limit, _product_json)
 
 
 @products_bp.post('')
@@ -36,6 +60,7 @@ def create_product():
         existing.name = name
         existing.price = float(price)
         existing.stock = stock if stock is not None else existing.stock
+        bump_versions('products')
         db.session.commit()
         return jsonify({'id': str(existing.id), 'name': existing.name, 'sku': existing.sku, 'price': existing.price, 'stock': existing.stock}), 200
 
@@ -62,6 +87,7 @@ def update_product(product_id: int):
         p.price = float(data['price'])
     if 'stock' in data:
         p.stock = int(data['stock'])
+    bump_versions('products')
     try:
         db.session.commit()
     except IntegrityError:
@@ -75,6 +101,7 @@ def update_product(product_id: int):
 def delete_product(product_id: int):
     p = Product.query.get_or_404(product_id)
     db.session.delete(p)
+    bump_versions('products')
     db.session.commit()
     return jsonify({"message": "deleted"})
 
@@ -2,7 +2,10 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
 import datetime as dt
 from ..extensions import db
-from ..models import Product, Sale
+from ..models import DailySales, Product, Sale
+from ..response_cache import cached_response
+from ..rollup import record_sale, remove_sale
+from ..pagination import STREAM_CHUNK_SIZE, page_args, page_response, stream_items, wants_stream
 
 
 sales_bp = Blueprint('sales', __name__)
@@ -20,27 +23,74 @@ def delete_sale(sale_id):
     if product:
         product.stock += sale.quantity
     
+    remove_sale(sale)
     db.session.delete(sale)
     db.session.commit()
     return jsonify({"message": "Sale deleted successfully"}), 200
 
 
+# Newest first; the UI shows recent sales, exports use ?stream=1
+SALES_DEFAULT_LIMIT = 100
+SALES_MAX_LIMIT = 1000
+
+
+def _sale_json(row) -> dict:
+    return {
+        'id': str(row.id),
+        'productId': str(row.product_id),
+        'productName': row.product_name,
+        'quantity': row.quantity,
+        'date': row.sale_date.date().isoformat() if row.sale_date else None,
+    }
+
+
 @sales_bp.get('')
 @jwt_required()
 def list_sales():
-    sales = Sale.query.order_by(Sale.id.desc()).all()
-    items = [{
-        'id': str(s.id),
-        'productId': str(s.product_id),
-        'productName': s.product.name,
-        'quantity': s.quantity,
-        'date': s.sale_date.date().isoformat(),
-    } for s in sales]
-    return jsonify({"items": items, "total": len(items)})
+    """List sales newest first with keyset pagination.
+
+    Query args: after_id (return sales older than this id), limit, product_id,
+    date_from / date_to (ISO dates, inclusive), with_total=1 to count every
+    matching sale, stream=1 to export every matching sale as a streamed
+    response instead of one page.
+    """
+    try:
+        after_id, limit = page_args(SALES_DEFAULT_LIMIT, SALES_MAX_LIMIT)
+        product_id = request.args.get('product_id')
+        product_id = int(product_id) if product_id else None
+        date_from = request.args.get('date_from')
+        date_to = request.args.get('date_to')
+        date_from = dt.date.fromisoformat(date_from) if date_from else None
+        date_to = dt.date.fromisoformat(date_to) if date_to else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Product name joined in the same query instead of a lazy load per sale
+    query = (
+        db.select(Sale.id, Sale.product_id, Product.name.label('product_name'), Sale.quantity, Sale.sale_date)
+        .join(Product, Product.id == Sale.product_id)
+        .order_by(Sale.id.desc())
+    )
+    if product_id is not None:
+        query = query.where(Sale.product_id == product_id)
+    if date_from:
+        query = query.where(Sale.sale_date >= dt.datetime.combine(date_from, dt.time()))
+    if date_to:
+        query = query.where(Sale.sale_date < dt.datetime.combine(date_to + dt.timedelta(days=1), dt.time()))
+    after = Sale.id < after_id if after_id is not None else None
+
+    if wants_stream():
+        if after is not None:
+            query = query.where(after)
+        rows = db.session.execute(query.execution_options(yield_per=STREAM_CHUNK_SIZE))
+        return stream_items(rows, _sale_json)
+
+    return page_response(query, after, limit, _sale_json)
 
 
 @sales_bp.get('/series')
 @jwt_required()
+@cached_response('sales')
 def sales_series():
     import datetime as dt
     import calendar
@@ -65,14 +115,12 @@ def sales_series():
             start_date = dt.date(year, month, 1)
             end_date = dt.date(year, month, days_in_month)
             
-            # Query sales for the specific month
-            day = db.func.date(Sale.sale_date).label('d')
+            # Query sales for the specific month from the daily rollup
             rows = (
-                db.session.query(day, db.func.sum(Sale.quantity).label('s'))
-                .filter(Sale.sale_date >= dt.datetime.combine(start_date, dt.time()))
-                .filter(Sale.sale_date <= dt.datetime.combine(end_date, dt.time(23, 59, 59)))
-                .group_by(day)
-                .order_by(day.asc())
+                db.session.query(DailySales.day, db.func.sum(DailySales.quantity).label('s'))
+                .filter(DailySales.day >= start_date, DailySales.day <= end_date)
+                .group_by(DailySales.day)
+                .order_by(DailySales.day.asc())
                 .all()
             )
             
@@ -100,16 +148,14 @@ def sales_series():
     except Exception:
         days = 14
     since = dt.datetime.utcnow().date() - dt.timedelta(days=days - 1)
-    day = db.func.date(Sale.sale_date).label('d')
     rows = (
-        db.session.query(day, db.func.sum(Sale.quantity).label('s'))
-        .filter(Sale.sale_date >= dt.datetime.combine(since, dt.time()))
-        .group_by(day)
-        .order_by(day.asc())
+        db.session.query(DailySales.day, db.func.sum(DailySales.quantity).label('s'))
+        .filter(DailySales.day >= since)
+        .group_by(DailySales.day)
+        .order_by(DailySales.day.asc())
         .all()
     )
     # Fill missing days with 0
-    # r[0] is a date-like value already because of db.func.date
     series_map = { r[0]: int(r[1]) for r in rows }
     data = []
     for i in range(days):
@@ -150,6 +196,7 @@ def create_sale():
     )
     product.stock -= quantity
     db.session.add(sale)
+    record_sale(sale)
     db.session.commit()
     return jsonify({
         'id': str(sale.id),
@@ -1,75 +1,101 @@
-import threading
-import time
+"""Startup and weekly training, scheduled by exactly one process.
+
+Every server process starts a scheduler thread, but only the one holding
+the leader lock (see leader.py) acts; the others retry the lock every
+SCHEDULER_POLL_SECONDS and take over if the leader goes away. The
+scheduler never trains in its own thread: it enqueues jobs, which the
+job runners claim atomically (see jobs.py), so a training runs once
+however many processes are up.
+
+Once there are sales, it queues a full training on becoming leader (if
+TRAIN_ON_STARTUP is set), and on every poll the weekly retrain
+(training.train_weekly_models' rule: no ModelTraining for the current
+week yet), unless a full training was queued within the last
+SCHEDULER_RETRY_SECONDS, so a failing training is not retried in a loop.
+"""
 import datetime as dt
-import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from flask import current_app
+import logging
+import os
+import threading
+from typing import List, Optional
+from flask import Flask
 from .extensions import db
-from .models import Product, Sale, Forecast, ModelTraining
-from .training import train_weekly_models
+from .jobs import enqueue_training
+from .leader import LeaderLock
+from .models import ModelTraining, Sale, TrainingJob
 
+logger = logging.getLogger(__name__)
 
-def train_weekly_models() -> None:
-    now = dt.datetime.utcnow()
-    current_week = now.isocalendar()[1]
-    current_year = now.year
-    last = ModelTraining.query.order_by(ModelTraining.id.desc()).first()
-    if last and last.last_trained_week == current_week and last.last_trained_year == current_year:
-        return
-
-    products = Product.query.all()
-    for p in products:
-        sales = Sale.query.filter_by(product_id=p.id).all()
-        if len(sales) < 4:
-            continue
-        rows = [{'week': s.week_number, 'year': s.year, 'qty': s.quantity} for s in sales]
-        df = pd.DataFrame(rows).sort_values(['year', 'week'])
-        X = df[['week', 'year']].values
-        y = df['qty'].values
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X, y)
 
-        next_weeks = []
-        w = current_week
-        yyear = current_year
-        for _ in range(4):
-            w += 1
-            if w > 52:
-                w = 1
-                yyear += 1
-            next_weeks.append([w, yyear])
-        preds = model.predict(np.array(next_weeks))
+def weekly_training_due(now: dt.datetime, retry_seconds: float) -> bool:
+    last = ModelTraining.query.order_by(ModelTraining.id.desc()).first()
+    if last and last.last_trained_week == now.isocalendar()[1] and last.last_trained_year == now.year:
+        return False
+    recent = TrainingJob.query.filter(
+        TrainingJob.kind == 'full',
+        TrainingJob.created_at >= now - dt.timedelta(seconds=retry_seconds),
+    ).first()
+    return recent is None
 
-        for (wk, yr), pred in zip(next_weeks, preds):
-            f = Forecast.query.filter_by(product_id=p.id, week_number=wk, year=yr).first()
-            if f:
-                f.predicted_quantity = max(0.0, float(pred))
-            else:
-                db.session.add(Forecast(product_id=p.id, predicted_quantity=max(0.0, float(pred)), week_number=wk, year=yr))
 
-    mt = ModelTraining(last_trained_week=current_week, last_trained_year=current_year, accuracy=0.0)
-    db.session.add(mt)
-    db.session.commit()
+class Scheduler:
+    def __init__(self, app: Flask, lock: Optional[LeaderLock] = None):
+        self.app = app
+        if lock is None:
+            with app.app_context():
+                lock = LeaderLock(db.engine, app.config['SCHEDULER_LOCK_FILE'])
+        self.lock = lock
+        self.is_leader = False
+        # Whether this process has led before: only its first term queues the startup training
+        self._has_led = False
+        self._stop = threading.Event()
 
+    def tick(self) -> List[int]:
+        """One scheduling pass in an app context; returns the ids of the jobs it queued."""
+        was_leader = self.is_leader
+        self.is_leader = self.lock.acquire()
+        if not self.is_leader:
+            if was_leader:
+                logger.warning("Lost scheduler leadership")
+            return []
+        first_term = False
+        if not was_leader:
+            logger.info("Process %d is the training scheduler (%s lock)", os.getpid(), self.lock.backend)
+            first_term, self._has_led = not self._has_led, True
+        if db.session.query(Sale.id).first() is None:
+            # Nothing to train on yet
+            return []
+        if first_term and self.app.config.get('TRAIN_ON_STARTUP', True):
+            return [self._enqueue('startup')]
+        if weekly_training_due(dt.datetime.utcnow(), self.app.config.get('SCHEDULER_RETRY_SECONDS', 3600)):
+            return [self._enqueue('weekly')]
+        return []
 
-def _scheduler_loop():
-    while True:
-        try:
-            with current_app.app_context():
-                train_weekly_models()
-        except Exception:
-            pass
-        now = dt.datetime.utcnow()
-        days_ahead = (7 - now.weekday()) % 7
-        if days_ahead == 0:
-            days_ahead = 7
-        next_monday = (now + dt.timedelta(days=days_ahead)).replace(hour=0, minute=5, second=0, microsecond=0)
-        sleep_seconds = max(60, (next_monday - now).total_seconds())
-        time.sleep(sleep_seconds)
+    def _enqueue(self, reason: str) -> int:
+        job, created = enqueue_training('full')
+        if created:
+            logger.info("Queued %s training as job %d", reason, job.id)
+        return job.id
 
+    def run(self) -> None:
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    self.tick()
+                except Exception:
+                    logger.exception("Scheduler pass failed")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+            self._stop.wait(self.app.config.get('SCHEDULER_POLL_SECONDS', 60))
 
-def start_scheduler():
-    threading.Thread(target=_scheduler_loop, daemon=True).start()
+    def stop(self) -> None:
+        self._stop.set()
+        self.lock.release()
 
 
+def start_scheduler(app: Flask) -> Scheduler:
+    scheduler = Scheduler(app)
+    app.extensions['scheduler'] = scheduler
+    threading.Thread(target=scheduler.run, daemon=True, name='training-scheduler').start()
+    return scheduler
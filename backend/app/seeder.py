@@ -13,7 +13,7 @@ def ensure_admin_user(username: str = 'admin', email: str = 'admin@example.com',
 
 
 if __name__ == '__main__':
-    app = create_app()
+    app = create_app(background=False)
     with app.app_context():
         ensure_admin_user()
         print('Admin user ensured')
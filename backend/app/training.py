@@ -1,12 +1,26 @@
-import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
 import datetime as dt
+import logging
 import os
-import pickle
+import time
 import joblib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from flask import current_app
 from .extensions import db
-from .models import Product, Sale, Forecast, ModelTraining
+from .models import Product, Sale, ModelTraining, ProductTrainingState, TrainingRun
+from .training_data import load_sales_history
+from .features import daily_totals, future_days
+from .forecasters import DEFAULT_MODELS, ForestForecaster, select_forecaster
+from .global_model import GlobalModel, build_panel, fit_global_model, forecast_panel
+from .forecast_store import upsert_forecasts
+from .model_registry import model_path, save_model
+from .compact_forest import CompactForest
+from .training_runs import PhaseTimer, RunProfiler, log_phases, record_run
+from .response_cache import bump_versions
+
+logger = logging.getLogger(__name__)
 
 
 def train_weekly_models() -> None:
@@ -19,218 +33,436 @@ def train_weekly_models() -> None:
     _train_and_save(current_week, current_year)
 
 
-def train_now() -> None:
+def train_now(progress=None, profile=None) -> None:
     now = dt.datetime.utcnow()
     current_week = now.isocalendar()[1]
     current_year = now.year
-    _train_and_save(current_week, current_year)
+    _train_and_save(current_week, current_year, progress=progress, profile=profile)
+
+
+def train_incremental(product_ids=None, progress=None) -> None:
+    """Retrain only products whose sales changed since their model was last built.
+
+    `product_ids` narrows the candidates (e.g. the SKUs touched by an upload);
+    products that are unchanged keep their models and forecasts.
+    """
+    stats = _sales_fingerprints(product_ids)
+    states = _training_states(list(stats))
+    changed = [
+        pid for pid, fingerprint in stats.items()
+        if pid not in states or _state_fingerprint(states[pid]) != fingerprint
+    ]
+    if not changed:
+        logger.info("Incremental training: no product has new sales since its last training")
+        if progress:
+            progress(0, 0)
+        return
+    logger.info("Incremental training: %d of %d candidate products changed", len(changed), len(stats))
+    now = dt.datetime.utcnow()
+    _train_and_save(now.isocalendar()[1], now.year, progress=progress, product_ids=changed)
+
+
+def _sales_fingerprints(product_ids=None):
+    """(count, max id, quantity sum) of every product's sales, from one grouped query."""
+    query = db.session.query(
+        Sale.product_id, db.func.count(Sale.id), db.func.max(Sale.id), db.func.sum(Sale.quantity)
+    ).group_by(Sale.product_id)
+    if product_ids is not None:
+        query = query.filter(Sale.product_id.in_(list(product_ids)))
+    return {pid: (int(count), max_id, int(qty or 0)) for pid, count, max_id, qty in query.all()}
+
+
+def _training_states(product_ids):
+    if not product_ids:
+        return {}
+    rows = ProductTrainingState.query.filter(ProductTrainingState.product_id.in_(product_ids)).all()
+    return {row.product_id: row for row in rows}
+
+
+def _state_fingerprint(state):
+    return (state.sales_count, state.sales_max_id, state.sales_quantity_sum)
+
+
+def _record_training_states(fingerprints, trained_models, trained_at):
+    """Store the sales fingerprint each product was evaluated against (one SELECT for all states).
+
+    `trained_models` maps the products trained in this run to (model type, holdout MAE).
+    """
+    states = _training_states(list(fingerprints))
+    for pid, (count, max_id, qty_sum) in fingerprints.items():
+        state = states.get(pid)
+        if state is None:
+            state = ProductTrainingState(product_id=pid)
+            db.session.add(state)
+        state.sales_count, state.sales_max_id, state.sales_quantity_sum = count, max_id, qty_sum
+        if pid in trained_models:
+            state.last_trained_at = trained_at
+            state.model_type, state.holdout_mae = trained_models[pid]
+
+
+def _forest(forest_params):
+    # n_jobs=1: parallelism comes from the process pool; threads inside a fit on a few hundred rows only add overhead
+    return RandomForestRegressor(random_state=42, n_jobs=1, **forest_params)
+
+
+def _save_forest(forest, models_dir, product_id, kind, compress):
+    # Only the node arrays prediction needs are written, see compact_forest
+    save_model(CompactForest.from_sklearn(forest), model_path(models_dir, product_id, kind), compress=compress)
+
+
+def model_config(config):
+    """Keyword arguments of forecasters.select_forecaster from the app config; picklable for pool workers."""
+    return {
+        'models': config.get('TRAINING_MODELS', DEFAULT_MODELS),
+        'holdout_days': config.get('TRAINING_HOLDOUT_DAYS', 14),
+        'forest_min_history_days': config.get('TRAINING_FOREST_MIN_DAYS', 90),
+        'forest_params': {
+            'n_estimators': 50,  # Reduced from 100 for faster training
+            # Depth and leaf-size limits keep each forest a few hundred KB instead of MBs
+            'max_depth': config.get('MODEL_MAX_DEPTH'),
+            'min_samples_leaf': config.get('MODEL_MIN_SAMPLES_LEAF', 1),
+        },
+    }
+
+
+def _forecast_rows(product_id, next_days, preds, lower, upper, coverage):
+    forecast_data = []
+    for forecast_date, pred, low, high in zip(next_days.astype(object), preds, lower, upper):
+        forecast_data.append({
+            'product_id': product_id,
+            'forecast_date': forecast_date,
+            'predicted_quantity': float(pred),
+            'lower_bound': float(low),
+            'upper_bound': float(high),
+            'interval_coverage': coverage,
+            'week_number': forecast_date.isocalendar()[1],
+            'year': forecast_date.year
+        })
+    return forecast_data
+
+
+def _train_product(product_id, history, models_dir, today, model_config, compress, coverage):
+    """Pick and fit the daily model of one product.
+
+    Returns its forecast rows, (model type, holdout MAE) and the seconds
+    spent per phase (see training_runs). Runs inside pool workers, so it
+    must not touch the database session.
+    """
+    timer = PhaseTimer()
+    # Daily totals straight from the datetime64 arrays
+    with timer.phase('features'):
+        days, y_daily = daily_totals(history.dates, history.quantities)
+    if days.size == 0:
+        logger.warning("No daily sales for product %s", product_id)
+        return [], None, timer.seconds
+
+    with timer.phase('fit'):
+        selection = select_forecaster(days, y_daily, **model_config)
+    daily_model = selection.model
+
+    # Save the trained model to a file
+    with timer.phase('serialize'):
+        save_model(daily_model, model_path(models_dir, product_id, 'daily'), compress=compress)
+
+    # Batch predict for all 7 days at once, with bounds from the model's holdout residuals
+    with timer.phase('predict'):
+        next_days = future_days(today, 7)
+        preds, lower, upper = daily_model.forecast_interval(next_days, coverage)
+        forecast_data = _forecast_rows(product_id, next_days, preds, lower, upper, coverage)
+
+    # Also save weekly forecasts for backward compatibility; only products
+    # with enough history to be served by a forest still pay for one
+    if daily_model.name == ForestForecaster.name:
+        with timer.phase('features'):
+            weekly_df = pd.DataFrame({'week': history.week_numbers, 'year': history.years, 'qty': history.quantities})
+            weekly_df = weekly_df.sort_values(['year', 'week'])
+
+        if not weekly_df.empty:
+            X_weekly = weekly_df[['week', 'year']].values
+            y_weekly = weekly_df['qty'].values
+
+            with timer.phase('fit'):
+                weekly_model = _forest(model_config['forest_params'])
+                weekly_model.fit(X_weekly, y_weekly)
+
+            # Save weekly model
+            with timer.phase('serialize'):
+                _save_forest(weekly_model, models_dir, product_id, 'weekly', compress)
+
+    return forecast_data, (daily_model.name, selection.holdout_mae), timer.seconds
+
+
+def _train_product_batch(batch, models_dir, today, model_config, compress, coverage):
+    """Pool task: train a chunk of products so per-task IPC overhead is amortised."""
+    results = []
+    for product_id, history in batch:
+        results.append((product_id, *_train_product(product_id, history, models_dir, today, model_config,
+                                                    compress, coverage)))
+    return results
+
+
+def _train_global(tasks, prices, refit, models_dir, today, max_iter, compress, coverage, timer, progress=None):
+    """TRAINING_MODE=global: one model for all products (see global_model); yields like the per-product path.
+
+    Incremental runs reuse the saved model and only refresh the forecasts of
+    the changed products, whose lag features moved with their new sales.
+    Phases are timed for the whole catalog on `timer`, so products carry no
+    timings of their own. `progress` is called around the catalog-wide fit,
+    before any product completes, to keep a job's heartbeat alive.
+    """
+    with timer.phase('features'):
+        series = {pid: daily_totals(history.dates, history.quantities) for pid, history in tasks}
+    if not series:
+        return
+    path = model_path(models_dir, None, 'global')
+    with timer.phase('serialize'):
+        model = None if refit or not os.path.exists(path) else joblib.load(path)
+    if not isinstance(model, GlobalModel):
+        # Also refits a bare regressor saved before intervals, which has no residuals
+        with timer.phase('features'):
+            panel = build_panel(series, prices, today)
+        if progress:
+            progress(0, len(tasks))
+        with timer.phase('fit'):
+            model = fit_global_model(panel, max_iter=max_iter)
+        if progress:
+            progress(0, len(tasks))
+        with timer.phase('serialize'):
+            save_model(model, path, compress=compress)
 
+    with timer.phase('features'):
+        panel = build_panel(series, prices, today, extra_days=7)
+    with timer.phase('predict'):
+        next_days = future_days(today, 7)
+        # Every product's week in one predict() call
+        preds = forecast_panel(model, panel, 7)
+        lower, upper = model.interval(preds, coverage)
+        rows = [_forecast_rows(product_id, next_days, preds[i], lower[i], upper[i], coverage)
+                for i, product_id in enumerate(panel.product_ids.tolist())]
+    for product_id, product_rows in zip(panel.product_ids.tolist(), rows):
+        yield product_id, product_rows, ('global', None), None
 
-def _train_and_save(current_week: int, current_year: int) -> None:
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _run_training_batches(batches, deadline, workers, start_method, task=None, **kwargs):
+    """Yield the results of `task(batch, **kwargs)` for every batch until the deadline passes.
+
+    `task` must be a module-level function so pool workers can unpickle it;
+    it defaults to training products, yielding (product_id, forecast rows, model info).
+    """
+    task = task or _train_product_batch
+    if workers <= 1:
+        for batch in batches:
+            if dt.datetime.now() > deadline:
+                logger.warning("Training time limit reached, remaining products left untrained")
+                return
+            yield from task(batch, **kwargs)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
     try:
-        print("Starting model training...")
+        futures = [executor.submit(task, batch, **kwargs) for batch in batches]
+        remaining = max(0.0, (deadline - dt.datetime.now()).total_seconds())
+        try:
+            for future in as_completed(futures, timeout=remaining):
+                yield from future.result()
+        except FuturesTimeoutError:
+            logger.warning("Training time limit reached, remaining products left untrained")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _backtest_accuracy(model_types, progress=None):
+    """Backtest the models just trained; a failure costs the accuracy figure, not the training run.
+
+    Runs before the training writes anything, so a failure is rolled back
+    without a savepoint: on SQLite, a savepoint would open the transaction
+    and keep the job's heartbeat from being written during the backtest.
+    """
+    from .backtest import run_backtest
+    try:
+        summary = run_backtest(progress=progress, model_types=model_types)
+    except Exception as e:
+        logger.exception("Backtest after training failed: %s", e)
+        db.session.rollback()
+        return None
+    return summary and summary['accuracy']
+
+
+def _train_and_save(current_week: int, current_year: int, progress=None, product_ids=None, profile=None) -> None:
+    # progress: optional callable(products_done, products_total) used by the job runner
+    # product_ids: restrict the run to these products (incremental mode); None retrains everything
+    # profile: 'cprofile' or 'pyinstrument' to profile this run, defaulting to TRAINING_PROFILE
+    config = current_app.config
+    profile = profile or config.get('TRAINING_PROFILE')
+    if not profile:
+        _run_training(current_week, current_year, progress, product_ids)
+        return
+    kind = 'full' if product_ids is None else 'incremental'
+    name = f"training_{dt.datetime.utcnow():%Y%m%dT%H%M%S}_{kind}"
+    profiler = RunProfiler(profile, config.get('TRAINING_PROFILE_DIR', 'profiles'), name)
+    with profiler:
+        run_id = _run_training(current_week, current_year, progress, product_ids)
+    if run_id is not None:
+        db.session.get(TrainingRun, run_id).profile_path = profiler.path
+        db.session.commit()
+
+
+def _run_training(current_week, current_year, progress, product_ids):
+    """Train, write forecasts and record the run in training_runs; returns the run's id (None when idle)."""
+    incremental = product_ids is not None
+    kind = 'incremental' if incremental else 'full'
+    config = current_app.config
+    mode = config.get('TRAINING_MODE', 'per_product')
+    started_at = dt.datetime.utcnow()
+    timer = PhaseTimer()
+    tasks = []
+    try:
+        logger.info("Starting model training...")
         start_time = dt.datetime.now()
-        max_training_time = dt.timedelta(minutes=2)  # Limit training to 2 minutes
-        
+        max_training_time = dt.timedelta(seconds=config.get('TRAINING_MAX_SECONDS', 120))
+        workers = config.get('TRAINING_WORKERS', os.cpu_count() or 1)
+        batch_size = max(1, config.get('TRAINING_BATCH_SIZE', 50))
+
         # Create models directory if it doesn't exist
-        models_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+        models_dir = config['MODELS_DIR']
         if not os.path.exists(models_dir):
             os.makedirs(models_dir)
-            print(f"Created models directory at {models_dir}")
-        
+            logger.info("Created models directory at %s", models_dir)
+
         # Create a lock file to indicate training is in progress
         lock_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'training_in_progress.lock')
         with open(lock_file, 'w') as f:
             f.write(f"Training started at {dt.datetime.now()}")
-        
-        # Get all products at once
-        products = Product.query.all()
-        
-        if not products:
-            print("No products found in database")
-            os.remove(lock_file)
-            return
-            
-        print(f"Found {len(products)} products to process")
-        
-        # Optimize model parameters for faster training
-        n_estimators = 50  # Reduced from 100 for faster training
-        
-        for p in products:
-            # Check if we've exceeded the time limit
-            if dt.datetime.now() - start_time > max_training_time:
-                print(f"Training time limit reached after processing {p.id} products")
-                break
-                
-            # Get ALL sales data for this product
-            sales = Sale.query.filter_by(product_id=p.id).all()
-            if len(sales) < 4:
-                print(f"Skipping product {p.id} - not enough sales data (only {len(sales)} records)")
-                continue
-                
-            print(f"Training model for product {p.id} with {len(sales)} sales records")
-            
-            # Ensure sales have week_number and year
-            for sale in sales:
-                if not sale.week_number or not sale.year:
-                    # Calculate week_number and year if missing
-                    iso = sale.sale_date.isocalendar()
-                    sale.week_number = iso[1]
-                    sale.year = sale.sale_date.year
-            
-            # Create a DataFrame with daily sales data - use all available data
-            sales_by_date = {}
-            for sale in sales:
-                date_str = sale.sale_date.strftime('%Y-%m-%d')
-                if date_str in sales_by_date:
-                    sales_by_date[date_str] += sale.quantity
-                else:
-                    sales_by_date[date_str] = sale.quantity
-            
-            # Convert to DataFrame and sort by date
-            daily_df = pd.DataFrame([
-                {'date': date, 'qty': qty, 'day_of_week': dt.datetime.strptime(date, '%Y-%m-%d').weekday()}
-                for date, qty in sales_by_date.items()
-            ])
-            
-            if daily_df.empty:
-                print(f"Empty dataframe for product {p.id}")
+
+        with timer.phase('load'):
+            # Only ids and prices are needed here; sales come from the bulk loader below
+            query = db.session.query(Product.id, Product.price).order_by(Product.id.asc())
+            if incremental:
+                query = query.filter(Product.id.in_(list(product_ids)))
+            prices = dict(query.all())
+            product_ids = list(prices)
+
+            if not product_ids:
+                logger.info("No products found in database")
+                os.remove(lock_file)
+                return None
+
+            logger.info("Found %d products to process", len(product_ids))
+
+            # Load every product's sales in one streamed query instead of one query per product
+            histories = load_sales_history(product_ids if incremental else None)
+            fingerprints = _sales_fingerprints(product_ids if incremental else None)
+
+        skipped = 0
+        for product_id in product_ids:
+            history = histories.get(product_id)
+            n_sales = 0 if history is None else int(history.sales_counts.sum())
+            if n_sales < 4:
+                logger.debug("Skipping product %s - not enough sales data (only %d records)", product_id, n_sales)
+                skipped += 1
                 continue
-                
-            daily_df = daily_df.sort_values('date')
-            
-            # Add features for the model
-            daily_df['day_of_week'] = daily_df['date'].apply(lambda x: dt.datetime.strptime(x, '%Y-%m-%d').weekday())
-            daily_df['month'] = daily_df['date'].apply(lambda x: dt.datetime.strptime(x, '%Y-%m-%d').month)
-            daily_df['day'] = daily_df['date'].apply(lambda x: dt.datetime.strptime(x, '%Y-%m-%d').day)
-            
-            # Create features for daily prediction
-            X_daily = daily_df[['day_of_week', 'month', 'day']].values
-            y_daily = daily_df['qty'].values
-            
-            print(f"Training daily model with X shape: {X_daily.shape}, y shape: {y_daily.shape}")
-            # Use fewer estimators for faster training
-            daily_model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=-1)  # Use all CPU cores
-            daily_model.fit(X_daily, y_daily)
-            
-            # Save the trained model to a file
-            model_path = os.path.join(models_dir, f'product_{p.id}_daily_model.joblib')
-            joblib.dump(daily_model, model_path)
-            print(f"Saved daily model to {model_path}")
-            
-            # Generate daily predictions for the next 7 days
-            today = dt.datetime.now().date()
-            next_days = []
-            daily_preds = []
-            lower_bounds = []
-            upper_bounds = []
-            
-            # Batch predict for all 7 days at once for efficiency
-            next_day_features = np.array([
-                [
-                    (today + dt.timedelta(days=i)).weekday(),
-                    (today + dt.timedelta(days=i)).month,
-                    (today + dt.timedelta(days=i)).day
-                ] 
-                for i in range(1, 8)
-            ])
-            
-            batch_preds = daily_model.predict(next_day_features)
-            
-            for i, pred in enumerate(batch_preds):
-                next_date = today + dt.timedelta(days=i+1)
-                pred = max(0.0, float(pred))
-                
-                next_days.append(next_date.strftime('%Y-%m-%d'))
-                daily_preds.append(pred)
-                lower_bounds.append(max(0, pred * 0.8))  # 20% lower bound
-                upper_bounds.append(pred * 1.2)          # 20% upper bound
-            
-            # Batch update forecasts in database
-            forecast_data = []
-            for date_str, pred, lower, upper in zip(next_days, daily_preds, lower_bounds, upper_bounds):
-                forecast_date = dt.datetime.strptime(date_str, '%Y-%m-%d').date()
-                forecast_data.append({
-                    'product_id': p.id,
-                    'forecast_date': forecast_date,
-                    'predicted_quantity': pred,
-                    'lower_bound': lower,
-                    'upper_bound': upper,
-                    'week_number': forecast_date.isocalendar()[1],
-                    'year': forecast_date.year
-                })
-            
-            # Bulk update/insert forecasts
-            for data in forecast_data:
-                f = Forecast.query.filter_by(
-                    product_id=data['product_id'], 
-                    forecast_date=data['forecast_date']
-                ).first()
-                
-                if f:
-                    f.predicted_quantity = data['predicted_quantity']
-                    f.lower_bound = data['lower_bound']
-                    f.upper_bound = data['upper_bound']
-                else:
-                    new_forecast = Forecast(
-                        product_id=data['product_id'],
-                        predicted_quantity=data['predicted_quantity'],
-                        lower_bound=data['lower_bound'],
-                        upper_bound=data['upper_bound'],
-                        forecast_date=data['forecast_date'],
-                        week_number=data['week_number'],
-                        year=data['year']
-                    )
-                    db.session.add(new_forecast)
-            
-            # Also save weekly forecasts for backward compatibility (optimized)
-            weekly_df = pd.DataFrame([{'week': s.week_number, 'year': s.year, 'qty': s.quantity} for s in sales])
-            weekly_df = weekly_df.sort_values(['year', 'week'])
-            
-            if not weekly_df.empty:
-                X_weekly = weekly_df[['week', 'year']].values
-                y_weekly = weekly_df['qty'].values
-                
-                weekly_model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=-1)
-                weekly_model.fit(X_weekly, y_weekly)
-                
-                next_weeks = []
-                w = current_week
-                yyear = current_year
-                for _ in range(4):
-                    w += 1
-                    if w > 52:
-                        w = 1
-                        yyear += 1
-                    next_weeks.append([w, yyear])
-                
-                weekly_preds = weekly_model.predict(np.array(next_weeks))
-                
-                # Save weekly model
-                weekly_model_path = os.path.join(models_dir, f'product_{p.id}_weekly_model.joblib')
-                joblib.dump(weekly_model, weekly_model_path)
-
-        mt = ModelTraining(last_trained_week=current_week, last_trained_year=current_year, accuracy=0.0)
-        db.session.add(mt)
-        db.session.commit()
-        
+            tasks.append((product_id, history))
+        if skipped:
+            logger.info("Skipping %d products with fewer than 4 sales records", skipped)
+
+        today = dt.datetime.now().date()
+        # Memory-mapped loading needs uncompressed files
+        compress = 0 if config.get('MODEL_MMAP_MODE') else config.get('MODEL_COMPRESS', 0)
+        coverage = config.get('FORECAST_INTERVAL_COVERAGE', 0.8)
+        if mode == 'global':
+            logger.info("Training one global model for %d products", len(tasks))
+            results = _train_global(tasks, prices, not incremental, models_dir, today,
+                                    config.get('GLOBAL_MODEL_MAX_ITER', 200), compress, coverage, timer, progress)
+        else:
+            batches = list(_chunks(tasks, batch_size))
+            workers = max(1, min(workers, len(batches)))
+            logger.info("Training %d products with %d worker(s), %d products per batch", len(tasks), workers, batch_size)
+            results = _run_training_batches(
+                batches,
+                deadline=start_time + max_training_time,
+                workers=workers,
+                start_method=config.get('TRAINING_MP_START_METHOD', 'spawn'),
+                models_dir=models_dir,
+                today=today,
+                model_config=model_config(config),
+                compress=compress,
+                coverage=coverage,
+            )
+
+        # Write every gathered forecast in the same transaction as the ModelTraining row
+        trained_models = {}
+        product_timings = {}
+        forecast_rows = []
+        if progress:
+            progress(0, len(tasks))
+        train_start = time.perf_counter()
+        for product_id, forecast_data, model_info, seconds in results:
+            trained_models[product_id] = model_info or (None, None)
+            if seconds:
+                product_timings[product_id] = (trained_models[product_id][0], seconds)
+                timer.merge(seconds)
+            forecast_rows.extend(forecast_data)
+            if progress:
+                progress(len(trained_models), len(tasks))
+        timer.add('train', time.perf_counter() - train_start)
+        logger.info("Trained %d/%d products in %.1fs", len(trained_models), len(tasks),
+                    (dt.datetime.now() - start_time).total_seconds())
+
+        # Before the writes: the backtest reports progress (the job heartbeat) from another connection,
+        # which a write transaction held open on SQLite would block
+        accuracy = None
+        if not incremental and config.get('BACKTEST_ON_TRAINING', True):
+            with timer.phase('backtest'):
+                accuracy = _backtest_accuracy({pid: info[0] for pid, info in trained_models.items()}, progress)
+
+        with timer.phase('write'):
+            upsert_forecasts(forecast_rows)
+            # Products cut off by the time limit keep their old fingerprint so the next incremental run picks them up
+            skipped_ids = set(fingerprints) - {pid for pid, _ in tasks}
+            _record_training_states(
+                {pid: fp for pid, fp in fingerprints.items() if pid in trained_models or pid in skipped_ids},
+                trained_models,
+                dt.datetime.utcnow(),
+            )
+
+        # Incremental runs do not count as the weekly full retrain
+        if not incremental:
+            mt = ModelTraining(last_trained_week=current_week, last_trained_year=current_year, accuracy=accuracy)
+            db.session.add(mt)
+        with timer.phase('write'):
+            run = record_run(kind, mode, 'succeeded', started_at, timer, len(tasks), len(trained_models),
+                             product_timings, detail_keep=config.get('TRAINING_RUN_DETAIL_KEEP', 20))
+            # Cached forecast responses expire with this commit
+            bump_versions('training')
+            db.session.commit()
+        log_phases(kind, timer, len(trained_models))
+
         # Remove the lock file when training is complete
         if os.path.exists(lock_file):
             os.remove(lock_file)
-            
-        print("Model training completed successfully")
+
+        logger.info("Model training completed successfully")
+        return run.id
     except Exception as e:
-        print(f"Error in model training: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        
+        logger.exception("Error in model training: %s", e)
+
         # Remove lock file in case of error
         lock_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'training_in_progress.lock')
         if os.path.exists(lock_file):
             os.remove(lock_file)
-            
-        # Rollback any partial changes
+
+        # Rollback any partial changes, then keep a record of the failed run
         db.session.rollback()
+        try:
+            record_run(kind, mode, 'failed', started_at, timer, len(tasks), error=str(e),
+                       detail_keep=config.get('TRAINING_RUN_DETAIL_KEEP', 20))
+            db.session.commit()
+        except Exception:
+            logger.exception("Could not record the failed training run")
+            db.session.rollback()
         raise
-
-
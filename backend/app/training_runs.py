@@ -0,0 +1,152 @@
+"""Timing and profiling of training runs.
+
+Training is split into phases: `load` (sales from the database), then per
+product `features`, `fit`, `predict` and `serialize` (writing the model
+file), and finally `write` (forecasts and training states into the
+database) and `backtest`. Per-product phases are timed inside the pool
+workers and sent back with each product's results; the run keeps their
+sums, next to the wall-clock `train` phase they ran in.
+
+Every run is stored in `training_runs`; the per-product seconds of the
+latest TRAINING_RUN_DETAIL_KEEP runs are kept in `training_run_products`
+to find the SKUs that dominate the training window.
+
+TRAINING_PROFILE=cprofile|pyinstrument (or `profile` on a train-now
+request) also profiles the run and dumps the result to
+TRAINING_PROFILE_DIR. Only the process driving the run is profiled: with
+pool workers their share shows up as waiting on futures, which is what the
+per-product timers are for.
+"""
+import cProfile
+import datetime as dt
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from sqlalchemy import delete, insert, select
+from .extensions import db
+from .models import TrainingRun, TrainingRunProduct
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_PHASES = ('features', 'fit', 'predict', 'serialize')
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+class PhaseTimer:
+    """Seconds spent per phase; a plain dict underneath so workers can send it back."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def merge(self, seconds: Dict[str, float]) -> None:
+        for name, value in seconds.items():
+            self.add(name, value)
+
+    def rounded(self) -> Dict[str, float]:
+        return {name: round(value, 4) for name, value in self.seconds.items()}
+
+
+class RunProfiler:
+    """Profile a block with cProfile or pyinstrument and dump it to `directory`; `path` is set on exit."""
+
+    def __init__(self, profiler: str, directory: str, name: str):
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}', expected one of {', '.join(PROFILERS)}")
+        self.profiler = profiler
+        self.directory = directory
+        self.name = name
+        self.path: Optional[str] = None
+        self._profile = None
+
+    def __enter__(self):
+        if self.profiler == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+                self._profile = Profiler()
+            except ImportError:
+                logger.warning("pyinstrument is not installed, profiling with cProfile instead")
+                self.profiler = 'cprofile'
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+        if self.profiler == 'pyinstrument':
+            self._profile.start()
+        else:
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        os.makedirs(self.directory, exist_ok=True)
+        if self.profiler == 'pyinstrument':
+            self._profile.stop()
+            self.path = os.path.join(self.directory, f'{self.name}.html')
+            with open(self.path, 'w') as f:
+                f.write(self._profile.output_html())
+        else:
+            self._profile.disable()
+            # Readable with `python -m pstats` or snakeviz
+            self.path = os.path.join(self.directory, f'{self.name}.prof')
+            self._profile.dump_stats(self.path)
+        logger.info("Training profile written to %s", self.path)
+        return False
+
+
+def record_run(kind: str, mode: str, status: str, started_at: dt.datetime, timer: PhaseTimer,
+               products_total: int = 0, products_trained: int = 0,
+               product_timings: Optional[Dict[int, tuple]] = None,
+               profile_path: Optional[str] = None, error: Optional[str] = None,
+               detail_keep: int = 20) -> TrainingRun:
+    """Add a finished run, its per-product seconds and prune old details; the caller commits.
+
+    `product_timings` maps product id to (model type, {phase: seconds}).
+    """
+    finished_at = dt.datetime.utcnow()
+    product_timings = product_timings or {}
+    run = TrainingRun(
+        kind=kind, mode=mode, status=status, started_at=started_at, finished_at=finished_at,
+        seconds=round((finished_at - started_at).total_seconds(), 3),
+        products_total=products_total, products_trained=products_trained,
+        phases=timer.rounded(), profile_path=profile_path, error=error,
+    )
+    db.session.add(run)
+    db.session.flush()
+    rows = [
+        {
+            'run_id': run.id,
+            'product_id': pid,
+            'model_type': model_type,
+            **{f'{name}_seconds': seconds.get(name, 0.0) for name in PRODUCT_PHASES},
+            'total_seconds': sum(seconds.values()),
+        }
+        for pid, (model_type, seconds) in product_timings.items() if seconds
+    ]
+    if rows:
+        db.session.execute(insert(TrainingRunProduct), rows)
+    _prune_details(detail_keep)
+    return run
+
+
+def _prune_details(keep: int) -> None:
+    oldest_kept = db.session.execute(
+        select(TrainingRun.id).order_by(TrainingRun.id.desc()).offset(max(keep, 1) - 1).limit(1)
+    ).scalar()
+    if oldest_kept is not None:
+        db.session.execute(delete(TrainingRunProduct).where(TrainingRunProduct.run_id < oldest_kept))
+
+
+def log_phases(kind: str, timer: PhaseTimer, products: int) -> None:
+    phases = ', '.join(f'{name} {seconds:.2f}s' for name, seconds in timer.seconds.items())
+    logger.info("Training run (%s) over %d products: %s", kind, products, phases)
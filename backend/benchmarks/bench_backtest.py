@@ -0,0 +1,80 @@
+"""Throughput of the rolling-origin backtest engine.
+
+Usage (from backend/):
+    python benchmarks/bench_backtest.py [--products 10000] [--days 730] [--workers N] [--origins 4]
+
+Backtests synthetic products with two years of daily sales directly through
+the engine's batch task on the training process pool (loading the history
+from the database is covered by bench_training_loader.py). Products are
+served by a realistic mix of models, or all by one with --model-type.
+"""
+import argparse
+import datetime as dt
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from app.backtest import _backtest_batch, forecast_origins, metrics
+from app.training import _chunks, _run_training_batches
+from app.training_data import SalesHistory
+
+TODAY = dt.date(2025, 1, 1)
+MODEL_MIX = {'seasonal_naive': 0.45, 'ses': 0.25, 'ridge': 0.2, 'random_forest': 0.1}
+CONFIG = {
+    'models': tuple(MODEL_MIX), 'holdout_days': 14, 'forest_min_history_days': 90,
+    'forest_params': {'n_estimators': 50, 'max_depth': 12, 'min_samples_leaf': 2},
+}
+
+
+def synthetic_history(rng, n_days):
+    days = np.datetime64(TODAY, 'D') - n_days + np.arange(n_days)
+    dows = (days.astype(np.int64) + 3) % 7
+    qty = rng.poisson(rng.uniform(0.5, 30) * np.where(dows >= 5, 1.5, 1.0))
+    sold = qty > 0
+    days, qty = days[sold], qty[sold].astype(np.int64)
+    ones = np.ones(len(days), dtype=np.int64)
+    return SalesHistory(days, qty, ones, ones, ones)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--origins', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--model-type', choices=tuple(MODEL_MIX))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    names, shares = list(MODEL_MIX), list(MODEL_MIX.values())
+    tasks = [
+        (pid, synthetic_history(rng, args.days), args.model_type or names[rng.choice(len(names), p=shares)])
+        for pid in range(args.products)
+    ]
+    origins = forecast_origins(TODAY, args.origins, 7, 7)
+
+    start = time.perf_counter()
+    results = list(_run_training_batches(
+        list(_chunks(tasks, args.batch_size)),
+        deadline=dt.datetime.now() + dt.timedelta(hours=1),
+        workers=args.workers,
+        start_method='spawn',
+        task=_backtest_batch,
+        origins=origins,
+        horizon=7,
+        config=CONFIG,
+        coverage=0.8,
+    ))
+    seconds = time.perf_counter() - start
+    total = metrics(np.stack([row for _, _, row in results]).sum(axis=0))
+    print(f"{len(results)} products x {args.days} days, {args.origins} origins, {args.workers} worker(s): "
+          f"{seconds:.1f}s ({seconds * 1000 / len(results):.2f} ms/product)")
+    print('  '.join(f"{k} {float(v[0]):.3f}" for k, v in total.items()))
+
+
+if __name__ == '__main__':
+    main()
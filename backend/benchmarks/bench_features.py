@@ -0,0 +1,81 @@
+"""Compare the old strftime/strptime daily features with app.features.
+
+Usage (from backend/):
+    python benchmarks/bench_features.py [--skus 10000] [--years 5] [--sale-rate 0.6]
+
+Generates a synthetic history (one row per selling day per SKU) in memory; no database needed.
+"""
+import argparse
+import datetime as dt
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from app.features import calendar_features, daily_totals
+
+
+def legacy_features(dates, quantities):
+    # The pre-features.py path from training._train_and_save
+    sales_by_date = {}
+    for d, qty in zip(dates, quantities):
+        date_str = d.strftime('%Y-%m-%d')
+        if date_str in sales_by_date:
+            sales_by_date[date_str] += qty
+        else:
+            sales_by_date[date_str] = qty
+    daily_df = pd.DataFrame([
+        {'date': date, 'qty': qty, 'day_of_week': dt.datetime.strptime(date, '%Y-%m-%d').weekday()}
+        for date, qty in sales_by_date.items()
+    ])
+    daily_df = daily_df.sort_values('date')
+    daily_df['day_of_week'] = daily_df['date'].apply(lambda x: dt.datetime.strptime(x, '%Y-%m-%d').weekday())
+    daily_df['month'] = daily_df['date'].apply(lambda x: dt.datetime.strptime(x, '%Y-%m-%d').month)
+    daily_df['day'] = daily_df['date'].apply(lambda x: dt.datetime.strptime(x, '%Y-%m-%d').day)
+    return daily_df[['day_of_week', 'month', 'day']].values, daily_df['qty'].values
+
+
+def vectorized_features(dates, quantities):
+    days, totals = daily_totals(dates, quantities)
+    return calendar_features(days), totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--skus', type=int, default=10000)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--sale-rate', type=float, default=0.6, help='share of days with a sale')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    n_days = 365 * args.years
+    start = np.datetime64('2019-01-01T00:00', 'us')
+    histories = []
+    for _ in range(args.skus):
+        offsets = np.flatnonzero(rng.random(n_days) < args.sale_rate)
+        dates = start + offsets.astype('timedelta64[D]') + rng.integers(0, 86_400, offsets.size).astype('timedelta64[s]')
+        histories.append((dates, rng.integers(1, 20, offsets.size)))
+    rows = sum(len(q) for _, q in histories)
+    print(f"{args.skus} SKUs, {args.years} years, {rows} sale rows")
+
+    t0 = time.perf_counter()
+    for dates, qtys in histories:
+        vectorized_features(dates, qtys)
+    new_t = time.perf_counter() - t0
+
+    # The legacy path started from ORM datetime objects, so convert outside the timed section
+    legacy_histories = [(dates.astype(object), qtys.tolist()) for dates, qtys in histories]
+    t0 = time.perf_counter()
+    for dates, qtys in legacy_histories:
+        legacy_features(dates, qtys)
+    old_t = time.perf_counter() - t0
+
+    print(f"legacy:     {old_t:8.2f}s")
+    print(f"vectorized: {new_t:8.2f}s  ({old_t / new_t:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Time POST /api/forecast/batch against many SKUs.
+
+Usage (from backend/):
+    python benchmarks/bench_forecast_batch.py [--products 50000] [--horizon 7]
+
+Seeds a throwaway SQLite database with `--products` products and 7 stored
+forecast days each, then fetches them all by id list and with {"all": true}.
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=50_000)
+    parser.add_argument('--horizon', type=int, default=7)
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.environ.update(DB_URL=f'sqlite:///{db_path}', JOB_RUNNER_ENABLED='false')
+
+    from app import create_app
+    from app.extensions import db
+    from app.models import Forecast, Product, User
+
+    app = create_app()
+    with app.app_context():
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='password'))
+        db.session.execute(db.insert(Product), [
+            {'id': i, 'sku': f'SKU-{i:06d}', 'name': f'Product {i}', 'price': 1.0, 'stock': 10}
+            for i in range(1, args.products + 1)
+        ])
+        today = dt.date.today()
+        days = [today + dt.timedelta(days=d) for d in range(1, 8)]
+        db.session.execute(db.insert(Forecast), [
+            {'product_id': i, 'forecast_date': d, 'predicted_quantity': 1.5, 'lower_bound': 1.2,
+             'upper_bound': 1.8, 'week_number': d.isocalendar()[1], 'year': d.year}
+            for i in range(1, args.products + 1) for d in days
+        ])
+        db.session.commit()
+
+        client = app.test_client()
+        token = json.loads(client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'}).data)
+        headers = {'Authorization': f"Bearer {token['access_token']}"}
+        bodies = {
+            'product_ids': {'product_ids': list(range(1, args.products + 1)), 'horizon_days': args.horizon},
+            'all': {'all': True, 'horizon_days': args.horizon},
+        }
+        for name, body in bodies.items():
+            start = time.perf_counter()
+            response = client.post('/api/forecast/batch', json=body, headers=headers)
+            elapsed = time.perf_counter() - start
+            result = json.loads(response.data)
+            print(f"{name:>12}: {result['products']} products, {result['rows']} rows, "
+                  f"{len(response.data) / 1e6:.1f} MB in {elapsed:.2f}s")
+        db.session.remove()
+        db.drop_all()
+
+    os.close(fd)
+    os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Latency of GET /api/forecast for long horizons computed on demand.
+
+Usage (from backend/):
+    python benchmarks/bench_forecast_horizon.py [--horizon 90] [--requests 500]
+
+Trains one product on a year of daily sales in a throwaway SQLite database,
+then reports p50/p99 for: predicting the horizon with a warm model but cold
+memo, fully memoized predictions, and the whole endpoint (auth, DB, JSON).
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+
+def percentiles(samples):
+    ms = np.array(samples) * 1000
+    return f"p50 {np.percentile(ms, 50):6.2f} ms   p99 {np.percentile(ms, 99):6.2f} ms"
+
+
+def timed(fn, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--horizon', type=int, default=90)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    models_dir = tempfile.mkdtemp()
+    os.environ.update(DB_URL=f'sqlite:///{db_path}', JOB_RUNNER_ENABLED='false',
+                      TRAINING_WORKERS='1', MODELS_DIR=models_dir)
+
+    from app import create_app
+    from app.extensions import db
+    from app.models import Product, Sale, User
+    from app.horizon import get_memo, predict_days
+    from app.rollup import rebuild_daily_sales
+    from app.training import train_now
+
+    app = create_app()
+    with app.app_context():
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='password'))
+        product = Product(sku='BENCH', name='Bench', price=1.0, stock=10 ** 9)
+        db.session.add(product)
+        db.session.commit()
+        rng = np.random.default_rng(0)
+        today = dt.datetime.now()
+        db.session.execute(db.insert(Sale), [
+            {'product_id': product.id, 'quantity': int(q), 'total_price': float(q), 'sale_date': d,
+             'week_number': d.isocalendar()[1], 'year': d.year}
+            for q, d in ((rng.integers(1, 30), today - dt.timedelta(days=i + 1)) for i in range(365))
+        ])
+        rebuild_daily_sales()
+        db.session.commit()
+        train_now()
+
+        memo = get_memo()
+        days = [today.date() + dt.timedelta(days=i) for i in range(1, args.horizon + 1)]
+        predict_days(product.id, days)  # load the model into the registry
+
+        def cold():
+            memo._entries.clear()
+            predict_days(product.id, days)
+
+        print(f"horizon {args.horizon} days, {args.requests} runs")
+        print(f"  predict, cold memo : {percentiles(timed(cold, args.requests))}")
+        print(f"  predict, memoized  : {percentiles(timed(lambda: predict_days(product.id, days), args.requests))}")
+
+        client = app.test_client()
+        token = json.loads(client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'}).data)
+        headers = {'Authorization': f"Bearer {token['access_token']}"}
+        url = f'/api/forecast?product_id={product.id}&horizon_days={args.horizon}'
+        print(f"  endpoint, memoized : {percentiles(timed(lambda: client.get(url, headers=headers), args.requests))}")
+        db.session.remove()
+        db.drop_all()
+
+    shutil.rmtree(models_dir, ignore_errors=True)
+    os.close(fd)
+    os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Training time and accuracy of per-product model selection against forests for every product.
+
+Usage (from backend/):
+    python benchmarks/bench_forecasters.py [--products 2000] [--long-tail 0.9]
+
+Builds a synthetic catalog where most products are long-tail (a few weeks
+of sparse sales) and the rest have one to two years of daily history, then
+fits every product in one process with:
+  forest    a random forest for every product, as training did before
+  selected  the default candidates, picked per product by holdout error
+and reports total fit time, the mean absolute error on the 14 days that
+follow each product's history and the share of those days inside the
+80% prediction interval.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from app.features import daily_totals
+from app.forecasters import DEFAULT_MODELS, dense_series, select_forecaster
+
+FUTURE_DAYS = 14
+FOREST_PARAMS = {'n_estimators': 50, 'max_depth': 12, 'min_samples_leaf': 2}
+COVERAGE = 0.8
+
+
+def synthetic_product(rng, long_tail):
+    n_days = int(rng.integers(20, 60)) if long_tail else int(rng.integers(365, 730))
+    start = np.datetime64('2023-01-01') + int(rng.integers(0, 60))
+    days = start + np.arange(n_days + FUTURE_DAYS)
+    dows = (days.astype(np.int64) + 3) % 7
+    rate = rng.uniform(0.2, 1.5) if long_tail else rng.uniform(3, 40)
+    weekly = np.where(dows >= 5, rng.uniform(1.0, 2.0), 1.0)
+    qty = rng.poisson(rate * weekly)
+    sold = qty > 0
+    history = sold[:n_days]
+    if not history.any():
+        history[0], qty[0] = True, 1
+    return days[:n_days][history], qty[:n_days][history].astype(np.float64), days[n_days:], qty[n_days:].astype(np.float64)
+
+
+def run(products, models):
+    start = time.perf_counter()
+    errors, covered, picked = [], [], Counter()
+    for days, y, future_days, future in products:
+        days, y = daily_totals(days, y)
+        selection = select_forecaster(days, y, models=models, forest_params=FOREST_PARAMS,
+                                      forest_min_history_days=0 if models == ('random_forest',) else 90)
+        predicted, lower, upper = selection.model.forecast_interval(future_days, COVERAGE)
+        errors.append(np.abs(predicted - future).mean())
+        covered.append(((future >= lower) & (future <= upper)).mean())
+        picked[selection.model.name] += 1
+    return time.perf_counter() - start, float(np.mean(errors)), float(np.mean(covered)), picked
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--long-tail', type=float, default=0.9)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    products = [synthetic_product(rng, rng.random() < args.long_tail) for _ in range(args.products)]
+    history_days = [len(dense_series(d, y)) for d, y, _, _ in products]
+    print(f"{args.products} products, median history {int(np.median(history_days))} days, "
+          f"{args.long_tail:.0%} long-tail")
+    for name, models in (('forest', ('random_forest',)), ('selected', DEFAULT_MODELS)):
+        seconds, mae, coverage, picked = run(products, models)
+        mix = ', '.join(f'{k} {v}' for k, v in picked.most_common())
+        print(f"{name:<9} {seconds:7.2f}s  {seconds * 1000 / args.products:6.2f} ms/product  "
+              f"MAE {mae:.3f}  coverage {coverage:.3f}  ({mix})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Wall time and accuracy of the global model against per-product training on the same catalog.
+
+Usage (from backend/):
+    python benchmarks/bench_global_model.py [--products 2000] [--long-tail 0.9]
+
+Every synthetic product's history ends on the same day (the training day);
+90% are long-tail with a few weeks of sparse sales, the rest have one to two
+years of daily history, weekly seasonality and a price-dependent level.
+Both modes fit in one process and forecast the next 7 days, scored by mean
+absolute error against the simulated future.
+"""
+import argparse
+import datetime as dt
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from app.features import daily_totals, future_days
+from app.forecasters import DEFAULT_MODELS, select_forecaster
+from app.global_model import build_panel, fit_global_model, forecast_panel
+
+HORIZON = 7
+TODAY = dt.date(2025, 1, 1)
+FOREST_PARAMS = {'n_estimators': 50, 'max_depth': 12, 'min_samples_leaf': 2}
+
+
+def synthetic_catalog(rng, n_products, long_tail_share):
+    series, prices, futures = {}, {}, {}
+    for pid in range(n_products):
+        long_tail = rng.random() < long_tail_share
+        n_days = int(rng.integers(20, 60)) if long_tail else int(rng.integers(365, 730))
+        days = np.datetime64(TODAY, 'D') - n_days + 1 + np.arange(n_days + HORIZON)
+        dows = (days.astype(np.int64) + 3) % 7
+        price = rng.uniform(1, 100)
+        rate = (rng.uniform(0.2, 1.5) if long_tail else rng.uniform(3, 40)) * (1.5 - price / 200)
+        qty = rng.poisson(rate * np.where(dows >= 5, rng.uniform(1.0, 2.0), 1.0)).astype(np.float64)
+        sold = qty[:n_days] > 0
+        sold[0] = True
+        qty[0] = max(qty[0], 1)
+        series[pid] = daily_totals(days[:n_days][sold], qty[:n_days][sold])
+        prices[pid] = price
+        futures[pid] = qty[n_days:]
+    return series, prices, futures
+
+
+def per_product(series, futures, models):
+    start = time.perf_counter()
+    next_days = future_days(TODAY, HORIZON)
+    errors = []
+    for pid, (days, y) in series.items():
+        selection = select_forecaster(days, y, models=models, forest_params=FOREST_PARAMS,
+                                      forest_min_history_days=0 if models == ('random_forest',) else 90)
+        errors.append(np.abs(np.maximum(selection.model.forecast(next_days), 0) - futures[pid]).mean())
+    return time.perf_counter() - start, float(np.mean(errors))
+
+
+def global_mode(series, prices, futures, max_iter):
+    start = time.perf_counter()
+    model = fit_global_model(build_panel(series, prices, TODAY), max_iter=max_iter)
+    fitted = time.perf_counter()
+    panel = build_panel(series, prices, TODAY, extra_days=HORIZON)
+    preds = forecast_panel(model, panel, HORIZON)
+    predicted = time.perf_counter()
+    errors = [np.abs(p - futures[pid]).mean() for pid, p in zip(panel.product_ids.tolist(), preds)]
+    return predicted - start, float(np.mean(errors)), fitted - start, predicted - fitted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--long-tail', type=float, default=0.9)
+    parser.add_argument('--max-iter', type=int, default=200)
+    args = parser.parse_args()
+
+    series, prices, futures = synthetic_catalog(np.random.default_rng(42), args.products, args.long_tail)
+    print(f"{args.products} products, {sum(len(d) for d, _ in series.values())} product-days with sales")
+    seconds, mae = per_product(series, futures, ('random_forest',))
+    print(f"{'per-product forest':<22}{seconds:8.2f}s  MAE {mae:.3f}")
+    seconds, mae = per_product(series, futures, DEFAULT_MODELS)
+    print(f"{'per-product selected':<22}{seconds:8.2f}s  MAE {mae:.3f}")
+    seconds, mae, fit_s, predict_s = global_mode(series, prices, futures, args.max_iter)
+    print(f"{'global':<22}{seconds:8.2f}s  MAE {mae:.3f}  (fit {fit_s:.2f}s, predict {predict_s * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Disk size, load time and memory of the stored models, before and after compaction.
+
+Usage (from backend/):
+    python benchmarks/bench_model_store.py [--products 200] [--days 730] [--workers 4]
+
+Fits one daily forest per synthetic product and stores it three ways:
+  pickle    RandomForestRegressor as training wrote it before (unbounded trees, plain joblib)
+  compact   CompactForest with MODEL_MAX_DEPTH/MODEL_MIN_SAMPLES_LEAF limits, zlib level 3 (default)
+  mmap      the same compact forest uncompressed, loaded with MODEL_MMAP_MODE=r
+
+Loading is measured in fresh processes (`--workers` of them at once, like
+gunicorn workers) that load every model and predict a 90-day horizon with
+each. RSS counts mapped file pages in every process; private memory is what
+each worker really owns. The holdout error of the bounded and unbounded
+forests on the last 28 days shows what the size limits cost in accuracy.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import joblib
+from sklearn.ensemble import RandomForestRegressor
+from app.compact_forest import CompactForest
+from app.features import calendar_features, future_days
+from app.model_registry import model_path, save_model
+
+HOLDOUT_DAYS = 28
+
+
+def memory_kb():
+    """(RSS, private) of this process in KiB, from /proc (Linux only)."""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields['Rss'], fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+
+
+def load_worker(models_dir, n_products, mmap_mode):
+    """Runs in a child process: load every model, predict with it, report timings and memory."""
+    mmap_mode = mmap_mode or None
+    X = calendar_features(future_days(np.datetime64('2025-01-01'), 90))
+    rss_before, private_before = memory_kb()
+    start = time.perf_counter()
+    models = [joblib.load(model_path(models_dir, pid), mmap_mode=mmap_mode) for pid in range(n_products)]
+    load_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for model in models:
+        model.predict(X)
+    predict_seconds = time.perf_counter() - start
+    rss_after, private_after = memory_kb()
+    print(json.dumps({
+        'load_ms': load_seconds * 1000 / n_products,
+        'predict_ms': predict_seconds * 1000 / n_products,
+        'rss_mb': (rss_after - rss_before) / 1024,
+        'private_mb': (private_after - private_before) / 1024,
+    }))
+
+
+def measure(models_dir, n_products, mmap_mode, workers):
+    procs = [
+        subprocess.Popen([sys.executable, __file__, '--load-worker', models_dir, str(n_products), mmap_mode or ''],
+                         stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    results = [json.loads(p.communicate()[0]) for p in procs]
+    return {key: np.mean([r[key] for r in results]) for key in results[0]}
+
+
+def synthetic_sales(rng, days):
+    base = rng.uniform(2, 30)
+    weekly = 1 + 0.4 * np.sin(2 * np.pi * np.arange(days.size) / 7 + rng.uniform(0, 7))
+    yearly = 1 + 0.3 * np.sin(2 * np.pi * np.arange(days.size) / 365.25)
+    return rng.poisson(base * weekly * yearly).astype(np.float64)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--max-depth', type=int, default=12)
+    parser.add_argument('--min-samples-leaf', type=int, default=2)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    days = np.datetime64('2023-01-01') + np.arange(args.days)
+    X = calendar_features(days)
+    train, test = slice(0, -HOLDOUT_DAYS), slice(-HOLDOUT_DAYS, None)
+    dirs = {name: tempfile.mkdtemp(prefix=f'models-{name}-') for name in ('pickle', 'compact', 'mmap')}
+    errors = {'pickle': [], 'compact': []}
+    try:
+        start = time.perf_counter()
+        for pid in range(args.products):
+            y = synthetic_sales(rng, days)
+            unbounded = RandomForestRegressor(n_estimators=50, random_state=42, n_jobs=1).fit(X[train], y[train])
+            bounded = RandomForestRegressor(n_estimators=50, random_state=42, n_jobs=1, max_depth=args.max_depth,
+                                            min_samples_leaf=args.min_samples_leaf).fit(X[train], y[train])
+            compact = CompactForest.from_sklearn(bounded)
+            save_model(unbounded, model_path(dirs['pickle'], pid))
+            save_model(compact, model_path(dirs['compact'], pid), compress=3)
+            save_model(compact, model_path(dirs['mmap'], pid))
+            errors['pickle'].append(np.abs(unbounded.predict(X[test]) - y[test]).mean())
+            errors['compact'].append(np.abs(compact.predict(X[test]) - y[test]).mean())
+        print(f"Fitted {args.products} products x {args.days} days in {time.perf_counter() - start:.1f}s; "
+              f"holdout MAE unbounded {np.mean(errors['pickle']):.3f}, bounded {np.mean(errors['compact']):.3f}")
+        print(f"{args.workers} worker process(es), per-worker averages")
+        print(f"{'store':<9}{'disk MB':>9}{'load ms/model':>15}{'predict ms':>12}{'RSS MB':>9}{'private MB':>12}")
+        for name, mmap_mode in (('pickle', None), ('compact', None), ('mmap', 'r')):
+            disk = sum(os.path.getsize(os.path.join(dirs[name], f)) for f in os.listdir(dirs[name]))
+            r = measure(dirs[name], args.products, mmap_mode, args.workers)
+            print(f"{name:<9}{disk / 2 ** 20:>9.1f}{r['load_ms']:>15.2f}{r['predict_ms']:>12.2f}"
+                  f"{r['rss_mb']:>9.1f}{r['private_mb']:>12.1f}")
+    finally:
+        for path in dirs.values():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--load-worker']:
+        load_worker(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+    else:
+        main()
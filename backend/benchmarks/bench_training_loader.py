@@ -0,0 +1,107 @@
+"""Compare the per-product ORM loader with the bulk streamed loader.
+
+Usage (from backend/):
+    python benchmarks/bench_training_loader.py [--sizes 1000,10000,50000] [--sales-per-product 20] [--db-url URL]
+
+Defaults to a throwaway SQLite file; pass a Postgres URL to measure real round-trips.
+"""
+import argparse
+import datetime as dt
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from flask import Flask
+from app.extensions import db
+from app.models import Product, Sale
+from app.training_data import load_sales_history
+from app.rollup import rebuild_daily_sales
+
+
+def make_app(db_url: str) -> Flask:
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = db_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed(n_products: int, sales_per_product: int) -> None:
+    db.drop_all()
+    db.create_all()
+    rng = np.random.default_rng(42)
+    db.session.execute(db.insert(Product), [
+        {'id': i, 'sku': f'BENCH-{i}', 'name': f'Product {i}', 'price': 10.0, 'stock': 1000}
+        for i in range(1, n_products + 1)
+    ])
+    start = dt.datetime(2023, 1, 1)
+    batch = []
+    for pid in range(1, n_products + 1):
+        offsets = rng.integers(0, 365, size=sales_per_product)
+        qtys = rng.integers(1, 20, size=sales_per_product)
+        for off, qty in zip(offsets.tolist(), qtys.tolist()):
+            d = start + dt.timedelta(days=off)
+            batch.append({'product_id': pid, 'quantity': qty, 'total_price': qty * 10.0, 'sale_date': d,
+                          'week_number': d.isocalendar()[1], 'year': d.year})
+        if len(batch) >= 100_000:
+            db.session.execute(db.insert(Sale), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(Sale), batch)
+    rebuild_daily_sales()
+    db.session.commit()
+
+
+def old_loader():
+    out = {}
+    for p in Product.query.all():
+        sales = Sale.query.filter_by(product_id=p.id).all()
+        out[p.id] = [(s.sale_date, s.quantity) for s in sales]
+    db.session.expunge_all()
+    return out
+
+
+def new_loader():
+    return load_sales_history()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,50000')
+    parser.add_argument('--sales-per-product', type=int, default=20)
+    parser.add_argument('--db-url', default=None)
+    args = parser.parse_args()
+
+    tmp = None
+    db_url = args.db_url
+    if not db_url:
+        tmp = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        db_url = f'sqlite:///{tmp.name}'
+
+    app = make_app(db_url)
+    print(f"{'products':>10} {'sales':>10} {'old (s)':>10} {'new (s)':>10} {'speedup':>8}")
+    with app.app_context():
+        for n in [int(x) for x in args.sizes.split(',')]:
+            seed(n, args.sales_per_product)
+            old_t, old = timed(old_loader)
+            new_t, new = timed(new_loader)
+            assert len(old) == len(new)
+            print(f"{n:>10} {n * args.sales_per_product:>10} {old_t:>10.2f} {new_t:>10.2f} {old_t / new_t:>7.1f}x")
+        db.drop_all()
+
+    if tmp is not None:
+        os.unlink(tmp.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,28 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 # Import test cases
 from tests.test_simple import SimpleTestCase
+from tests.test_training_data import TrainingDataTestCase
+from tests.test_forecast_store import ForecastStoreTestCase
+from tests.test_features import FeaturesTestCase
+from tests.test_jobs import TrainingJobTestCase
+from tests.test_importer import ImporterTestCase
+from tests.test_ingest import IngestTestCase
+from tests.test_migrations import MigrationsTestCase
+from tests.test_query_plans import QueryPlanTestCase
+from tests.test_pagination import PaginationTestCase
+from tests.test_rollup import RollupTestCase
+from tests.test_model_registry import ModelRegistryTestCase
+from tests.test_horizon import HorizonTestCase
+from tests.test_forecast_batch import ForecastBatchTestCase
+from tests.test_compact_forest import CompactForestTestCase
+from tests.test_forecasters import ForecastersTestCase
+from tests.test_global_model import GlobalModelTestCase
+from tests.test_backtest import BacktestTestCase
+from tests.test_training_runs import TrainingRunsTestCase
+from tests.test_scheduler import SchedulerTestCase
+from tests.test_startup import StartupTestCase
+from tests.test_response_cache import ResponseCacheTestCase
+from tests.test_forecast_comparison import ForecastComparisonTestCase
 
 if __name__ == '__main__':
     # Create test suite
@@ -14,6 +36,28 @@ if __name__ == '__main__':
     
     # Add test cases to the suite
     test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(SimpleTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TrainingDataTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(ForecastStoreTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(FeaturesTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TrainingJobTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(ImporterTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(IngestTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(MigrationsTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(QueryPlanTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(PaginationTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(RollupTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(ModelRegistryTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(HorizonTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(ForecastBatchTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(CompactForestTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(ForecastersTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(GlobalModelTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(BacktestTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TrainingRunsTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(SchedulerTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(StartupTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(ResponseCacheTestCase))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(ForecastComparisonTestCase))
     
     # Run the tests
     runner = unittest.TextTestRunner(verbosity=2)
@@ -0,0 +1,163 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+import numpy as np
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import BacktestMetric, ModelTraining, Product, Sale, TrainingJob, User
+from app import backtest
+from app.backtest import metrics, run_backtest, score
+from app.jobs import _claim_next_job, enqueue_training, run_job, run_pending_jobs
+from app.rollup import rebuild_daily_sales
+from app.training import train_now
+
+
+class BacktestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        os.environ['TRAINING_WORKERS'] = '1'
+        self.models_dir = tempfile.mkdtemp()
+        os.environ['MODELS_DIR'] = self.models_dir
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='password'))
+        products = [Product(sku=f'TEST00{i}', name=f'Product {i}', price=10.0, stock=1000) for i in (1, 2)]
+        db.session.add_all(products)
+        db.session.commit()
+        self.product_ids = [p.id for p in products]
+        today = datetime.now()
+        for n, product in enumerate(products, start=1):
+            for i in range(70):
+                d = today - timedelta(days=i + 1)
+                qty = n * (4 if d.weekday() >= 5 else 1)
+                db.session.add(Sale(product_id=product.id, quantity=qty, total_price=qty * 10.0,
+                                    sale_date=d, week_number=d.isocalendar()[1], year=d.year))
+        db.session.commit()
+        rebuild_daily_sales()
+        db.session.commit()
+
+        response = self.client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'})
+        self.headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        for key in ('JOB_RUNNER_ENABLED', 'TRAINING_WORKERS', 'MODELS_DIR'):
+            os.environ.pop(key, None)
+        shutil.rmtree(self.models_dir, ignore_errors=True)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_metrics(self):
+        """Test MAPE, WAPE, bias and coverage on a hand-checked block"""
+        pred = np.array([[[10.0, 10.0], [5.0, 0.0]], [[1.0, 1.0], [1.0, 1.0]]])
+        actual = np.array([[[10.0, 5.0], [100.0, 100.0]], [[0.0, 0.0], [0.0, 0.0]]])
+        valid = np.array([[True, False], [True, True]])
+        m = metrics(score(pred, actual, valid, pred * 0.8, pred * 1.2))
+        np.testing.assert_allclose(m['wape'][0], 5.0 / 15)
+        np.testing.assert_allclose(m['mape'][0], 0.5)
+        np.testing.assert_allclose(m['bias'][0], 5.0 / 15)
+        np.testing.assert_allclose(m['coverage'], [0.5, 0.0])
+        # Nothing sold: ratios over actual sales are undefined
+        self.assertTrue(np.isnan(m['wape'][1]) and np.isnan(m['mape'][1]))
+
+    def test_training_records_accuracy_and_metrics(self):
+        """Test that a full training backtests its models and stores the accuracy"""
+        train_now()
+        accuracy = ModelTraining.query.order_by(ModelTraining.id.desc()).first().accuracy
+        self.assertIsNotNone(accuracy)
+        self.assertTrue(0.0 <= accuracy <= 1.0)
+        rows = {m.product_id: m for m in BacktestMetric.query.all()}
+        self.assertEqual(set(rows), set(self.product_ids))
+        self.assertTrue(all(m.origins == 4 and m.days == 28 and m.model_type for m in rows.values()))
+
+        data = json.loads(self.client.get('/api/admin/backtest', headers=self.headers).data)
+        self.assertEqual(data['products'], 2)
+        self.assertAlmostEqual(data['accuracy'], accuracy, places=3)
+        response = self.client.get(f'/api/admin/backtest?product_id={self.product_ids[0]}', headers=self.headers)
+        self.assertEqual(json.loads(response.data)['model_type'], rows[self.product_ids[0]].model_type)
+
+    def test_backtest_job(self):
+        """Test that the backtest job refreshes metrics and the latest training's accuracy"""
+        db.session.add(ModelTraining(last_trained_week=1, last_trained_year=2024, accuracy=0.0))
+        db.session.commit()
+        response = self.client.post('/api/admin/backtest', headers=self.headers)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(run_pending_jobs(), 1)
+        db.session.expire_all()
+        self.assertEqual(BacktestMetric.query.count(), 2)
+        self.assertGreater(ModelTraining.query.one().accuracy, 0.0)
+
+    def test_backtest_keeps_job_heartbeat(self):
+        """Test that a training job whose backtest outlasts the stale cutoff is not taken for a lost worker"""
+        self.app.config.update(JOB_STALE_SECONDS=2, TRAINING_BATCH_SIZE=1)
+        job, _ = enqueue_training('full')
+        statuses = []
+        original = backtest._backtest_batch
+
+        def slow_batch(*args, **kwargs):
+            time.sleep(1.2)
+            result = original(*args, **kwargs)
+            # Another runner polling now must see the job alive (the whole backtest took longer than the cutoff)
+            _claim_next_job()
+            with db.engine.connect() as conn:
+                statuses.append(conn.execute(db.select(TrainingJob.status).where(TrainingJob.id == job.id)).scalar())
+            return result
+
+        self.assertEqual(_claim_next_job(), job.id)
+        with mock.patch('app.backtest._backtest_batch', slow_batch):
+            run_job(job.id)
+        self.assertEqual(statuses, ['running', 'running'])
+        db.session.expire_all()
+        self.assertEqual(db.session.get(TrainingJob, job.id).status, 'succeeded')
+        self.assertIsNotNone(ModelTraining.query.one().accuracy)
+
+    def test_global_backtest_keeps_job_heartbeat(self):
+        """Test that refitting the global model at every origin keeps a training job's heartbeat alive"""
+        self.app.config.update(JOB_STALE_SECONDS=2, TRAINING_MODE='global', BACKTEST_ORIGINS=3)
+        job, _ = enqueue_training('full')
+        statuses = []
+        original = backtest.fit_global_model
+
+        def slow_fit(*args, **kwargs):
+            time.sleep(1.2)
+            model = original(*args, **kwargs)
+            _claim_next_job()
+            with db.engine.connect() as conn:
+                statuses.append(conn.execute(db.select(TrainingJob.status).where(TrainingJob.id == job.id)).scalar())
+            return model
+
+        self.assertEqual(_claim_next_job(), job.id)
+        with mock.patch('app.backtest.fit_global_model', slow_fit):
+            run_job(job.id)
+        self.assertEqual(statuses, ['running'] * 3)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(TrainingJob, job.id).status, 'succeeded')
+
+    def test_backtest_past_deadline(self):
+        """Test that a backtest cut off before any product neither stores metrics nor fails the training"""
+        self.app.config['BACKTEST_MAX_SECONDS'] = 0
+        train_now()
+        self.assertIsNone(ModelTraining.query.one().accuracy)
+        self.assertIsNone(run_backtest())
+        self.assertEqual(BacktestMetric.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
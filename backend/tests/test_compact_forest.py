@@ -0,0 +1,60 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.compact_forest import CompactForest
+from app.model_registry import ModelRegistry, model_path, save_model
+
+
+class CompactForestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.models_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.X = rng.integers(0, 53, size=(400, 5)).astype(np.float64)
+        self.y = rng.poisson(5, size=400)
+        self.X_test = rng.integers(0, 53, size=(60, 5)).astype(np.float64)
+
+    def tearDown(self):
+        shutil.rmtree(self.models_dir, ignore_errors=True)
+
+    def test_predictions_match_random_forest(self):
+        """Test that the array-backed forest predicts exactly like the fitted forest"""
+        for params in ({}, {'max_depth': 6, 'min_samples_leaf': 3}):
+            forest = RandomForestRegressor(n_estimators=20, random_state=42, **params).fit(self.X, self.y)
+            compact = CompactForest.from_sklearn(forest)
+            self.assertEqual(compact.n_trees, 20)
+            np.testing.assert_allclose(compact.predict(self.X_test), forest.predict(self.X_test))
+
+    def test_compressed_and_memory_mapped_loading(self):
+        """Test that compressed files load into memory and uncompressed ones are memory-mapped"""
+        forest = RandomForestRegressor(n_estimators=20, random_state=42).fit(self.X, self.y)
+        expected = forest.predict(self.X_test)
+        compact = CompactForest.from_sklearn(forest)
+
+        save_model(compact, model_path(self.models_dir, 1), compress=3)
+        save_model(compact, model_path(self.models_dir, 2))
+        self.assertLess(os.path.getsize(model_path(self.models_dir, 1)),
+                        os.path.getsize(model_path(self.models_dir, 2)))
+
+        registry = ModelRegistry(self.models_dir, mmap_mode='r')
+        mapped = registry.get(2).model
+        self.assertIsInstance(mapped.threshold, np.memmap)
+        np.testing.assert_allclose(mapped.predict(self.X_test), expected)
+
+        # Compressed files cannot be mapped (joblib warns and reads them); the entry is charged its in-memory size
+        with self.assertWarns(UserWarning):
+            loaded = registry.get(1)
+        self.assertNotIsInstance(loaded.model.threshold, np.memmap)
+        self.assertEqual(loaded.size, compact.nbytes)
+        np.testing.assert_allclose(loaded.model.predict(self.X_test), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import sys
+import os
+from datetime import date, datetime, timedelta
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from app.features import FEATURE_COLUMNS, calendar_features, daily_totals, future_days
+
+
+class FeaturesTestCase(unittest.TestCase):
+    def test_calendar_features_match_datetime(self):
+        """Test that vectorized calendar features agree with the datetime module"""
+        start = date(2019, 12, 20)
+        dates = [start + timedelta(days=i) for i in range(5 * 366)]
+        X = calendar_features(np.array(dates, dtype='datetime64[D]'))
+        self.assertEqual(X.shape, (len(dates), len(FEATURE_COLUMNS)))
+        for row, d in zip(X, dates):
+            self.assertEqual(row[0], d.weekday())
+            self.assertEqual(row[1], d.month)
+            self.assertEqual(row[2], d.day)
+            self.assertEqual(row[3], d.timetuple().tm_yday)
+            self.assertEqual(row[4], d.isocalendar()[1])
+            self.assertEqual(row[5], int(d.weekday() >= 5))
+        self.assertEqual(calendar_features(np.array(['2024-12-25'], dtype='datetime64[D]'))[0, 6], 1)
+
+    def test_daily_totals(self):
+        """Test that sales on the same day are summed and days are sorted"""
+        dates = np.array([datetime(2024, 1, 3, 10), datetime(2024, 1, 1, 9), datetime(2024, 1, 3, 18)], dtype='datetime64[us]')
+        days, totals = daily_totals(dates, np.array([2, 5, 4]))
+        self.assertEqual([str(d) for d in days], ['2024-01-01', '2024-01-03'])
+        self.assertEqual(totals.tolist(), [5.0, 6.0])
+
+    def test_future_days(self):
+        """Test that future days start the day after today"""
+        days = future_days(date(2024, 2, 27), 3)
+        self.assertEqual(list(days.astype(object)), [date(2024, 2, 28), date(2024, 2, 29), date(2024, 3, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+from datetime import date, timedelta
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, User
+from app.forecast_store import upsert_forecasts
+
+
+class ForecastBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='password'))
+        products = [Product(sku=sku, name=sku, price=1.0, stock=10) for sku in ('AB-1', 'AB-2', 'A_X', 'CD-1')]
+        db.session.add_all(products)
+        db.session.commit()
+        self.ids = {p.sku: p.id for p in products}
+        today = date.today()
+        rows = []
+        for p in products:
+            # Yesterday's row is outside any horizon
+            for i in range(0, 8):
+                d = today + timedelta(days=i)
+                rows.append({'product_id': p.id, 'forecast_date': d, 'predicted_quantity': float(p.id * 10 + i),
+                             'lower_bound': 0.0, 'upper_bound': 100.0, 'week_number': d.isocalendar()[1],
+                             'year': d.year})
+        upsert_forecasts(rows)
+        db.session.commit()
+
+        response = self.client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'})
+        self.headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.environ.pop('JOB_RUNNER_ENABLED', None)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def _batch(self, body, status=200):
+        response = self.client.post('/api/forecast/batch', json=body, headers=self.headers)
+        self.assertEqual(response.status_code, status, response.data)
+        return json.loads(response.data)
+
+    def test_product_ids(self):
+        """Test columnar output for an explicit list of products"""
+        ab1, cd1 = self.ids['AB-1'], self.ids['CD-1']
+        result = self._batch({'product_ids': [cd1, ab1, 9999], 'horizon_days': 3})
+        self.assertEqual((result['rows'], result['products']), (6, 2))
+        columns = result['columns']
+        self.assertEqual(columns['product_id'], [ab1] * 3 + [cd1] * 3)
+        self.assertEqual(columns['sku'][:1], ['AB-1'])
+        self.assertEqual(columns['date'][0], (date.today() + timedelta(days=1)).isoformat())
+        self.assertEqual(columns['prediction'][:3], [ab1 * 10 + 1.0, ab1 * 10 + 2.0, ab1 * 10 + 3.0])
+
+    def test_sku_prefix_and_all(self):
+        """Test prefix matching (with LIKE wildcards escaped) and the whole catalog"""
+        self.assertEqual(set(self._batch({'sku_prefix': 'AB-'})['columns']['sku']), {'AB-1', 'AB-2'})
+        self.assertEqual(set(self._batch({'sku_prefix': 'A_'})['columns']['sku']), {'A_X'})
+        result = self._batch({'all': True})
+        self.assertEqual((result['rows'], result['products']), (28, 4))
+
+    def test_invalid_requests(self):
+        """Test validation of the selection, horizon and format"""
+        self._batch({}, status=400)
+        self._batch({'all': True, 'sku_prefix': 'AB'}, status=400)
+        self._batch({'product_ids': ['1']}, status=400)
+        self._batch({'all': True, 'horizon_days': 0}, status=400)
+        self._batch({'all': True, 'format': 'xml'}, status=400)
+
+    def test_parquet(self):
+        """Test the optional Parquet output"""
+        response = self.client.post('/api/forecast/batch', json={'all': True, 'format': 'parquet'}, headers=self.headers)
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.assertEqual(response.status_code, 406)
+            return
+        import io
+        table = pq.read_table(io.BytesIO(response.data))
+        self.assertEqual(table.num_rows, 28)
+
+
+if __name__ == '__main__':
+    unittest.main()
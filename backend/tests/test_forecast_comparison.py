@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+from datetime import date, datetime, timedelta
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, Sale, User
+from app.forecast_store import upsert_forecasts
+from app.rollup import rebuild_daily_sales
+
+
+class ForecastComparisonTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='password'))
+        products = [Product(sku=f'TEST00{i}', name=f'Product {i}', price=10.0, stock=1000) for i in (1, 2)]
+        db.session.add_all(products)
+        db.session.commit()
+        self.ids = [p.id for p in products]
+        self.today = date.today()
+        # Product 1 sells on even days back (twice on day 2), product 2 only 40 days ago
+        for days_back in range(0, 30, 2):
+            d = datetime.combine(self.today - timedelta(days=days_back), datetime.min.time()) + timedelta(hours=12)
+            for _ in range(2 if days_back == 2 else 1):
+                db.session.add(Sale(product_id=self.ids[0], quantity=3, total_price=30.0, sale_date=d,
+                                    week_number=d.isocalendar()[1], year=d.year))
+        d = datetime.now() - timedelta(days=40)
+        db.session.add(Sale(product_id=self.ids[1], quantity=7, total_price=70.0, sale_date=d,
+                            week_number=d.isocalendar()[1], year=d.year))
+        db.session.commit()
+        rebuild_daily_sales()
+        rows = []
+        for days_back in (1, 3, 60):
+            d = self.today - timedelta(days=days_back)
+            rows.append({'product_id': self.ids[0], 'forecast_date': d, 'predicted_quantity': float(days_back),
+                         'week_number': d.isocalendar()[1], 'year': d.year})
+        upsert_forecasts(rows)
+        db.session.commit()
+
+        response = self.client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'})
+        self.headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.environ.pop('JOB_RUNNER_ENABLED', None)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def _get(self, query, status=200):
+        response = self.client.get(f'/api/forecast/comparison?{query}', headers=self.headers)
+        self.assertEqual(response.status_code, status, response.data)
+        return json.loads(response.data)
+
+    def test_single_product(self):
+        """Test that every day of the default window has its actual and stored prediction"""
+        data = self._get(f'product_id={self.ids[0]}')
+        self.assertEqual((data['product_id'], data['product_name']), (self.ids[0], 'Product 1'))
+        points = data['comparison_data']
+        self.assertEqual(len(points), 29)
+        self.assertEqual(points[0]['date'], (self.today - timedelta(days=28)).isoformat())
+        self.assertEqual(points[-1]['date'], self.today.isoformat())
+        by_date = {p['date']: p for p in points}
+        day = lambda n: (self.today - timedelta(days=n)).isoformat()
+        self.assertEqual(by_date[day(2)], {'date': day(2), 'actual': 6, 'predicted': None})
+        self.assertEqual(by_date[day(1)], {'date': day(1), 'actual': 0, 'predicted': 1.0})
+        self.assertEqual(by_date[day(3)]['predicted'], 3.0)
+        self.assertEqual(by_date[day(0)]['actual'], 3)
+
+    def test_window_and_many_products(self):
+        """Test a custom window for several products in one request"""
+        data = self._get(f'product_ids={self.ids[1]},{self.ids[0]}&days=60')
+        self.assertEqual([p['product_id'] for p in data['products']], self.ids)
+        first, second = data['products']
+        self.assertEqual(len(first['comparison_data']), 61)
+        self.assertEqual(first['comparison_data'][0]['predicted'], 60.0)
+        self.assertEqual(sum(p['actual'] for p in second['comparison_data']), 7)
+
+    def test_invalid_requests(self):
+        """Test validation of products and window"""
+        self._get('', status=400)
+        self._get(f'product_id={self.ids[0]}&days=0', status=400)
+        self._get(f'product_id={self.ids[0]}&days=1000', status=400)
+        self._get(f'product_id={self.ids[0]}&product_ids={self.ids[1]}', status=400)
+        self._get('product_ids=1,x', status=400)
+        self.assertEqual(self._get(f'product_ids={self.ids[0]},999', status=404)['product_ids'], [999])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import date, timedelta
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, Forecast
+from app.forecast_store import upsert_forecasts
+
+
+class ForecastStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        product = Product(sku='TEST001', name='Test Product', price=19.99, stock=100)
+        db.session.add(product)
+        db.session.commit()
+        self.product_id = product.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.environ.pop('JOB_RUNNER_ENABLED', None)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def _rows(self, value):
+        start = date(2024, 3, 1)
+        rows = []
+        for i in range(7):
+            d = start + timedelta(days=i)
+            rows.append({
+                'product_id': self.product_id,
+                'forecast_date': d,
+                'predicted_quantity': value + i,
+                'lower_bound': (value + i) * 0.8,
+                'upper_bound': (value + i) * 1.2,
+                'week_number': d.isocalendar()[1],
+                'year': d.year,
+            })
+        return rows
+
+    def test_insert_then_update(self):
+        """Test that a second upsert updates rows instead of duplicating them"""
+        upsert_forecasts(self._rows(10.0), batch_size=3)
+        db.session.commit()
+        self.assertEqual(Forecast.query.count(), 7)
+        self.assertIsNotNone(Forecast.query.first().created_at)
+
+        upsert_forecasts(self._rows(20.0), batch_size=3)
+        db.session.commit()
+        self.assertEqual(Forecast.query.count(), 7)
+        first = Forecast.query.filter_by(forecast_date=date(2024, 3, 1)).one()
+        self.assertEqual(first.predicted_quantity, 20.0)
+        self.assertEqual(first.upper_bound, 24.0)
+
+    def test_empty(self):
+        """Test that upserting nothing is a no-op"""
+        self.assertEqual(upsert_forecasts([]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.forecasters import FORECASTERS, build_forecaster, dense_series, interval_bounds, select_forecaster
+
+
+# 2024-01-01 was a Monday
+START = np.datetime64('2024-01-01')
+
+
+def weekly_pattern(n_days, weekend=10.0, weekday=2.0):
+    days = START + np.arange(n_days)
+    dows = (days.astype(np.int64) + 3) % 7
+    return days, np.where(dows >= 5, weekend, weekday)
+
+
+class ForecastersTestCase(unittest.TestCase):
+    def test_dense_series_fills_missing_days(self):
+        """Test that days without sales become zeros between the first and last sale"""
+        days = START + np.array([0, 3, 4])
+        np.testing.assert_array_equal(dense_series(days, np.array([1.0, 2.0, 3.0])), [1, 0, 0, 2, 3])
+
+    def test_models_forecast_future_days(self):
+        """Test that every built-in model fits a weekly pattern and forecasts any days"""
+        days, y = weekly_pattern(120)
+        future = days[-1] + np.arange(1, 15)
+        expected = weekly_pattern(134)[1][-14:]
+        for name in FORECASTERS:
+            model = build_forecaster(name, {'n_estimators': 10}).fit(days, y)
+            predicted = model.forecast(future)
+            self.assertEqual(predicted.shape, (14,), name)
+            if name == 'ses':
+                self.assertTrue(np.allclose(predicted, predicted[0]))
+            else:
+                np.testing.assert_allclose(predicted, expected, atol=0.6, err_msg=name)
+
+    def test_selection_prefers_lowest_holdout_error(self):
+        """Test that a seasonal series is not served by the flat smoothing model"""
+        days, y = weekly_pattern(60)
+        selection = select_forecaster(days, y, models=('ses', 'seasonal_naive', 'ridge'))
+        self.assertEqual(set(selection.holdout_errors), {'ses', 'seasonal_naive', 'ridge'})
+        self.assertNotEqual(selection.model.name, 'ses')
+        self.assertEqual(selection.holdout_mae, min(selection.holdout_errors.values()))
+
+    def test_short_history_skips_backtest_and_forest(self):
+        """Test that short histories use the richest eligible model without a backtest"""
+        days, y = weekly_pattern(20)
+        selection = select_forecaster(days, y, forest_min_history_days=90)
+        self.assertEqual(selection.model.name, 'seasonal_naive')
+        self.assertIsNone(selection.holdout_mae)
+
+        days, y = weekly_pattern(60)
+        selection = select_forecaster(days, y, forest_min_history_days=90)
+        self.assertNotIn('random_forest', selection.holdout_errors)
+
+    def test_interval_bounds(self):
+        """Test that bounds are residual quantiles around the prediction, clipped at zero"""
+        residuals = np.tile(np.arange(-5.0, 6.0), 100)
+        lower, upper = interval_bounds(np.array([10.0, 1.0]), residuals, 0.8)
+        np.testing.assert_allclose(lower, [6.0, 0.0], atol=0.01)
+        np.testing.assert_allclose(upper, [14.0, 5.0], atol=0.01)
+        lower, upper = interval_bounds(np.array([10.0]), residuals, 0.8, scale=np.array([0.5]))
+        np.testing.assert_allclose([lower[0], upper[0]], [8.0, 12.0], atol=0.01)
+        # Few residuals: the quantiles reach further than the nominal 10% and 90%
+        lower, upper = interval_bounds(np.array([10.0]), np.arange(-5.0, 6.0), 0.8)
+        self.assertTrue(lower[0] < 6.0 and upper[0] > 14.0)
+        # Models saved without residuals keep the old band
+        lower, upper = interval_bounds(np.array([10.0]), None, 0.8)
+        np.testing.assert_allclose([lower[0], upper[0]], [8.0, 12.0])
+
+    def test_intervals_follow_holdout_errors(self):
+        """Test that the selected model keeps its holdout residuals and noisier products get wider bands"""
+        days, y = weekly_pattern(120)
+        rng = np.random.default_rng(0)
+        future = days[-1] + np.arange(1, 8)
+        widths = []
+        for noise in (0.0, 3.0):
+            noisy = np.maximum(y + rng.normal(0, noise, y.size).round(), 1.0)
+            selection = select_forecaster(days, noisy, models=('seasonal_naive', 'ridge'), holdout_days=14)
+            self.assertEqual(selection.model.residuals.shape, (14,))
+            pred, lower, upper = selection.model.forecast_interval(future, 0.8)
+            self.assertTrue(np.all((lower <= pred) & (pred <= upper)))
+            widths.append(float((upper - lower).mean()))
+        self.assertGreater(widths[1], widths[0])
+
+        # Too short to backtest: in-sample residuals still give an interval
+        days, y = weekly_pattern(20)
+        self.assertIsNotNone(select_forecaster(days, y).model.residuals)
+
+    def test_unknown_model(self):
+        """Test that a misconfigured model name is reported"""
+        with self.assertRaises(ValueError):
+            build_forecaster('prophet')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import time
+import datetime as dt
+import numpy as np
+from unittest import mock
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, training
+from app.extensions import db
+from app.models import Forecast, Product, ProductTrainingState, Sale, TrainingJob, User
+from app.global_model import GLOBAL_FEATURE_COLUMNS, LAG, build_panel, panel_features
+from app.horizon import get_memo, predict_days
+from app.model_registry import model_path
+from app.rollup import rebuild_daily_sales, record_sale
+from app.jobs import _claim_next_job, enqueue_training, run_job
+from app.training import train_incremental, train_now
+
+
+class GlobalModelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        os.environ['TRAINING_WORKERS'] = '1'
+        os.environ['TRAINING_MODE'] = 'global'
+        os.environ['GLOBAL_MODEL_MAX_ITER'] = '20'
+        self.models_dir = tempfile.mkdtemp()
+        os.environ['MODELS_DIR'] = self.models_dir
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='password'))
+        products = [Product(sku=f'TEST00{i}', name=f'Product {i}', price=5.0 * i, stock=1000) for i in (1, 2, 3)]
+        db.session.add_all(products)
+        db.session.commit()
+        self.product_ids = [p.id for p in products]
+        today = dt.datetime.now()
+        for n, product in enumerate(products[:2], start=1):
+            for i in range(60):
+                d = today - dt.timedelta(days=i + 1)
+                qty = n * (3 if d.weekday() >= 5 else 1)
+                db.session.add(Sale(product_id=product.id, quantity=qty, total_price=qty * product.price,
+                                    sale_date=d, week_number=d.isocalendar()[1], year=d.year))
+        db.session.commit()
+        rebuild_daily_sales()
+        db.session.commit()
+
+        response = self.client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'})
+        self.headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        for key in ('JOB_RUNNER_ENABLED', 'TRAINING_WORKERS', 'TRAINING_MODE', 'GLOBAL_MODEL_MAX_ITER', 'MODELS_DIR'):
+            os.environ.pop(key, None)
+        shutil.rmtree(self.models_dir, ignore_errors=True)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_panel_features(self):
+        """Test lag and rolling-mean features against the series they come from"""
+        start = np.datetime64('2024-01-01')
+        days = start + np.array([0, 2, 9, 16, 20])
+        panel = build_panel({7: (days, np.array([1.0, 2.0, 3.0, 4.0, 5.0]))}, {7: 9.5}, dt.date(2024, 1, 22))
+        self.assertEqual(len(panel.values), 22)
+        features = dict(zip(GLOBAL_FEATURE_COLUMNS, panel_features(panel, np.array([16]))[0]))
+        self.assertEqual(features['price'], 9.5)
+        self.assertEqual(features['lag_7'], 3.0)
+        self.assertEqual(features['lag_14'], 2.0)
+        self.assertAlmostEqual(features['mean_7'], 3.0 / 7)
+        self.assertAlmostEqual(features['mean_28'], 6.0 / 10)
+        # Lags before the first sale are missing, not zero
+        self.assertTrue(np.isnan(panel_features(panel, np.array([LAG + 3]))[0][GLOBAL_FEATURE_COLUMNS.index('lag_14')]))
+
+    def test_one_model_forecasts_every_product(self):
+        """Test that global training writes one model file and forecasts for every product with sales"""
+        train_now()
+        self.assertTrue(os.path.exists(model_path(self.models_dir, None, 'global')))
+        self.assertFalse(os.path.exists(model_path(self.models_dir, self.product_ids[0])))
+        rows = Forecast.query.filter(Forecast.forecast_date.isnot(None)).all()
+        self.assertEqual({r.product_id for r in rows}, set(self.product_ids[:2]))
+        self.assertEqual(len(rows), 14)
+        self.assertEqual({s.model_type for s in ProductTrainingState.query.all()}, {'global'})
+        self.assertEqual({r.interval_coverage for r in rows}, {0.8})
+        self.assertTrue(all(0 <= r.lower_bound <= r.predicted_quantity <= r.upper_bound for r in rows))
+
+        # The larger seller gets the larger forecast
+        totals = {pid: sum(r.predicted_quantity for r in rows if r.product_id == pid) for pid in self.product_ids[:2]}
+        self.assertGreater(totals[self.product_ids[1]], totals[self.product_ids[0]])
+
+        response = self.client.get(f'/api/forecast?product_id={self.product_ids[0]}&horizon_days=20', headers=self.headers)
+        points = json.loads(response.data)['forecast']
+        self.assertEqual([p['source'] for p in points], ['stored'] * 7 + ['computed'] * 13)
+        self.assertTrue(all(p['prediction'] > 0 for p in points))
+
+    def test_incremental_reuses_model(self):
+        """Test that incremental runs refresh forecasts without refitting the global model"""
+        train_now()
+        path = model_path(self.models_dir, None, 'global')
+        version = os.stat(path).st_mtime_ns
+        d = dt.datetime.now()
+        db.session.add(Sale(product_id=self.product_ids[0], quantity=50, total_price=250.0,
+                            sale_date=d, week_number=d.isocalendar()[1], year=d.year))
+        db.session.commit()
+        rebuild_daily_sales()
+        db.session.commit()
+        train_incremental()
+        self.assertEqual(os.stat(path).st_mtime_ns, version)
+
+    def test_memoized_predictions_follow_new_sales(self):
+        """Test that global predictions are recomputed once new sales change the lag features"""
+        train_now()
+        product_id = self.product_ids[0]
+        today = dt.date.today()
+        days = [today + dt.timedelta(days=i) for i in range(10, 20)]
+        before = predict_days(product_id, days)
+        self.assertEqual(predict_days(product_id, days), before)
+        self.assertEqual(len(get_memo()), 10)
+
+        now = dt.datetime.now()
+        for i in range(7):
+            d = now - dt.timedelta(days=i + 1)
+            sale = Sale(product_id=product_id, quantity=50, total_price=250.0, sale_date=d,
+                        week_number=d.isocalendar()[1], year=d.year)
+            db.session.add(sale)
+            record_sale(sale)
+        db.session.commit()
+        after = predict_days(product_id, days)
+        self.assertEqual(len(get_memo()), 20)
+        self.assertGreater(sum(p[0] for p in after.values()), sum(p[0] for p in before.values()))
+
+    def test_global_fit_keeps_job_heartbeat(self):
+        """Test that a training job's heartbeat is refreshed before and after the catalog-wide fit"""
+        self.app.config.update(JOB_STALE_SECONDS=1, BACKTEST_ON_TRAINING=False)
+        job, _ = enqueue_training('full')
+        statuses = []
+        build, fit = training.build_panel, training.fit_global_model
+
+        def status():
+            # Another runner polling now must see the job alive
+            _claim_next_job()
+            with db.engine.connect() as conn:
+                statuses.append(conn.execute(db.select(TrainingJob.status).where(TrainingJob.id == job.id)).scalar())
+
+        def slow_build(*args, **kwargs):
+            if kwargs.get('extra_days'):
+                status()
+            else:
+                time.sleep(1.2)
+            return build(*args, **kwargs)
+
+        def slow_fit(*args, **kwargs):
+            status()
+            time.sleep(1.2)
+            return fit(*args, **kwargs)
+
+        self.assertEqual(_claim_next_job(), job.id)
+        with mock.patch('app.training.build_panel', slow_build), mock.patch('app.training.fit_global_model', slow_fit):
+            run_job(job.id)
+        self.assertEqual(statuses, ['running', 'running'])
+        db.session.expire_all()
+        self.assertEqual(db.session.get(TrainingJob, job.id).status, 'succeeded')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, Sale, User
+from app.horizon import get_memo
+from app.rollup import rebuild_daily_sales
+from app.training import train_now
+
+
+class HorizonTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        os.environ['TRAINING_WORKERS'] = '1'
+        self.models_dir = tempfile.mkdtemp()
+        os.environ['MODELS_DIR'] = self.models_dir
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='password'))
+        product = Product(sku='TEST001', name='Test Product', price=10.0, stock=1000)
+        untrained = Product(sku='TEST002', name='No Sales', price=10.0, stock=1000)
+        db.session.add_all([product, untrained])
+        db.session.commit()
+        self.product_id, self.untrained_id = product.id, untrained.id
+        today = datetime.now()
+        for i in range(60):
+            d = today - timedelta(days=i + 1)
+            db.session.add(Sale(product_id=product.id, quantity=1 + i % 7, total_price=10.0,
+                                sale_date=d, week_number=d.isocalendar()[1], year=d.year))
+        db.session.commit()
+        rebuild_daily_sales()
+        db.session.commit()
+        train_now()
+
+        response = self.client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'})
+        self.headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        for key in ('JOB_RUNNER_ENABLED', 'TRAINING_WORKERS', 'MODELS_DIR'):
+            os.environ.pop(key, None)
+        shutil.rmtree(self.models_dir, ignore_errors=True)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def _forecast(self, product_id, horizon):
+        response = self.client.get(f'/api/forecast?product_id={product_id}&horizon_days={horizon}', headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.data)
+        return json.loads(response.data)['forecast']
+
+    def test_long_horizon_is_computed_and_memoized(self):
+        """Test that days past the stored forecasts are predicted once per model version"""
+        points = self._forecast(self.product_id, 30)
+        self.assertEqual(len(points), 30)
+        self.assertEqual([p['source'] for p in points], ['stored'] * 7 + ['computed'] * 23)
+        self.assertTrue(all(p['lower_bound'] <= p['prediction'] <= p['upper_bound'] for p in points))
+        # Stored and computed days share the model's residual-based interval
+        self.assertEqual({p['interval_coverage'] for p in points}, {0.8})
+        memo = get_memo()
+        self.assertEqual(len(memo), 23)
+
+        # Same horizon again is served from the memo; a longer one only adds the new days
+        self.assertEqual(self._forecast(self.product_id, 30), points)
+        self.assertEqual(len(memo), 23)
+        self._forecast(self.product_id, 40)
+        self.assertEqual(len(memo), 33)
+
+        # A retrained model has a new version, so its days are predicted afresh
+        train_now()
+        self._forecast(self.product_id, 30)
+        self.assertEqual(len(memo), 33 + 23)
+
+    def test_without_model(self):
+        """Test that a product without forecasts or model gets a zero-filled horizon"""
+        points = self._forecast(self.untrained_id, 10)
+        self.assertEqual(len(points), 10)
+        self.assertTrue(all(p['prediction'] == 0 and p['source'] == 'none' for p in points))
+
+    def test_horizon_limits(self):
+        """Test that out of range horizons are rejected"""
+        for horizon in ('0', '10000', 'abc'):
+            response = self.client.get(f'/api/forecast?product_id={self.product_id}&horizon_days={horizon}',
+                                       headers=self.headers)
+            self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import sys
+import os
+import io
+import tempfile
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, Sale
+from app.importer import import_csv
+
+
+CSV = """name,sku,product price,stock,quantity sale,date of sale
+Widget,W-1,2.5,10,,
+Widget,W-1,2.5,10,4,2024-01-02
+Gadget,G-1,10,3,2,2024-01-03
+Gadget,G-1,10,3,5,2024-01-04
+Gadget,G-1,10,3,1,2024-01-05
+Widget,W-1,2.5,10,1,not-a-date
+Widget,,2.5,10,1,2024-01-02
+Widget,W-1,abc,10,1,2024-01-02
+Existing,E-1,0,0,2,2024-01-06
+"""
+
+
+class ImporterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.session.add(Product(sku='E-1', name='Existing', price=4.0, stock=50))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.environ.pop('JOB_RUNNER_ENABLED', None)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_import_in_chunks(self):
+        """Test that products and sales are imported across chunks with stock kept in aggregate"""
+        result = import_csv(io.BytesIO(CSV.encode('utf-8')), chunk_size=2)
+        db.session.commit()
+
+        self.assertEqual(result['rows'], 9)
+        self.assertEqual(result['inserted_products'], 2)
+        self.assertEqual(result['inserted_sales'], 4)
+        self.assertEqual(result['rejected_rows'], 4)
+        self.assertEqual([r['reason'] for r in result['rejected']],
+                         ['no stock left', 'invalid date of sale', 'missing sku', 'invalid number'])
+        self.assertIsNotNone(result['rows_per_second'])
+
+        widget = Product.query.filter_by(sku='W-1').one()
+        gadget = Product.query.filter_by(sku='G-1').one()
+        existing = Product.query.filter_by(sku='E-1').one()
+        self.assertEqual(widget.stock, 6)
+        # Second Gadget sale is capped to the single unit left, the third finds no stock
+        self.assertEqual(gadget.stock, 0)
+        self.assertEqual(sorted(s.quantity for s in Sale.query.filter_by(product_id=gadget.id)), [1, 2])
+        self.assertEqual(existing.stock, 48)
+        self.assertEqual(Sale.query.filter_by(product_id=existing.id).one().total_price, 8.0)
+        self.assertEqual(result['touched_product_ids'], sorted([widget.id, gadget.id, existing.id]))
+
+    def test_unknown_columns_are_rejected(self):
+        """Test that rows without the expected columns are counted as rejected"""
+        result = import_csv(io.BytesIO(b"foo,bar\n1,2\n"))
+        self.assertEqual(result['rejected_rows'], 1)
+        self.assertEqual(result['inserted_sales'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
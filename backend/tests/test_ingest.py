@@ -0,0 +1,96 @@
+import unittest
+import sys
+import os
+import io
+import tempfile
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, Sale
+from app.ingest import ingest_sales_csv
+from app.importer import import_csv
+
+
+CSV = """name,sku,product price,stock,quantity sale,date of sale
+Widget,W-1,2.5,10,4,2024-01-02
+Gadget,G-1,10,3,2,2024-01-03
+Gadget,G-1,10,3,5,2024-01-04
+Gadget,G-1,10,3,1,2024-01-05
+Widget,W-1,2.5,10,1,not-a-date
+Widget,,2.5,10,1,2024-01-02
+Widget,W-1,abc,10,1,2024-01-02
+Existing,E-1,0,0,2,2024-12-30
+Widget,W-1,2.5,10,,
+"""
+
+
+class IngestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.session.add(Product(sku='E-1', name='Existing', price=4.0, stock=50))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.environ.pop('JOB_RUNNER_ENABLED', None)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def _snapshot(self):
+        products = {p.sku: (p.name, p.price, p.stock) for p in Product.query}
+        sales = sorted(
+            (s.product.sku, s.quantity, s.total_price, s.sale_date, s.week_number, s.year) for s in Sale.query
+        )
+        return products, sales
+
+    def test_bulk_load_merges_sales(self):
+        """Test that the staged, set-based load caps stock and computes week/year"""
+        result = ingest_sales_csv(io.BytesIO(CSV.encode('utf-8')), chunk_size=2)
+        db.session.commit()
+
+        self.assertEqual(result['method'], 'insert')
+        self.assertEqual(result['rows'], 9)
+        self.assertEqual(result['inserted_products'], 2)
+        self.assertEqual(result['inserted_sales'], 4)
+        self.assertEqual(result['rejected_rows'], 5)
+        self.assertEqual([r['reason'] for r in result['rejected']],
+                         ['no stock left', 'invalid date of sale', 'missing sku', 'invalid number', 'not a sales row'])
+
+        gadget = Product.query.filter_by(sku='G-1').one()
+        existing = Product.query.filter_by(sku='E-1').one()
+        self.assertEqual(gadget.stock, 0)
+        self.assertEqual(sorted(s.quantity for s in Sale.query.filter_by(product_id=gadget.id)), [1, 2])
+        self.assertEqual(existing.stock, 48)
+        sale = Sale.query.filter_by(product_id=existing.id).one()
+        # 2024-12-30 is in ISO week 1 of 2025; year stays the calendar year like the other writers
+        self.assertEqual((sale.week_number, sale.year, sale.total_price), (1, 2024, 8.0))
+        self.assertEqual(len(result['touched_product_ids']), 3)
+
+    def test_matches_row_importer(self):
+        """Test that bulk mode leaves the same products and sales as the row-by-row importer"""
+        sales_only = '\n'.join(CSV.strip().splitlines()[:-1]) + '\n'
+        ingest_sales_csv(io.BytesIO(sales_only.encode('utf-8')))
+        db.session.commit()
+        bulk = self._snapshot()
+
+        Sale.query.delete()
+        Product.query.delete()
+        db.session.add(Product(sku='E-1', name='Existing', price=4.0, stock=50))
+        db.session.commit()
+        import_csv(io.BytesIO(sales_only.encode('utf-8')))
+        db.session.commit()
+        self.assertEqual(bulk, self._snapshot())
+
+
+if __name__ == '__main__':
+    unittest.main()
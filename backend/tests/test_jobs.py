@@ -0,0 +1,237 @@
+import unittest
+import sys
+import os
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, Sale, Forecast, TrainingJob, User, ProductTrainingState
+from sqlalchemy import event
+from app import jobs
+from app.jobs import _claim_next_job, _merge_product_ids, _wakeup, run_job_runner, run_pending_jobs, enqueue_training
+from app.training import train_now, train_incremental
+from app.rollup import rebuild_daily_sales
+
+
+class TrainingJobTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        os.environ['TRAINING_WORKERS'] = '1'
+        self.models_dir = tempfile.mkdtemp()
+        os.environ['MODELS_DIR'] = self.models_dir
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='password'))
+        product = Product(sku='TEST001', name='Test Product', price=10.0, stock=1000)
+        db.session.add(product)
+        db.session.commit()
+        self.product_id = product.id
+        self._add_sales(product.id, 10)
+
+        response = self.client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'})
+        self.headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+    def _add_sales(self, product_id, n, offset=1):
+        today = datetime.now()
+        for i in range(n):
+            d = today - timedelta(days=i + offset)
+            db.session.add(Sale(product_id=product_id, quantity=i + 1, total_price=(i + 1) * 10.0,
+                                sale_date=d, week_number=d.isocalendar()[1], year=d.year))
+        db.session.commit()
+        rebuild_daily_sales([product_id])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.environ.pop('JOB_RUNNER_ENABLED', None)
+        os.environ.pop('TRAINING_WORKERS', None)
+        os.environ.pop('MODELS_DIR', None)
+        shutil.rmtree(self.models_dir, ignore_errors=True)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_train_now_enqueues_and_deduplicates(self):
+        """Test that train-now returns a job id immediately and coalesces repeated requests"""
+        first = self.client.post('/api/admin/train-now', headers=self.headers)
+        self.assertEqual(first.status_code, 202)
+        second = self.client.post('/api/admin/train-now', headers=self.headers)
+        self.assertEqual(json.loads(second.data)['job_id'], json.loads(first.data)['job_id'])
+        self.assertTrue(json.loads(second.data)['deduplicated'])
+        self.assertEqual(TrainingJob.query.count(), 1)
+
+    def test_job_runs_and_reports_status(self):
+        """Test that a queued job is executed and exposes progress and timings"""
+        job_id = json.loads(self.client.post('/api/admin/train-now', headers=self.headers).data)['job_id']
+        response = self.client.get(f'/api/admin/jobs/{job_id}', headers=self.headers)
+        self.assertEqual(json.loads(response.data)['status'], 'queued')
+
+        self.assertEqual(run_pending_jobs(), 1)
+        db.session.expire_all()
+        data = json.loads(self.client.get(f'/api/admin/jobs/{job_id}', headers=self.headers).data)
+        self.assertEqual(data['status'], 'succeeded')
+        self.assertEqual(data['progress'], {'products_done': 1, 'products_total': 1})
+        self.assertIsNotNone(data['timings']['run_seconds'])
+        self.assertEqual(Forecast.query.count(), 7)
+
+    def test_trainer_role_runs_queued_jobs(self):
+        """Test that a trainer process executes queued jobs in its foreground loop until stopped"""
+        with self.assertRaises(ValueError):
+            create_app(role='worker')
+        trainer = create_app(role='trainer')
+        stop = threading.Event()
+        thread = threading.Thread(target=run_job_runner, args=(trainer, stop))
+        thread.start()
+        try:
+            job, _ = enqueue_training('full')
+            db.session.commit()
+            deadline = time.monotonic() + 60
+            while time.monotonic() < deadline:
+                db.session.expire_all()
+                if db.session.get(TrainingJob, job.id).status in ('succeeded', 'failed'):
+                    break
+                time.sleep(0.1)
+        finally:
+            stop.set()
+            _wakeup.set()
+            thread.join(timeout=60)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(db.session.get(TrainingJob, job.id).status, 'succeeded')
+        self.assertEqual(Forecast.query.count(), 7)
+
+    def test_concurrent_claims_start_one_job(self):
+        """Test that two runners claiming at once start only one of two queued jobs"""
+        db.session.add_all([TrainingJob(kind='full', status='queued'),
+                            TrainingJob(kind='incremental', params={'product_ids': [self.product_id]}, status='queued')])
+        db.session.commit()
+        first_paused, second_done = threading.Event(), threading.Event()
+
+        def pause_first_claim(conn, cursor, statement, parameters, context, executemany):
+            # The first claimer stops between its "anything running?" check and its claim
+            if threading.current_thread().name == 'first' and 'ORDER BY training_jobs.id' in statement:
+                first_paused.set()
+                second_done.wait(timeout=2)
+
+        claimed = {}
+
+        def claim():
+            with self.app.app_context():
+                claimed[threading.current_thread().name] = _claim_next_job()
+
+        event.listen(db.engine, 'before_cursor_execute', pause_first_claim)
+        try:
+            first = threading.Thread(target=claim, name='first')
+            first.start()
+            self.assertTrue(first_paused.wait(timeout=10))
+            second = threading.Thread(target=claim, name='second')
+            second.start()
+            second.join(timeout=10)
+            second_done.set()
+            first.join(timeout=10)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', pause_first_claim)
+        self.assertEqual(sorted(claimed.values(), key=lambda v: v is None)[1:], [None])
+        db.session.expire_all()
+        self.assertEqual(TrainingJob.query.filter_by(status='running').count(), 1)
+
+    def test_upload_does_not_coalesce_with_running_job(self):
+        """Test that new data queues a follow-up job instead of joining a running one"""
+        job = TrainingJob(kind='full', status='running', started_at=datetime.utcnow(), heartbeat_at=datetime.utcnow())
+        db.session.add(job)
+        db.session.commit()
+        self.assertEqual(json.loads(self.client.post('/api/admin/train-now', headers=self.headers).data)['job_id'], job.id)
+
+        csv_data = b"name,sku,product price,stock,quantity sale,date of sale\nTest Product,TEST001,10,1000,2,2024-01-01\n"
+        response = self.client.post('/api/admin/upload-csv', headers=self.headers,
+                                    data={'file': (io.BytesIO(csv_data), 'sales.csv')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(json.loads(response.data)['training_job_id'], job.id)
+
+    def test_incremental_retrains_only_changed_products(self):
+        """Test that incremental mode skips products whose sales did not change"""
+        other = Product(sku='TEST002', name='Other Product', price=5.0, stock=1000)
+        db.session.add(other)
+        db.session.commit()
+        self._add_sales(other.id, 8)
+        train_now()
+        states = {s.product_id: s.last_trained_at for s in ProductTrainingState.query.all()}
+        self.assertEqual(set(states), {self.product_id, other.id})
+        self.assertTrue(all(s.model_type for s in ProductTrainingState.query.all()))
+
+        train_incremental()
+        db.session.expire_all()
+        self.assertEqual({s.product_id: s.last_trained_at for s in ProductTrainingState.query.all()}, states)
+
+        self._add_sales(other.id, 1, offset=0)
+        train_incremental()
+        db.session.expire_all()
+        after = {s.product_id: s.last_trained_at for s in ProductTrainingState.query.all()}
+        self.assertEqual(after[self.product_id], states[self.product_id])
+        self.assertGreater(after[other.id], states[other.id])
+
+    def test_incremental_requests_are_merged(self):
+        """Test that queued incremental jobs merge product ids and yield to a queued full retrain"""
+        first, created = enqueue_training('incremental', {'product_ids': [1, 2]}, data_changed=True)
+        second, created_again = enqueue_training('incremental', {'product_ids': [2, 3]}, data_changed=True)
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(second.id, first.id)
+        self.assertEqual(second.params['product_ids'], [1, 2, 3])
+
+        TrainingJob.query.delete()
+        full, _ = enqueue_training('full')
+        self.assertEqual(enqueue_training('incremental', {'product_ids': [1]}, data_changed=True)[0].id, full.id)
+
+    def test_incremental_request_after_claim_gets_its_own_job(self):
+        """Test that products are not merged into a job claimed between reading and updating it"""
+        first, _ = enqueue_training('incremental', {'product_ids': [1]}, data_changed=True)
+
+        def claim_then_merge(a, b):
+            self.assertEqual(_claim_next_job(), first.id)
+            return _merge_product_ids(a, b)
+
+        with mock.patch('app.jobs._merge_product_ids', side_effect=claim_then_merge):
+            second, created = enqueue_training('incremental', {'product_ids': [2]}, data_changed=True)
+        self.assertTrue(created)
+        self.assertNotEqual(second.id, first.id)
+        self.assertEqual(second.params['product_ids'], [2])
+        db.session.expire_all()
+        self.assertEqual(db.session.get(TrainingJob, first.id).params['product_ids'], [1])
+
+    def test_enqueue_takes_queue_lock_on_postgres(self):
+        """Test that deduplicating enqueues hold the job queue lock shared with claims"""
+        keys = []
+        conn = db.session.connection()
+        # Stand-in for the Postgres function on this SQLite connection
+        conn.connection.driver_connection.create_function('pg_advisory_xact_lock', 1, keys.append)
+        with mock.patch.object(conn.dialect, 'name', 'postgresql'):
+            job, created = enqueue_training('full')
+            self.assertEqual(enqueue_training('full'), (job, False))
+        self.assertTrue(created)
+        self.assertEqual(keys, [jobs._QUEUE_LOCK_KEY] * 2)
+
+    def test_unknown_job(self):
+        """Test that a missing job returns 404"""
+        response = self.client.get('/api/admin/jobs/999', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
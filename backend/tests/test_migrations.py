@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, inspect, text
+from app.migrations import MIGRATIONS, run_migrations
+
+
+class MigrationsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        self.engine = create_engine(f'sqlite:///{self.db_path}')
+        # Tables as created by older releases: no secondary indexes, no forecast uniqueness
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE sales (id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL, quantity INTEGER NOT NULL, "
+                "total_price FLOAT NOT NULL, sale_date DATETIME, week_number INTEGER NOT NULL, year INTEGER NOT NULL)"
+            ))
+            conn.execute(text(
+                "CREATE TABLE forecasts (id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL, "
+                "predicted_quantity FLOAT NOT NULL, lower_bound FLOAT, upper_bound FLOAT, forecast_date DATE, "
+                "week_number INTEGER NOT NULL, year INTEGER NOT NULL, created_at DATETIME)"
+            ))
+            for hour, qty in ((9, 2), (17, 3)):
+                conn.execute(text(
+                    "INSERT INTO sales (product_id, quantity, total_price, sale_date, week_number, year) "
+                    "VALUES (1, :q, 1.0, :d, 9, 2024)"
+                ), {'q': qty, 'd': f'2024-03-01 {hour:02d}:00:00.000000'})
+            for value in (1.0, 2.0):
+                conn.execute(text(
+                    "INSERT INTO forecasts (product_id, predicted_quantity, forecast_date, week_number, year) "
+                    "VALUES (1, :v, '2024-03-01', 9, 2024)"
+                ), {'v': value})
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_upgrades_legacy_schema_once(self):
+        """Test that pending migrations add the indexes, dedupe forecasts, backfill the rollup and are recorded"""
+        self.assertEqual(run_migrations(self.engine), [m[0] for m in MIGRATIONS])
+
+        insp = inspect(self.engine)
+        sales_indexes = {i['name']: i['column_names'] for i in insp.get_indexes('sales')}
+        self.assertEqual(sales_indexes['ix_sales_product_date'], ['product_id', 'sale_date'])
+        self.assertEqual(sales_indexes['ix_sales_sale_date'], ['sale_date'])
+        forecast_indexes = {i['name']: i for i in insp.get_indexes('forecasts')}
+        self.assertTrue(forecast_indexes['uq_forecasts_product_date']['unique'])
+        self.assertIn('interval_coverage', {c['name'] for c in insp.get_columns('forecasts')})
+        with self.engine.connect() as conn:
+            # The newest of the duplicated daily forecasts is kept
+            self.assertEqual(conn.execute(text("SELECT predicted_quantity FROM forecasts")).scalars().all(), [2.0])
+            self.assertEqual(conn.execute(text("SELECT quantity, sales_count FROM daily_sales")).all(), [(5, 2)])
+
+        self.assertEqual(run_migrations(self.engine), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
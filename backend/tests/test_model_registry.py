@@ -0,0 +1,85 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.model_registry import ModelRegistry, model_path, save_model
+
+
+class ModelRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.models_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.models_dir, ignore_errors=True)
+
+    def _save(self, product_id, value, n=1000):
+        path = model_path(self.models_dir, product_id)
+        save_model(np.full(n, value, dtype=np.float64), path)
+        return os.path.getsize(path)
+
+    def test_hits_and_misses(self):
+        """Test that a model is loaded once and then served from memory"""
+        self._save(1, 1.0)
+        registry = ModelRegistry(self.models_dir)
+        self.assertIsNone(registry.get(99))
+        first = registry.get(1)
+        second = registry.get(1)
+        self.assertIs(first.model, second.model)
+        stats = registry.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 2, 1))
+
+    def test_reload_when_file_replaced(self):
+        """Test that writing a newer model invalidates the cached one"""
+        self._save(1, 1.0)
+        registry = ModelRegistry(self.models_dir)
+        old = registry.get(1)
+        self._save(1, 2.0)
+        new = registry.get(1)
+        self.assertNotEqual(old.version, new.version)
+        self.assertEqual(new.model[0], 2.0)
+        self.assertEqual(registry.stats()['invalidations'], 1)
+        os.remove(model_path(self.models_dir, 1))
+        self.assertIsNone(registry.get(1))
+        self.assertEqual(registry.stats()['entries'], 0)
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        """Test LRU eviction once the cached bytes exceed the budget"""
+        size = self._save(1, 1.0)
+        self._save(2, 2.0)
+        self._save(3, 3.0)
+        registry = ModelRegistry(self.models_dir, max_bytes=2 * size)
+        registry.get(1)
+        registry.get(2)
+        registry.get(1)  # 2 is now the least recently used
+        registry.get(3)
+        stats = registry.stats()
+        self.assertEqual((stats['entries'], stats['evictions'], stats['bytes']), (2, 1, 2 * size))
+        hits = stats['hits']
+        registry.get(1)
+        self.assertEqual(registry.stats()['hits'], hits + 1)
+        registry.get(2)
+        self.assertEqual(registry.stats()['evictions'], 2)
+
+    def test_concurrent_first_use_loads_once(self):
+        """Test that threads asking for the same cold model share one load"""
+        self._save(1, 1.0, n=200_000)
+        registry = ModelRegistry(self.models_dir)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get(1).model)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len({id(m) for m in results}), 1)
+        self.assertEqual(registry.stats()['misses'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, Sale, User
+
+
+class PaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='password'))
+        products = [Product(sku=f'SKU{i}', name=f'Product {i}', price=5.0, stock=100) for i in range(5)]
+        db.session.add_all(products)
+        db.session.commit()
+        self.product_ids = [p.id for p in products]
+        start = datetime(2024, 1, 1, 12)
+        for i in range(25):
+            p = products[i % 5]
+            d = start + timedelta(days=i)
+            db.session.add(Sale(product_id=p.id, quantity=1, total_price=5.0, sale_date=d,
+                                week_number=d.isocalendar()[1], year=d.year))
+        db.session.commit()
+
+        response = self.client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'})
+        self.headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.environ.pop('JOB_RUNNER_ENABLED', None)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def _get(self, url):
+        response = self.client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.data)
+        return json.loads(response.data)
+
+    def test_sales_keyset_pages(self):
+        """Test that following next_after_id walks every sale exactly once, newest first"""
+        seen, url = [], '/api/sales?limit=10'
+        while True:
+            page = self._get(url)
+            seen.extend(int(s['id']) for s in page['items'])
+            if page['next_after_id'] is None:
+                break
+            url = f"/api/sales?limit=10&after_id={page['next_after_id']}"
+        self.assertEqual(seen, sorted((s.id for s in Sale.query), reverse=True))
+        self.assertEqual(page['items'][-1]['productName'], 'Product 0')
+        self.assertNotIn('total', page)
+
+    def test_total_on_request(self):
+        """Test that with_total=1 counts every matching row, whichever page is asked for"""
+        with mock.patch('app.routes.sales.SALES_DEFAULT_LIMIT', 10):
+            page = self._get('/api/sales?with_total=1')
+            self.assertEqual((len(page['items']), page['total']), (10, 25))
+            self.assertNotIn('total', self._get(f"/api/sales?after_id={page['next_after_id']}"))
+        page = self._get(f'/api/products?after_id={self.product_ids[0]}&with_total=1')
+        self.assertEqual((len(page['items']), page['total']), (4, 5))
+
+    def test_sales_filters(self):
+        """Test product and inclusive date filters"""
+        page = self._get(f'/api/sales?product_id={self.product_ids[1]}&date_from=2024-01-02&date_to=2024-01-12')
+        self.assertEqual([s['date'] for s in page['items']], ['2024-01-12', '2024-01-07', '2024-01-02'])
+        response = self.client.get('/api/sales?limit=0', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/sales?date_from=yesterday', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_streamed_exports(self):
+        """Test that stream=1 returns every matching row as one JSON document"""
+        response = self.client.get('/api/sales?stream=1&limit=2', headers=self.headers)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(len(json.loads(response.data)['items']), 25)
+        response = self.client.get(f'/api/products?stream=1&after_id={self.product_ids[2]}', headers=self.headers)
+        self.assertEqual([p['sku'] for p in json.loads(response.data)['items']], ['SKU3', 'SKU4'])
+
+    def test_products_pages(self):
+        """Test product pages in id order"""
+        page = self._get('/api/products?limit=3')
+        self.assertEqual([p['sku'] for p in page['items']], ['SKU0', 'SKU1', 'SKU2'])
+        page = self._get(f"/api/products?limit=3&after_id={page['next_after_id']}")
+        self.assertEqual([p['sku'] for p in page['items']], ['SKU3', 'SKU4'])
+        self.assertIsNone(page['next_after_id'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import sys
+import os
+import tempfile
+import datetime as dt
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, Sale, Forecast, DailySales
+from app.training_data import history_query
+from app.routes.forecast import comparison_query
+from app.rollup import rebuild_daily_sales
+
+
+def explain(stmt) -> str:
+    """Return the database's plan for a SQLAlchemy statement as one string.
+
+    SQLite: EXPLAIN QUERY PLAN details. Postgres: EXPLAIN text with sequential
+    scans disabled, so the assertion is about index usability rather than the
+    planner's choice on a tiny table.
+    """
+    if hasattr(stmt, 'statement'):
+        stmt = stmt.statement
+    conn = db.session.connection()
+    compiled = stmt.compile(bind=conn, compile_kwargs={"render_postcompile": True})
+    if conn.dialect.name == 'postgresql':
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        rows = conn.exec_driver_sql("EXPLAIN " + str(compiled), compiled.params).all()
+        return '\n'.join(r[0] for r in rows)
+    params = tuple(compiled.params[k] for k in compiled.positiontup)
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).all()
+    return '\n'.join(r[-1] for r in rows)
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = os.getenv('TEST_EXPLAIN_DB_URL', f'sqlite:///{self.db_path}')
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        products = [Product(sku=f'SKU{i:03d}', name=f'Product {i}', price=10.0, stock=1000) for i in range(20)]
+        db.session.add_all(products)
+        db.session.flush()
+        start = dt.datetime(2024, 1, 1)
+        sales, forecasts = [], []
+        for p in products:
+            for d in range(90):
+                day = start + dt.timedelta(days=d)
+                sales.append({'product_id': p.id, 'quantity': 1 + d % 5, 'total_price': 10.0, 'sale_date': day,
+                              'week_number': day.isocalendar()[1], 'year': day.year})
+            for d in range(14):
+                day = (start + dt.timedelta(days=90 + d)).date()
+                forecasts.append({'product_id': p.id, 'predicted_quantity': 2.0, 'forecast_date': day,
+                                  'week_number': day.isocalendar()[1], 'year': day.year})
+        db.session.execute(db.insert(Sale), sales)
+        db.session.execute(db.insert(Forecast), forecasts)
+        rebuild_daily_sales()
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+        self.product_id = products[3].id
+        self.since = start + dt.timedelta(days=60)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.environ.pop('JOB_RUNNER_ENABLED', None)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def assertUsesIndex(self, plan, index):
+        self.assertIn(index, plan)
+        # SQLite: a full table scan or an extra sort means the index did not serve the query
+        self.assertNotRegex(plan, r'SCAN (TABLE )?sales\b(?! USING)')
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_training_loader(self):
+        """Test that the training loader reads the rollup in index order"""
+        # The loader reads the daily rollup in primary key order
+        for query in (history_query(), history_query([self.product_id])):
+            plan = explain(query)
+            self.assertRegex(plan, r'sqlite_autoindex_daily_sales_1|daily_sales_pkey')
+            self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+            self.assertNotIn('Seq Scan', plan)
+
+    def test_forecast_comparison(self):
+        """Test that the comparison looks up each spine day's rollup and forecast rows by key"""
+        start = self.since.date()
+        query = comparison_query([self.product_id, self.product_id + 1], start, start + dt.timedelta(days=40))
+        plan = explain(query)
+        self.assertRegex(plan, r'sqlite_autoindex_daily_sales_1|daily_sales_pkey')
+        self.assertRegex(plan, r'sqlite_autoindex_forecasts|uq_forecasts_product_date')
+        self.assertNotRegex(plan, r'SCAN (TABLE )?(daily_sales|forecasts)\b')
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_dashboard_series(self):
+        """Test that the daily series only touches the requested days of the rollup"""
+        query = (
+            db.session.query(DailySales.day, db.func.sum(DailySales.quantity).label('s'))
+            .filter(DailySales.day >= self.since.date())
+            .group_by(DailySales.day)
+            .order_by(DailySales.day.asc())
+        )
+        plan = explain(query)
+        self.assertIn('ix_daily_sales_day', plan)
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_sales_date_range(self):
+        """Test that date-filtered sales use the sale_date index"""
+        query = Sale.query.filter(Sale.sale_date >= self.since)
+        plan = explain(query)
+        self.assertIn('ix_sales_sale_date', plan)
+        self.assertNotIn('Seq Scan', plan)
+
+    def test_product_forecasts(self):
+        """Test that upcoming forecasts of a product come from the unique (product_id, forecast_date) index"""
+        query = Forecast.query.filter(
+            Forecast.product_id == self.product_id,
+            Forecast.forecast_date >= dt.date(2024, 4, 1),
+        ).order_by(Forecast.forecast_date.asc()).limit(7)
+        plan = explain(query)
+        self.assertRegex(plan, r'sqlite_autoindex_forecasts|uq_forecasts_product_date')
+        self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan)
+        self.assertNotIn('Seq Scan', plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
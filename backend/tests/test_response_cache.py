@@ -0,0 +1,175 @@
+import unittest
+import sys
+import os
+import io
+import json
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, Sale, User
+from app.response_cache import CachedResponse, MemoryCache, current_versions
+from app.rollup import rebuild_daily_sales
+from app.training import train_now
+
+
+class SharedCache:
+    """Stand-in for a shared store: a dict several apps can be given."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries[key] = value
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        os.environ['TRAINING_WORKERS'] = '1'
+        os.environ['BACKTEST_ON_TRAINING'] = 'false'
+        self.models_dir = tempfile.mkdtemp()
+        os.environ['MODELS_DIR'] = self.models_dir
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='password'))
+        product = Product(sku='TEST001', name='Test Product', price=10.0, stock=1000)
+        db.session.add(product)
+        db.session.commit()
+        self.product_id = product.id
+        today = datetime.now()
+        for i in range(20):
+            d = today - timedelta(days=i + 1)
+            db.session.add(Sale(product_id=product.id, quantity=i % 5 + 1, total_price=10.0, sale_date=d,
+                                week_number=d.isocalendar()[1], year=d.year))
+        db.session.commit()
+        rebuild_daily_sales()
+        db.session.commit()
+
+        response = self.client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'})
+        self.headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        for key in ('JOB_RUNNER_ENABLED', 'TRAINING_WORKERS', 'BACKTEST_ON_TRAINING', 'MODELS_DIR'):
+            os.environ.pop(key, None)
+        shutil.rmtree(self.models_dir, ignore_errors=True)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def _get(self, url, client=None, **headers):
+        return (client or self.client).get(url, headers={**self.headers, **headers})
+
+    def test_memory_cache_ttl_and_lru(self):
+        """Test that entries expire after the TTL and the least recently used one is evicted"""
+        now = [0.0]
+        cache = MemoryCache(max_entries=2, ttl=10, clock=lambda: now[0])
+        entries = {k: CachedResponse(k.encode(), 'application/json', k) for k in 'abc'}
+        cache.set('a', entries['a'])
+        cache.set('b', entries['b'])
+        self.assertEqual(cache.get('a'), entries['a'])
+        cache.set('c', entries['c'])
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+        now[0] = 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_forecast_is_cached_until_training_commits(self):
+        """Test that forecasts are served from the cache, revalidated by ETag and refreshed by training"""
+        url = f'/api/forecast?product_id={self.product_id}&horizon_days=7'
+        first = self._get(url)
+        self.assertEqual((first.status_code, first.headers['X-Cache']), (200, 'MISS'))
+        second = self._get(url)
+        self.assertEqual(second.headers['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.headers['ETag'], first.headers['ETag'])
+
+        etag = first.headers['ETag']
+        not_modified = self._get(url, **{'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.data, b'')
+
+        # Other parameters are other entries
+        self.assertEqual(self._get(url.replace('=7', '=3')).headers['X-Cache'], 'MISS')
+
+        train_now()
+        trained = self._get(url, **{'If-None-Match': etag})
+        self.assertEqual((trained.status_code, trained.headers['X-Cache']), (200, 'MISS'))
+        self.assertNotEqual(trained.headers['ETag'], etag)
+        self.assertEqual(json.loads(trained.data)['forecast'][0]['source'], 'stored')
+
+    def test_sales_write_invalidates_series(self):
+        """Test that recording or deleting a sale refreshes the cached series and comparison"""
+        self.assertEqual(self._get('/api/sales/series?days=7').headers['X-Cache'], 'MISS')
+        comparison = f'/api/forecast/comparison?product_id={self.product_id}'
+        self.assertEqual(self._get(comparison).headers['X-Cache'], 'MISS')
+        self.assertEqual(self._get('/api/sales/series?days=7').headers['X-Cache'], 'HIT')
+
+        response = self.client.post('/api/sales', json={'productId': self.product_id, 'quantity': 100,
+                                                        'date': datetime.utcnow().isoformat()}, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        series = self._get('/api/sales/series?days=7')
+        self.assertEqual(series.headers['X-Cache'], 'MISS')
+        self.assertGreaterEqual(json.loads(series.data)['items'][-1]['value'], 100)
+        self.assertEqual(self._get(comparison).headers['X-Cache'], 'MISS')
+
+        sale_id = json.loads(response.data)['id']
+        self.client.delete(f'/api/sales/{sale_id}', headers=self.headers)
+        self.assertEqual(self._get('/api/sales/series?days=7').headers['X-Cache'], 'MISS')
+
+    def test_uploads_bump_versions_once(self):
+        """Test that both upload modes invalidate sales and product responses with one bump after the load"""
+        self.app.config['IMPORT_CHUNK_SIZE'] = 1
+        comparison = f'/api/forecast/comparison?product_id={self.product_id}'
+        today = datetime.now().date().isoformat()
+        csv_data = ("name,sku,product price,stock,quantity sale,date of sale\n"
+                    f"Renamed,TEST001,10,1000,2,{today}\nNew,NEW001,5,10,1,{today}\nNew,NEW001,5,10,1,{today}\n")
+        self._get(comparison)
+        for mode in ('rows', 'bulk'):
+            self.assertEqual(self._get(comparison).headers['X-Cache'], 'HIT')
+            before = current_versions(('sales', 'products'))
+            response = self.client.post(f'/api/admin/upload-csv?mode={mode}', headers=self.headers,
+                                        data={'file': (io.BytesIO(csv_data.encode()), 'sales.csv')},
+                                        content_type='multipart/form-data')
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertEqual(current_versions(('sales', 'products')), tuple(v + 1 for v in before))
+            self.assertEqual(self._get(comparison).headers['X-Cache'], 'MISS')
+        self.assertEqual(json.loads(self._get(comparison).data)['comparison_data'][-1]['actual'], 4)
+
+    def test_errors_are_not_cached(self):
+        """Test that only successful responses are stored"""
+        self.assertEqual(self._get('/api/forecast?product_id=999').status_code, 404)
+        response = self._get('/api/forecast?product_id=999')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('X-Cache', response.headers)
+
+    def test_shared_backend(self):
+        """Test that processes given the same shared store serve each other's entries"""
+        shared = SharedCache()
+        self.app.extensions['response_cache'] = shared
+        other = create_app()
+        other.extensions['response_cache'] = shared
+        url = '/api/sales/series?days=7'
+        self.assertEqual(self._get(url).headers['X-Cache'], 'MISS')
+        self.assertEqual(self._get(url, client=other.test_client()).headers['X-Cache'], 'HIT')
+        self.assertEqual(len(shared.entries), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
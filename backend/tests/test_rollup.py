@@ -0,0 +1,105 @@
+import unittest
+import sys
+import os
+import io
+import json
+import tempfile
+from datetime import date
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, DailySales, User
+from app.importer import import_csv
+from app.ingest import ingest_sales_csv
+from app.rollup import rebuild_daily_sales
+
+
+CSV = """name,sku,product price,stock,quantity sale,date of sale
+Widget,W-1,2.0,100,4,2024-01-02T09:00:00
+Widget,W-1,2.0,100,1,2024-01-02T18:30:00
+Widget,W-1,2.0,100,3,2024-01-03
+"""
+
+
+class RollupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='password'))
+        product = Product(sku='P-1', name='Product', price=5.0, stock=100)
+        db.session.add(product)
+        db.session.commit()
+        self.product_id = product.id
+
+        response = self.client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'})
+        self.headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.environ.pop('JOB_RUNNER_ENABLED', None)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def _rollup(self):
+        db.session.expire_all()
+        return sorted((r.product_id, r.day, r.quantity, r.revenue, r.sales_count) for r in DailySales.query)
+
+    def assertMatchesRebuild(self):
+        maintained = self._rollup()
+        rebuild_daily_sales()
+        db.session.commit()
+        self.assertEqual(maintained, self._rollup())
+        return maintained
+
+    def test_api_create_and_delete(self):
+        """Test that creating and deleting sales through the API keeps the rollup in step"""
+        ids = []
+        for when, qty in [('2024-02-01T10:00:00', 2), ('2024-02-01T15:00:00', 3), ('2024-02-02T10:00:00', 1)]:
+            response = self.client.post('/api/sales', headers=self.headers,
+                                        json={'productId': self.product_id, 'quantity': qty, 'date': when})
+            self.assertEqual(response.status_code, 201)
+            ids.append(json.loads(response.data)['id'])
+        self.assertEqual(self.assertMatchesRebuild(), [
+            (self.product_id, date(2024, 2, 1), 5, 25.0, 2),
+            (self.product_id, date(2024, 2, 2), 1, 5.0, 1),
+        ])
+
+        self.client.delete(f'/api/sales/{ids[0]}', headers=self.headers)
+        self.client.delete(f'/api/sales/{ids[2]}', headers=self.headers)
+        # The emptied day disappears instead of lingering with zero sales
+        self.assertEqual(self.assertMatchesRebuild(), [(self.product_id, date(2024, 2, 1), 3, 15.0, 1)])
+
+    def test_importers(self):
+        """Test that the row importer and the bulk loader both fold their sales into the rollup"""
+        import_csv(io.BytesIO(CSV.encode('utf-8')), chunk_size=1)
+        db.session.commit()
+        ingest_sales_csv(io.BytesIO(CSV.encode('utf-8')))
+        db.session.commit()
+        widget = Product.query.filter_by(sku='W-1').one()
+        self.assertEqual(self.assertMatchesRebuild(), [
+            (widget.id, date(2024, 1, 2), 10, 20.0, 4),
+            (widget.id, date(2024, 1, 3), 6, 12.0, 2),
+        ])
+
+    def test_series_reads_rollup(self):
+        """Test that the monthly series is served from the rollup"""
+        db.session.add(DailySales(product_id=self.product_id, day=date(2024, 3, 5), quantity=7, revenue=35.0, sales_count=2))
+        db.session.commit()
+        response = self.client.get('/api/sales/series?month=3&year=2024', headers=self.headers)
+        items = json.loads(response.data)['items']
+        self.assertEqual(items[4], {'label': '2024-03-05', 'value': 7})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import datetime
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.leader import LeaderLock
+from app.models import ModelTraining, Product, Sale, TrainingJob
+from app.scheduler import Scheduler
+
+
+class SchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        self.lock_fd, self.lock_path = tempfile.mkstemp(suffix='.lock')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        os.environ['SCHEDULER_LOCK_FILE'] = self.lock_path
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.schedulers = []
+
+    def tearDown(self):
+        for scheduler in self.schedulers:
+            scheduler.stop()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        for key in ('JOB_RUNNER_ENABLED', 'SCHEDULER_LOCK_FILE'):
+            os.environ.pop(key, None)
+        os.close(self.lock_fd)
+        os.unlink(self.lock_path)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def _scheduler(self):
+        scheduler = Scheduler(self.app, LeaderLock(db.engine, self.lock_path))
+        self.schedulers.append(scheduler)
+        return scheduler
+
+    def _add_sale(self):
+        product = Product(sku='TEST001', name='Product', price=10.0, stock=100)
+        db.session.add(product)
+        db.session.flush()
+        d = datetime.now()
+        db.session.add(Sale(product_id=product.id, quantity=1, total_price=10.0, sale_date=d,
+                            week_number=d.isocalendar()[1], year=d.year))
+        db.session.commit()
+
+    def test_file_lock_is_exclusive(self):
+        """Test that only one holder gets the file lock until it releases it"""
+        first, second = LeaderLock(db.engine, self.lock_path), LeaderLock(db.engine, self.lock_path)
+        self.assertEqual(first.backend, 'file')
+        self.assertTrue(first.acquire())
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        first.release()
+        self.assertTrue(second.acquire())
+        second.release()
+
+    def test_only_the_leader_queues_training(self):
+        """Test that the startup training is queued once, by the process holding the lock"""
+        self._add_sale()
+        leader, follower = self._scheduler(), self._scheduler()
+        queued = leader.tick()
+        self.assertEqual(len(queued), 1)
+        self.assertEqual(follower.tick(), [])
+        self.assertFalse(follower.is_leader)
+        # The weekly rule does not queue again while that training is recent
+        self.assertEqual(leader.tick(), [])
+        self.assertEqual(TrainingJob.query.count(), 1)
+
+        # A follower takes over when the leader goes away
+        leader.stop()
+        self.assertEqual(follower.tick(), queued)
+        self.assertTrue(follower.is_leader)
+
+    def test_regained_leadership_does_not_retrain(self):
+        """Test that a process losing and regaining the lock does not queue another startup training"""
+        self._add_sale()
+        scheduler, other = self._scheduler(), self._scheduler()
+        self.assertEqual(len(scheduler.tick()), 1)
+        TrainingJob.query.update({'status': 'succeeded'})
+        now = datetime.utcnow()
+        db.session.add(ModelTraining(last_trained_week=now.isocalendar()[1], last_trained_year=now.year))
+        db.session.commit()
+
+        # Another process holds the lock for a while
+        scheduler.lock.release()
+        self.assertTrue(other.lock.acquire())
+        self.assertEqual(scheduler.tick(), [])
+        self.assertFalse(scheduler.is_leader)
+        other.lock.release()
+        self.assertEqual(scheduler.tick(), [])
+        self.assertTrue(scheduler.is_leader)
+        self.assertEqual(TrainingJob.query.count(), 1)
+
+    def test_weekly_training(self):
+        """Test that the weekly retrain is queued only when this week has no training yet"""
+        scheduler = self._scheduler()
+        self.assertEqual(scheduler.tick(), [])
+        self.assertTrue(scheduler.is_leader)
+
+        self._add_sale()
+        now = datetime.utcnow()
+        db.session.add(ModelTraining(last_trained_week=now.isocalendar()[1], last_trained_year=now.year))
+        db.session.commit()
+        self.assertEqual(scheduler.tick(), [])
+        ModelTraining.query.delete()
+        db.session.commit()
+        self.assertEqual(len(scheduler.tick()), 1)
+
+    def test_create_app_does_not_train(self):
+        """Test that building the app with existing sales neither trains nor queues anything"""
+        self._add_sale()
+        create_app()
+        self.assertEqual(ModelTraining.query.count(), 0)
+        self.assertEqual(TrainingJob.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import subprocess
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Cold start of a web process: importing the app and running create_app(), in seconds
+STARTUP_BUDGET_SECONDS = float(os.getenv('STARTUP_BUDGET_SECONDS', '1.0'))
+
+ML_MODULES = ('numpy', 'pandas', 'sklearn', 'scipy', 'joblib', 'pyarrow')
+
+_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+create_app()
+print(json.dumps({{
+    'seconds': time.perf_counter() - start,
+    'ml_modules': [m for m in {ML_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+# Trains a random forest for one product, as a trainer process would
+_TRAIN = """
+from datetime import datetime, timedelta
+from app import create_app
+from app.extensions import db
+from app.models import Product, Sale
+from app.rollup import rebuild_daily_sales
+from app.training import train_now
+app = create_app(background=False)
+with app.app_context():
+    product = Product(sku='TEST001', name='Product', price=10.0, stock=1000)
+    db.session.add(product)
+    db.session.flush()
+    today = datetime.now()
+    for i in range(60):
+        d = today - timedelta(days=i + 1)
+        db.session.add(Sale(product_id=product.id, quantity=i % 7 + 1, total_price=10.0, sale_date=d,
+                            week_number=d.isocalendar()[1], year=d.year))
+    db.session.commit()
+    rebuild_daily_sales()
+    db.session.commit()
+    train_now()
+"""
+
+# Serves that product's forecast in a web process
+_PREDICT = """
+import datetime as dt, json, sys
+from app import create_app
+from app.horizon import predict_days
+from app.models import Product
+app = create_app()
+with app.app_context():
+    product = Product.query.one()
+    preds = predict_days(product.id, [dt.date.today() + dt.timedelta(days=i) for i in range(30)])
+print(json.dumps({'predictions': len(preds), 'sklearn': 'sklearn' in sys.modules, 'scipy': 'scipy' in sys.modules}))
+"""
+
+
+def _slowest_imports(importtime_log: str, n: int = 5):
+    """Top-level modules by cumulative import time (microseconds) from `python -X importtime` output."""
+    imports = []
+    for line in importtime_log.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented below their parent
+        if not name.startswith('  '):
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:n]
+
+
+class StartupTestCase(unittest.TestCase):
+    def test_web_role_cold_start(self):
+        """Test that a web process starts within budget without importing the ML stack"""
+        db_fd, db_path = tempfile.mkstemp(suffix='.db')
+        env = {**os.environ, 'APP_ROLE': 'web', 'DB_URL': f'sqlite:///{db_path}', 'PYTHONPATH': BACKEND_DIR}
+        try:
+            # A first run creates the schema, as a deployed database already has it
+            for _ in range(2):
+                result = subprocess.run(
+                    [sys.executable, '-X', 'importtime', '-c', _PROBE],
+                    cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=60,
+                )
+                self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        finally:
+            os.close(db_fd)
+            os.unlink(db_path)
+
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        slowest = ', '.join(f'{name} {us / 1e6:.2f}s' for us, name in _slowest_imports(result.stderr))
+        self.assertEqual(probe['ml_modules'], [], f"web startup imported the ML stack; slowest imports: {slowest}")
+        self.assertLess(probe['seconds'], STARTUP_BUDGET_SECONDS,
+                        f"web startup took {probe['seconds']:.2f}s; slowest imports: {slowest}")
+
+    def test_web_role_serves_forecasts_without_sklearn(self):
+        """Test that a web process predicts from a saved random forest without importing scikit-learn"""
+        db_fd, db_path = tempfile.mkstemp(suffix='.db')
+        models_dir = tempfile.mkdtemp()
+        env = {**os.environ, 'DB_URL': f'sqlite:///{db_path}', 'MODELS_DIR': models_dir, 'PYTHONPATH': BACKEND_DIR,
+               'TRAINING_WORKERS': '1', 'TRAINING_MODELS': 'random_forest', 'TRAINING_FOREST_MIN_DAYS': '0',
+               'BACKTEST_ON_TRAINING': 'false'}
+        try:
+            for script, role in ((_TRAIN, 'trainer'), (_PREDICT, 'web')):
+                result = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env={**env, 'APP_ROLE': role},
+                                        capture_output=True, text=True, timeout=120)
+                self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        finally:
+            os.close(db_fd)
+            os.unlink(db_path)
+            shutil.rmtree(models_dir, ignore_errors=True)
+
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertEqual(probe, {'predictions': 30, 'sklearn': False, 'scipy': False})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import datetime
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Product, Sale, DailySales
+from app.training_data import load_sales_history
+from app.rollup import rebuild_daily_sales
+
+
+class TrainingDataTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        p1 = Product(sku='SKU001', name='Product 1', price=10.0, stock=100)
+        p2 = Product(sku='SKU002', name='Product 2', price=20.0, stock=100)
+        p3 = Product(sku='SKU003', name='Product 3', price=30.0, stock=100)
+        db.session.add_all([p1, p2, p3])
+        db.session.commit()
+        self.p1, self.p2, self.p3 = p1.id, p2.id, p3.id
+
+        # Inserted out of order to check the loader sorts by date; p1 sells twice on Jan 1st
+        for pid, day, hour, qty in [(p2, 3, 9, 4), (p1, 2, 9, 1), (p2, 1, 9, 2), (p1, 1, 9, 3), (p2, 2, 9, 3), (p1, 1, 17, 2)]:
+            d = datetime(2024, 1, day, hour)
+            db.session.add(Sale(product_id=pid.id, quantity=qty, total_price=qty * pid.price,
+                                sale_date=d, week_number=d.isocalendar()[1], year=d.year))
+        db.session.commit()
+        rebuild_daily_sales()
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        os.environ.pop('JOB_RUNNER_ENABLED', None)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_groups_sales_per_product(self):
+        """Test that each product gets its own date-sorted daily arrays"""
+        histories = load_sales_history(chunk_size=2)
+        self.assertEqual(set(histories), {self.p1, self.p2})
+        self.assertEqual(histories[self.p1].quantities.tolist(), [5, 1])
+        self.assertEqual(histories[self.p1].sales_counts.tolist(), [2, 1])
+        self.assertEqual(histories[self.p1].years.tolist(), [2024, 2024])
+        self.assertEqual(histories[self.p2].quantities.tolist(), [2, 3, 4])
+        self.assertEqual(str(histories[self.p2].dates[0].astype('datetime64[D]')), '2024-01-01')
+        self.assertEqual(histories[self.p2].week_numbers.tolist(), [1, 1, 1])
+
+    def test_filters_by_product_ids(self):
+        """Test that the loader can be restricted to a subset of products"""
+        histories = load_sales_history(product_ids=[self.p2, self.p3])
+        self.assertEqual(set(histories), {self.p2})
+
+    def test_empty(self):
+        """Test that an empty sales table yields no histories"""
+        DailySales.query.delete()
+        Sale.query.delete()
+        db.session.commit()
+        self.assertEqual(load_sales_history(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
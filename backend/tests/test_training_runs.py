@@ -0,0 +1,139 @@
+import unittest
+import sys
+import os
+import json
+import pstats
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+# Add backend path to PYTHONPATH
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.extensions import db
+from app.models import Forecast, Product, Sale, TrainingRun, TrainingRunProduct, User
+from app.jobs import run_pending_jobs
+from app.model_registry import model_path
+from app.rollup import rebuild_daily_sales
+from app.training import train_now
+from app.training_runs import PhaseTimer
+
+
+class TrainingRunsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.environ['DB_URL'] = f'sqlite:///{self.db_path}'
+        os.environ['JOB_RUNNER_ENABLED'] = 'false'
+        os.environ['TRAINING_WORKERS'] = '1'
+        os.environ['BACKTEST_ON_TRAINING'] = 'false'
+        os.environ['TRAINING_RUN_DETAIL_KEEP'] = '1'
+        self.models_dir = tempfile.mkdtemp()
+        self.profile_dir = tempfile.mkdtemp()
+        os.environ['MODELS_DIR'] = self.models_dir
+        os.environ['TRAINING_PROFILE_DIR'] = self.profile_dir
+        self.app = create_app()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+
+        db.session.add(User(username='admin', email='admin@example.com', password_hash='password'))
+        products = [Product(sku=f'TEST00{i}', name=f'Product {i}', price=10.0, stock=1000) for i in (1, 2)]
+        db.session.add_all(products)
+        db.session.commit()
+        self.product_ids = [p.id for p in products]
+        today = datetime.now()
+        for n, product in enumerate(products, start=1):
+            for i in range(30 * n):
+                d = today - timedelta(days=i + 1)
+                db.session.add(Sale(product_id=product.id, quantity=n, total_price=n * 10.0,
+                                    sale_date=d, week_number=d.isocalendar()[1], year=d.year))
+        db.session.commit()
+        rebuild_daily_sales()
+        db.session.commit()
+
+        response = self.client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'})
+        self.headers = {'Authorization': f"Bearer {json.loads(response.data)['access_token']}"}
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        for key in ('JOB_RUNNER_ENABLED', 'TRAINING_WORKERS', 'BACKTEST_ON_TRAINING', 'TRAINING_RUN_DETAIL_KEEP',
+                    'MODELS_DIR', 'TRAINING_PROFILE_DIR'):
+            os.environ.pop(key, None)
+        shutil.rmtree(self.models_dir, ignore_errors=True)
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def test_phase_timer(self):
+        """Test that phases accumulate and merge worker timings"""
+        timer = PhaseTimer()
+        with timer.phase('fit'):
+            pass
+        with timer.phase('fit'):
+            pass
+        timer.merge({'fit': 1.0, 'predict': 0.5})
+        self.assertEqual(set(timer.seconds), {'fit', 'predict'})
+        self.assertGreaterEqual(timer.seconds['fit'], 1.0)
+
+    def test_run_is_recorded_with_phases(self):
+        """Test that a training run stores its phases and per-product timings, served by the admin endpoint"""
+        train_now()
+        run = TrainingRun.query.one()
+        self.assertEqual((run.kind, run.mode, run.status), ('full', 'per_product', 'succeeded'))
+        self.assertEqual((run.products_total, run.products_trained), (2, 2))
+        for phase in ('load', 'features', 'fit', 'predict', 'serialize', 'train', 'write'):
+            self.assertIn(phase, run.phases)
+        self.assertEqual(TrainingRunProduct.query.count(), 2)
+
+        response = self.client.get('/api/admin/training-runs', headers=self.headers)
+        self.assertEqual([r['id'] for r in json.loads(response.data)['runs']], [run.id])
+        response = self.client.get(f'/api/admin/training-runs/{run.id}?limit=1', headers=self.headers)
+        data = json.loads(response.data)
+        self.assertEqual(len(data['slowest_products']), 1)
+        self.assertIn(data['slowest_products'][0]['sku'], {'TEST001', 'TEST002'})
+        self.assertEqual(sum(m['products'] for m in data['by_model_type']), 2)
+        self.assertEqual(self.client.get('/api/admin/training-runs/999', headers=self.headers).status_code, 404)
+
+        # Only the latest run keeps per-product rows (TRAINING_RUN_DETAIL_KEEP=1)
+        train_now()
+        latest = TrainingRun.query.order_by(TrainingRun.id.desc()).first()
+        self.assertEqual({p.run_id for p in TrainingRunProduct.query.all()}, {latest.id})
+
+    def test_pool_training(self):
+        """Test that training in spawned worker processes saves every model and forecast"""
+        self.app.config.update(TRAINING_WORKERS=2, TRAINING_BATCH_SIZE=1, TRAINING_MP_START_METHOD='spawn')
+        train_now()
+        run = TrainingRun.query.one()
+        self.assertEqual((run.status, run.products_trained), ('succeeded', 2))
+        for product_id in self.product_ids:
+            self.assertTrue(os.path.exists(model_path(self.models_dir, product_id)))
+            self.assertEqual(Forecast.query.filter_by(product_id=product_id).count(), 7)
+
+    def test_failed_run_is_recorded(self):
+        """Test that a run that fails is kept with its error"""
+        with mock.patch('app.training.upsert_forecasts', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                train_now()
+        run = TrainingRun.query.one()
+        self.assertEqual((run.status, run.error), ('failed', 'disk full'))
+        self.assertIn('fit', run.phases)
+
+    def test_profiled_run(self):
+        """Test that a run requested with a profiler dumps a readable profile"""
+        response = self.client.post('/api/admin/train-now', json={'profile': 'perf'}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/admin/train-now', json={'profile': 'cprofile'}, headers=self.headers)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(run_pending_jobs(), 1)
+
+        run = TrainingRun.query.one()
+        self.assertTrue(run.profile_path.startswith(self.profile_dir))
+        self.assertGreater(pstats.Stats(run.profile_path).total_calls, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,9 @@ from app import create_app
 
 app = create_app()
 
+if app.config['APP_ROLE'] not in ('all', 'web'):
+    # trainer and scheduler processes serve no requests: start them with python -m app <role>
+    raise RuntimeError(f"APP_ROLE={app.config['APP_ROLE']} does not serve HTTP; run python -m app {app.config['APP_ROLE']}")
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8000)
-
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { FormControl, InputLabel, Select, MenuItem, SelectChangeEvent } from "@mui/material";
-import api from "../lib/api";
+import { fetchAllPages } from "../lib/api";
 
 interface ProductSelectorProps {
   onProductChange: (productId: string) => void;
@@ -19,8 +19,7 @@ const ProductSelector: React.FC<ProductSelectorProps> = ({ onProductChange }) =>
   useEffect(() => {
     const fetchProducts = async () => {
       try {
-        const response = await api.get("/products");
-        const productList = response.data.items || [];
+        const productList = await fetchAllPages<Product>("/products");
         setProducts(productList);
         
         if (productList.length > 0) {
@@ -17,9 +17,26 @@ api.interceptors.request.use((config) => {
 
 export type ApiListResponse<T> = {
   items: T[];
-  total: number;
+  // Id to pass as after_id for the following page; null on the last page
+  next_after_id: number | null;
+  // Only present when requested with with_total=1
+  total?: number;
 };
 
+// Every item of a keyset-paged list (/products), one bounded page per request
+export async function fetchAllPages<T>(url: string, params: Record<string, unknown> = {}): Promise<T[]> {
+  const items: T[] = [];
+  let afterId: number | null = null;
+  do {
+    const res: { data: ApiListResponse<T> } = await api.get<ApiListResponse<T>>(url, {
+      params: afterId === null ? params : { ...params, after_id: afterId },
+    });
+    items.push(...res.data.items);
+    afterId = res.data.next_after_id;
+  } while (afterId !== null);
+  return items;
+}
+
 export default api;
 
 
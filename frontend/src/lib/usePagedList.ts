@@ -0,0 +1,27 @@
+import { useCallback, useState } from "react";
+import api, { ApiListResponse } from "./api";
+
+// A keyset-paged list shown page by page: reload() fetches the first page, loadMore() appends the next
+export function usePagedList<T>(url: string) {
+  const [items, setItems] = useState<T[]>([]);
+  const [nextAfterId, setNextAfterId] = useState<number | null>(null);
+  const [loading, setLoading] = useState(false);
+
+  const fetchPage = useCallback(async (afterId: number | null) => {
+    setLoading(true);
+    try {
+      const res = await api.get<ApiListResponse<T>>(url, {
+        params: afterId === null ? {} : { after_id: afterId },
+      });
+      setItems((prev) => (afterId === null ? res.data.items : [...prev, ...res.data.items]));
+      setNextAfterId(res.data.next_after_id);
+    } finally {
+      setLoading(false);
+    }
+  }, [url]);
+
+  const reload = useCallback(() => fetchPage(null), [fetchPage]);
+  const loadMore = useCallback(() => fetchPage(nextAfterId), [fetchPage, nextAfterId]);
+
+  return { items, loading, hasMore: nextAfterId !== null, reload, loadMore };
+}
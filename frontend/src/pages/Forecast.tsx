@@ -2,7 +2,7 @@ import React, { useEffect, useMemo, useState } from "react";
 import Navbar from "../components/Navbar";
 import Sidebar from "../components/Sidebar";
 import ChartCard from "../components/ChartCard";
-import api from "../lib/api";
+import api, { fetchAllPages } from "../lib/api";
 
 export default function Forecast(): React.ReactElement {
   const [productId, setProductId] = useState<string>("");
@@ -15,8 +15,7 @@ export default function Forecast(): React.ReactElement {
   useEffect(() => {
     (async () => {
       try {
-        const res = await api.get<{ items: { id: string; name: string }[] }>("/products");
-        const list = res.data.items ?? [];
+        const list = await fetchAllPages<{ id: string; name: string }>("/products");
         setProducts(list);
         if (list.length) {
           setProductId(list[0]!.id);
@@ -3,26 +3,16 @@ import Navbar from "../components/Navbar";
 import Sidebar from "../components/Sidebar";
 import ProductForm, { ProductInput } from "../components/ProductForm";
 import api from "../lib/api";
+import { usePagedList } from "../lib/usePagedList";
 
 type Product = { id: string; name: string; sku: string; price: number; stock: number };
 
 export default function Products(): React.ReactElement {
-  const [items, setItems] = useState<Product[]>([]);
-  const [loading, setLoading] = useState(false);
+  const { items, loading, hasMore, reload: load, loadMore } = usePagedList<Product>("/products");
   const [showModal, setShowModal] = useState(false);
   const [editing, setEditing] = useState<Product | null>(null);
 
-  async function load() {
-    setLoading(true);
-    try {
-      const res = await api.get("/products");
-      setItems(res.data.items || res.data);
-    } finally {
-      setLoading(false);
-    }
-  }
-
-  useEffect(() => { load(); }, []);
+  useEffect(() => { load(); }, [load]);
 
   async function create(data: ProductInput) {
     await api.post<Product>("/products", data);
@@ -85,6 +75,13 @@ export default function Products(): React.ReactElement {
               </tbody>
             </table>
           </div>
+          {hasMore && (
+            <div className="text-center">
+              <button className="btn border border-gray-300" onClick={loadMore} disabled={loading}>
+                {loading ? "Loading..." : "Load more"}
+              </button>
+            </div>
+          )}
 
           {(showModal || editing) && (
             <div className="fixed inset-0 z-50 grid place-items-center bg-black/40 p-4">
@@ -2,32 +2,23 @@ import React, { useEffect, useState } from "react";
 import Navbar from "../components/Navbar";
 import Sidebar from "../components/Sidebar";
 import SalesForm, { ProductOption, SaleInput } from "../components/SalesForm";
-import api, { ApiListResponse } from "../lib/api";
+import api, { fetchAllPages } from "../lib/api";
+import { usePagedList } from "../lib/usePagedList";
 import { Trash } from "lucide-react";
 
 type Sale = { id: string; productName: string; quantity: number; date: string };
 
 export default function Sales(): React.ReactElement {
-  const [items, setItems] = useState<Sale[]>([]);
+  const { items, loading, hasMore, reload: load, loadMore } = usePagedList<Sale>("/sales");
   const [products, setProducts] = useState<ProductOption[]>([]);
-  const [loading, setLoading] = useState(false);
   const [showModal, setShowModal] = useState(false);
 
-  async function load() {
-    setLoading(true);
-    try {
-      const [salesRes, prodRes] = await Promise.all([
-        api.get<ApiListResponse<Sale>>("/sales"),
-        api.get<ApiListResponse<{ id: string; name: string }>>("/products"),
-      ]);
-      setItems(salesRes.data.items || (salesRes.data as any));
-      setProducts((prodRes.data.items || []).map(p => ({ id: (p as any).id, name: (p as any).name })));
-    } finally {
-      setLoading(false);
-    }
-  }
+  useEffect(() => { load(); }, [load]);
 
-  useEffect(() => { load(); }, []);
+  useEffect(() => {
+    fetchAllPages<{ id: string; name: string }>("/products")
+      .then((list) => setProducts(list.map((p) => ({ id: p.id, name: p.name }))));
+  }, []);
 
   async function create(data: SaleInput) {
     await api.post("/sales", data);
@@ -87,6 +78,13 @@ export default function Sales(): React.ReactElement {
               </tbody>
             </table>
           </div>
+          {hasMore && (
+            <div className="text-center">
+              <button className="btn border border-gray-300" onClick={loadMore} disabled={loading}>
+                {loading ? "Loading..." : "Load more"}
+              </button>
+            </div>
+          )}
 
           {showModal && (
             <div className="fixed inset-0 z-50 grid place-items-center bg-black/40 p-4">